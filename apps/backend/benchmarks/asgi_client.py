@@ -0,0 +1,88 @@
+"""
+Cliente ASGI mínimo em processo (sem rede e sem dependências extras),
+usado para medir a latência dos endpoints.
+"""
+import asyncio
+import uuid
+from typing import Dict, Iterable, Optional, Tuple
+
+
+class ASGIClient:
+    def __init__(self, app):
+        self.app = app
+        self._lifespan_task: Optional[asyncio.Task] = None
+        self._lifespan_queue: Optional[asyncio.Queue] = None
+
+    async def __aenter__(self) -> "ASGIClient":
+        self._lifespan_queue = asyncio.Queue()
+        started = asyncio.get_running_loop().create_future()
+        done = {"startup": started}
+
+        async def receive():
+            return await self._lifespan_queue.get()
+
+        async def send(message):
+            kind = message["type"]
+            if kind.startswith("lifespan.startup") and not started.done():
+                started.set_result(kind)
+            elif kind.startswith("lifespan.shutdown") and "shutdown" in done:
+                done["shutdown"].set_result(kind)
+
+        scope = {"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}
+        self._lifespan_task = asyncio.create_task(self.app(scope, receive, send))
+        self._done = done
+        await self._lifespan_queue.put({"type": "lifespan.startup"})
+        await started
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self._done["shutdown"] = asyncio.get_running_loop().create_future()
+        await self._lifespan_queue.put({"type": "lifespan.shutdown"})
+        await self._done["shutdown"]
+        await self._lifespan_task
+
+    async def request(self, method: str, path: str, body: bytes = b"",
+                      headers: Iterable[Tuple[str, str]] = ()) -> Tuple[int, bytes]:
+        path, _, query = path.partition("?")
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+            "query_string": query.encode(), "root_path": "",
+            "headers": [(k.lower().encode(), v.encode()) for k, v in headers]
+                       + [(b"content-length", str(len(body)).encode())],
+            "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+        }
+        sent = {"body": False}
+        response = {"status": 0, "body": bytearray()}
+
+        async def receive():
+            if not sent["body"]:
+                sent["body"] = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await asyncio.sleep(3600)
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response["body"] += message.get("body", b"")
+
+        await self.app(scope, receive, send)
+        return response["status"], bytes(response["body"])
+
+
+def multipart(fields: Dict[str, str], files: Dict[str, Tuple[str, bytes, str]] = None) -> Tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'.encode()
+            + value.encode("utf-8") + b"\r\n"
+        )
+    for name, (filename, content, content_type) in (files or {}).items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'.encode() + content + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
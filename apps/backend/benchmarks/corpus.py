@@ -0,0 +1,131 @@
+"""
+Gerador determinístico de um corpus sintético de emails em português,
+em texto puro e em PDF, para os benchmarks.
+"""
+import random
+from typing import Dict, List
+
+GREETINGS = [
+    "Olá, bom dia!", "Boa tarde a todos,", "Prezados,", "Oi, tudo bem?",
+    "Caros colegas,", "Bom dia, equipe.", "Prezada Sra. Souza,",
+]
+
+PRODUTIVO_SENTENCES = [
+    "Segue em anexo a proposta comercial para revisão até sexta-feira.",
+    "Precisamos confirmar o pagamento da fatura número 48213 ainda esta semana.",
+    "O cronograma de atividades do projeto de implementação foi atualizado.",
+    "Favor verificar o prazo de entrega do produto conforme o contrato de prestação.",
+    "O orçamento aprovado pelo diretor cobre o software de gestão e o hardware necessário para a nuvem.",
+    "Houve multa por atraso prevista na cláusula contratual de rescisão.",
+    "Solicito o relatório de atividades e o inventário físico de estoque de produtos.",
+    "A reunião de trabalho sobre a logística de distribuição será às 10h.",
+    "Precisamos da procuração assinada para concluir a escritura do imóvel.",
+    "A admissão de funcionário depende da folha de ponto do mês anterior.",
+]
+
+IMPRODUTIVO_SENTENCES = [
+    "Muito obrigado pela atenção de sempre!",
+    "Parabéns pelo excelente trabalho da equipe este ano.",
+    "Feliz aniversário, que seu dia seja ótimo!",
+    "Tenha um bom dia e um ótimo fim de semana.",
+    "Passando só para agradecer a gentileza e a consideração.",
+    "Saudações a todos, foi um prazer revê-los no evento.",
+    "Desejo felicitações e congratulações pela promoção.",
+    "Um abraço e até breve!",
+]
+
+FILLER_SENTENCES = [
+    "Fico à disposição para quaisquer dúvidas.",
+    "Conforme conversamos por telefone na última semana.",
+    "Qualquer novidade eu aviso por aqui.",
+    "Peço que confirmem o recebimento desta mensagem.",
+    "Estamos alinhando os detalhes internamente.",
+]
+
+CLOSINGS = ["Atenciosamente,", "Abraços,", "Obrigado,", "Att.,", "Até logo,"]
+
+NAMES = ["Ana Lima", "Carlos Pereira", "Mariana Costa", "João Alves", "Fernanda Rocha"]
+
+
+def _email(rng: random.Random, produtivo: bool, sentences: int, quoted: bool) -> str:
+    pool = PRODUTIVO_SENTENCES if produtivo else IMPRODUTIVO_SENTENCES
+    body = [rng.choice(pool) if rng.random() < 0.7 else rng.choice(FILLER_SENTENCES)
+            for _ in range(sentences)]
+    name = rng.choice(NAMES)
+    lines = [rng.choice(GREETINGS), "", " ".join(body), "", rng.choice(CLOSINGS), name]
+    if quoted:
+        previous = _email(rng, rng.random() < 0.5, max(sentences // 2, 2), False)
+        lines += ["", f"Em 12/03/2024 10:15, {rng.choice(NAMES)} escreveu:"]
+        lines += ["> " + line for line in previous.split("\n")]
+    return "\n".join(lines)
+
+
+def generate_corpus(size: int = 200, long_ratio: float = 0.25, seed: int = 42) -> List[Dict]:
+    """
+    Gera ``size`` emails: curtos (2-5 frases) e longos (60-200 frases com
+    histórico citado), cada um com o rótulo esperado.
+    """
+    rng = random.Random(seed)
+    corpus = []
+    for index in range(size):
+        produtivo = rng.random() < 0.6
+        is_long = rng.random() < long_ratio
+        sentences = rng.randint(60, 200) if is_long else rng.randint(2, 5)
+        corpus.append({
+            "id": index,
+            "kind": "long" if is_long else "short",
+            "expected": "Produtivo" if produtivo else "Improdutivo",
+            "text": _email(rng, produtivo, sentences, quoted=is_long),
+        })
+    return corpus
+
+
+def _pdf_escape(line: str) -> bytes:
+    encoded = line.encode("cp1252", errors="replace")
+    return encoded.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def text_to_pdf(text: str, lines_per_page: int = 45, width: int = 90) -> bytes:
+    """
+    Monta um PDF mínimo (Helvetica, WinAnsiEncoding) com o texto, sem
+    dependências externas.
+    """
+    lines = []
+    for paragraph in text.split("\n"):
+        while len(paragraph) > width:
+            cut = paragraph.rfind(" ", 0, width)
+            cut = cut if cut > 0 else width
+            lines.append(paragraph[:cut])
+            paragraph = paragraph[cut:].lstrip()
+        lines.append(paragraph)
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"]
+    page_ids = []
+    for page_lines in pages:
+        stream = b"BT /F1 10 Tf 14 TL 40 800 Td " + b" ".join(
+            b"(" + _pdf_escape(line) + b") '" for line in page_lines
+        ) + b" ET"
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % page_id for page_id in page_ids), len(page_ids)
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
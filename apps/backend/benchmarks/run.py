@@ -0,0 +1,323 @@
+"""
+Benchmarks reprodutíveis do classificador e dos endpoints.
+
+Uso (a partir de apps/backend):
+    python benchmarks/run.py --output bench.json
+    python benchmarks/run.py --output bench.json --baseline baseline.json --tolerance 0.15
+
+Gera um JSON com as métricas. Com --baseline, compara as métricas e sai com
+código 1 se alguma piorar além da tolerância (para uso em CI).
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCH_DIR), "src")
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, SRC_DIR)
+
+from corpus import generate_corpus, text_to_pdf
+from asgi_client import ASGIClient, multipart
+
+# Métricas em que valores maiores são melhores; as demais são tempos/memória
+HIGHER_IS_BETTER = ("_per_s",)
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    return {"p50": pick(0.50), "p90": pick(0.90), "p99": pick(0.99), "mean": statistics.fmean(ordered)}
+
+
+def timed(function: Callable, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def bench_stages(classifier, corpus: List[Dict]) -> Dict[str, float]:
+    """
+    Tempo por estágio do pipeline (stemmer sem cache), em µs por email.
+    """
+    metrics = {}
+    for kind in ("short", "long"):
+        emails = [email["text"] for email in corpus if email["kind"] == kind]
+        if not emails:
+            continue
+        totals = dict.fromkeys(("normalize", "tokenize", "single_pass", "stem", "ngram", "score"), 0.0)
+        for text in emails:
+            normalized, elapsed = timed(classifier.normalize_text, text)
+            totals["normalize"] += elapsed
+            words, elapsed = timed(lambda t: classifier.filter_words(classifier.tokenize_with_fallback(t)), normalized)
+            totals["tokenize"] += elapsed
+            # normalize + tokenize + filtro em uma varredura (caminho usado em classify)
+            _, elapsed = timed(classifier._tokenize_words, text)
+            totals["single_pass"] += elapsed
+            stems, elapsed = timed(lambda ws: [classifier.stemmer.stem(w) for w in ws], words)
+            totals["stem"] += elapsed
+            _, elapsed = timed(classifier.extract_ngrams, stems)
+            totals["ngram"] += elapsed
+            _, elapsed = timed(classifier.lexicon.score, stems)
+            totals["score"] += elapsed
+        for stage, total in totals.items():
+            metrics[f"stage_{kind}_{stage}_us"] = total / len(emails) * 1e6
+    return metrics
+
+
+def bench_throughput(classifier_factory: Callable, corpus: List[Dict]) -> Dict[str, float]:
+    texts = [email["text"] for email in corpus]
+    metrics = {}
+
+    cold = classifier_factory(stem_cache_size=0, result_cache_size=0)
+    _, elapsed = timed(lambda: [cold.classify(text) for text in texts])
+    metrics["classify_uncached_emails_per_s"] = len(texts) / elapsed
+
+    warm = classifier_factory()
+    [warm.classify(text) for text in texts]
+    # Só o cache de stems fica quente (sem cache de resultados com RESULT_CACHE_SIZE=0)
+    if warm.result_cache is not None:
+        warm.result_cache.clear()
+    _, elapsed = timed(lambda: [warm.classify(text) for text in texts])
+    metrics["classify_stem_cached_emails_per_s"] = len(texts) / elapsed
+
+    early = classifier_factory(result_cache_size=0, scoring_mode="early_exit")
+    long_texts = [email["text"] for email in corpus if email["kind"] == "long"]
+    if long_texts:
+        [early.classify(text) for text in long_texts]
+        results, elapsed = timed(lambda: [early.classify_detailed(text) for text in long_texts])
+        metrics["classify_long_early_exit_emails_per_s"] = len(long_texts) / elapsed
+        metrics["early_exit_tokens_per_long_email"] = sum(result[2] for result in results) / len(long_texts)
+        full = classifier_factory(result_cache_size=0, scoring_mode="full")
+        [full.classify(text) for text in long_texts]
+        _, elapsed = timed(lambda: [full.classify(text) for text in long_texts])
+        metrics["classify_long_full_emails_per_s"] = len(long_texts) / elapsed
+
+    batch = classifier_factory(result_cache_size=0)
+    _, elapsed = timed(batch.classify_many, texts)
+    metrics["classify_many_emails_per_s"] = len(texts) / elapsed
+
+    correct = sum(1 for email, text in zip(corpus, texts) if cold.classify(text)[0] == email["expected"])
+    metrics["accuracy"] = correct / len(texts)
+
+    tracemalloc.start()
+    fresh = classifier_factory(stem_cache_size=0, result_cache_size=0)
+    [fresh.classify(text) for text in texts]
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    metrics["classify_memory_peak_kb"] = peak / 1024
+    return metrics
+
+
+def bench_backends(classifier_factory: Callable, corpus: List[Dict], train_corpus: List[Dict]) -> Dict[str, float]:
+    """
+    Regras × modelo linear lado a lado: acurácia e vazão, individual e em
+    lote. O modelo linear é treinado num corpus gerado com outra semente.
+    """
+    from classifiers.linear_model import train_linear_model
+
+    rules = classifier_factory(stem_cache_size=0, result_cache_size=0, backend="rules")
+    started = time.perf_counter()
+    model = train_linear_model(
+        [rules.preprocess_tokens(email["text"]) for email in train_corpus],
+        [email["expected"] for email in train_corpus]
+    )
+    metrics = {"linear_train_seconds": time.perf_counter() - started}
+
+    texts = [email["text"] for email in corpus]
+    for backend in ("rules", "linear"):
+        options = {"linear_model": model} if backend == "linear" else {}
+        classifier = classifier_factory(stem_cache_size=0, result_cache_size=0, backend=backend, **options)
+        results, elapsed = timed(lambda: [classifier.classify(text) for text in texts])
+        metrics[f"backend_{backend}_accuracy"] = sum(
+            1 for email, (category, _) in zip(corpus, results) if category == email["expected"]
+        ) / len(texts)
+        metrics[f"backend_{backend}_classify_emails_per_s"] = len(texts) / elapsed
+        batch = classifier_factory(result_cache_size=0, backend=backend, **options)
+        _, elapsed = timed(batch.classify_many, texts)
+        metrics[f"backend_{backend}_classify_many_emails_per_s"] = len(texts) / elapsed
+    return metrics
+
+
+async def bench_extraction(corpus: List[Dict], repeat: int) -> Dict[str, float]:
+    from starlette.datastructures import UploadFile
+    from utils.text_processor import extract_text_from_file
+    from utils.pdf_pool import get_pdf_pool
+
+    long_email = max(corpus, key=lambda email: len(email["text"]))["text"]
+    files = {
+        "txt": ("email.txt", long_email.encode("utf-8")),
+        "pdf": ("email.pdf", text_to_pdf(long_email)),
+    }
+    metrics = {}
+    for kind, (filename, content) in files.items():
+        samples = []
+        for _ in range(repeat):
+            upload = UploadFile(file=io.BytesIO(content), filename=filename)
+            started = time.perf_counter()
+            await extract_text_from_file(upload)
+            samples.append((time.perf_counter() - started) * 1000)
+        for name, value in percentiles(samples).items():
+            metrics[f"extract_{kind}_{name}_ms"] = value
+    get_pdf_pool().shutdown()
+    metrics.update(await bench_pdf_modes(corpus))
+    return metrics
+
+
+async def bench_pdf_modes(corpus: List[Dict]) -> Dict[str, float]:
+    """
+    Páginas por segundo de um PDF de várias páginas em cada modo de
+    extração (layout do pdfplumber e camada de texto crua do pdfium).
+    """
+    import tempfile
+    from utils.pdf_pool import PDF_EXTRACTION_MODES, PdfExtractionPool
+
+    text = " ".join(email["text"] for email in corpus[:40])
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        f.write(text_to_pdf(text))
+    metrics = {}
+    try:
+        for mode in PDF_EXTRACTION_MODES:
+            pool = PdfExtractionPool(mode=mode, max_pages=0)
+            # Primeira chamada sobe os workers; fora da medição
+            await pool.extract(f.name, pages=(0, 1))
+            started = time.perf_counter()
+            pages = 0
+            async for _ in pool.iter_pages(f.name):
+                pages += 1
+            metrics[f"extract_pdf_{mode}_pages_per_s"] = pages / (time.perf_counter() - started)
+            pool.shutdown()
+    finally:
+        os.unlink(f.name)
+    return metrics
+
+
+async def bench_api(corpus: List[Dict], requests: int) -> Dict[str, float]:
+    import main
+
+    metrics = {}
+    async with ASGIClient(main.app) as client:
+        samples = []
+        for index in range(requests):
+            body, content_type = multipart({"email_text": corpus[index % len(corpus)]["text"]})
+            started = time.perf_counter()
+            status, _ = await client.request("POST", "/api/classify", body, [("content-type", content_type)])
+            samples.append((time.perf_counter() - started) * 1000)
+            if status != 200:
+                raise RuntimeError(f"/api/classify respondeu {status}")
+        for name, value in percentiles(samples).items():
+            metrics[f"api_classify_{name}_ms"] = value
+
+        pdf = text_to_pdf(max(corpus, key=lambda email: len(email["text"]))["text"])
+        samples = []
+        for _ in range(max(requests // 10, 5)):
+            body, content_type = multipart({}, {"file": ("email.pdf", pdf, "application/pdf")})
+            started = time.perf_counter()
+            status, _ = await client.request("POST", "/api/classify", body, [("content-type", content_type)])
+            samples.append((time.perf_counter() - started) * 1000)
+            if status != 200:
+                raise RuntimeError(f"/api/classify (PDF) respondeu {status}")
+        for name, value in percentiles(samples).items():
+            metrics[f"api_classify_pdf_{name}_ms"] = value
+
+        payload = json.dumps([email["text"] for email in corpus]).encode("utf-8")
+        samples = []
+        for _ in range(5):
+            started = time.perf_counter()
+            status, _ = await client.request("POST", "/api/classify/batch", payload, [("content-type", "application/json")])
+            samples.append(time.perf_counter() - started)
+            if status != 200:
+                raise RuntimeError(f"/api/classify/batch respondeu {status}")
+        metrics["api_batch_emails_per_s"] = len(corpus) / statistics.median(samples)
+    return metrics
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], tolerance: float) -> List[str]:
+    regressions = []
+    for name, value in results.items():
+        previous = baseline.get(name)
+        if not previous or name.endswith("accuracy"):
+            continue
+        higher_is_better = name.endswith(HIGHER_IS_BETTER)
+        change = (previous - value) / previous if higher_is_better else (value - previous) / previous
+        if change > tolerance:
+            regressions.append(f"{name}: {previous:.2f} -> {value:.2f} ({change:+.0%} pior)")
+    for name, value in results.items():
+        if name.endswith("accuracy") and baseline.get(name) is not None and value < baseline[name]:
+            regressions.append(f"{name}: {baseline[name]:.3f} -> {value:.3f}")
+    return regressions
+
+
+def print_backends(metrics: Dict[str, float]) -> None:
+    print(f"\n{'backend':<8} {'acurácia':>9} {'emails/s':>10} {'lote emails/s':>14}", file=sys.stderr)
+    for backend in ("rules", "linear"):
+        prefix = f"backend_{backend}_"
+        if prefix + "accuracy" in metrics:
+            print(f"{backend:<8} {metrics[prefix + 'accuracy']:>9.3f} "
+                  f"{metrics[prefix + 'classify_emails_per_s']:>10.0f} "
+                  f"{metrics[prefix + 'classify_many_emails_per_s']:>14.0f}", file=sys.stderr)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks do classificador de emails")
+    parser.add_argument("--size", type=int, default=200, help="Emails no corpus sintético")
+    parser.add_argument("--requests", type=int, default=200, help="Requisições no benchmark da API")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Arquivo JSON de saída")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Piora relativa aceita")
+    parser.add_argument("--skip-api", action="store_true")
+    args = parser.parse_args()
+
+    from classifiers.nlp_classifier import EmailClassifier
+
+    corpus = generate_corpus(args.size, seed=args.seed)
+    metrics = {}
+    metrics.update(bench_stages(EmailClassifier(stem_cache_size=0, result_cache_size=0), corpus))
+    metrics.update(bench_throughput(EmailClassifier, corpus))
+    metrics.update(bench_backends(EmailClassifier, corpus, generate_corpus(args.size, seed=args.seed + 1)))
+    metrics.update(asyncio.run(bench_extraction(corpus, repeat=5)))
+    if not args.skip_api:
+        metrics.update(asyncio.run(bench_api(corpus, args.requests)))
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "corpus_size": args.size,
+            "seed": args.seed,
+        },
+        "metrics": {name: round(value, 4) for name, value in metrics.items()},
+    }
+    print(json.dumps(report, indent=2))
+    print_backends(report["metrics"])
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["metrics"]
+        regressions = compare(report["metrics"], baseline, args.tolerance)
+        if regressions:
+            print("\nRegressões em relação ao baseline:")
+            for line in regressions:
+                print(f"  - {line}")
+            sys.exit(1)
+        print("\nSem regressões em relação ao baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""
+Classificação em massa de exportações de caixas de email.
+
+Lê um diretório, um arquivo mbox ou NDJSON (um email por linha, ``-`` para
+stdin), distribui os emails em lotes por um pool de processos e escreve os
+resultados na ordem de entrada, em NDJSON ou CSV.
+
+Uso:
+    python bulk.py caixa.mbox --output resultados.ndjson --checkpoint caixa.ckpt
+    python bulk.py caixa.mbox --output resultados.ndjson --checkpoint caixa.ckpt --resume
+"""
+import argparse
+import csv
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import IO, Iterable, Iterator, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from classifiers.lexicon import CompiledLexicon, DEFAULT_LEXICON_PATH
+from classifiers.nlp_classifier import EmailClassifier, SCORING_MODES
+from utils.batch_input import ItemId, parse_batch_item
+from utils.email_parser import iter_mbox_file, parse_email_file
+
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", 256))
+BULK_PROGRESS_SECONDS = 5.0
+
+# (índice, id, texto, erro) na ordem da entrada
+BulkItem = Tuple[int, ItemId, Optional[str], Optional[str]]
+# (índice, id, categoria, confiança, tokens pontuados, erro)
+BulkResult = Tuple[int, ItemId, Optional[str], Optional[float], Optional[int], Optional[str]]
+
+CSV_FIELDS = ["index", "id", "category", "confidence", "tokens_scored", "error"]
+
+
+def iter_directory(path: str) -> Iterator[Tuple[ItemId, Optional[str], Optional[str]]]:
+    # Ordem estável para que os checkpoints sejam válidos entre execuções
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for filename in sorted(files):
+            file_path = os.path.join(root, filename)
+            item_id = os.path.relpath(file_path, path)
+            try:
+                if filename.lower().endswith(".eml"):
+                    text = parse_email_file(file_path).text
+                else:
+                    with open(file_path, "rb") as f:
+                        text = f.read().decode("utf-8", errors="replace")
+            except (OSError, ValueError) as e:
+                yield item_id, None, f"Erro ao ler arquivo: {e}"
+                continue
+            yield item_id, text, None
+
+
+def iter_mbox(path: str) -> Iterator[Tuple[ItemId, Optional[str], Optional[str]]]:
+    # Mapeado em memória: arquivos de vários GB não ficam inteiros na RAM
+    for position, message in enumerate(iter_mbox_file(path)):
+        yield message.message_id or position, message.text, None
+
+
+def iter_ndjson(path: str) -> Iterator[Tuple[ItemId, Optional[str], Optional[str]]]:
+    if path == "-":
+        yield from _iter_ndjson_lines(sys.stdin)
+        return
+    with open(path, encoding="utf-8", errors="replace") as f:
+        yield from _iter_ndjson_lines(f)
+
+
+def _iter_ndjson_lines(stream: IO[str]) -> Iterator[Tuple[ItemId, Optional[str], Optional[str]]]:
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            yield parse_batch_item(json.loads(line))
+        except json.JSONDecodeError as e:
+            yield None, None, f"Linha NDJSON inválida: {e.msg}"
+
+
+def detect_format(source: str) -> str:
+    if source == "-" or source.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    if os.path.isdir(source):
+        return "dir"
+    with open(source, "rb") as f:
+        return "mbox" if f.read(5) == b"From " else "ndjson"
+
+
+def iter_source(source: str, source_format: str) -> Iterator[BulkItem]:
+    if source_format == "dir":
+        items = iter_directory(source)
+    elif source_format == "mbox":
+        items = iter_mbox(source)
+    else:
+        items = iter_ndjson(source)
+    for index, (item_id, text, error) in enumerate(items):
+        yield index, item_id, text, error
+
+
+# Classificador do processo worker. Com fork ele é herdado do processo pai já
+# carregado (o léxico é compartilhado por copy-on-write); com spawn cada
+# worker carrega o léxico pré-compilado uma vez.
+_worker_classifier: Optional[EmailClassifier] = None
+
+
+def _create_classifier(lexicon_path: str, scoring_mode: Optional[str] = None) -> EmailClassifier:
+    lexicon = None
+    if os.path.exists(lexicon_path):
+        try:
+            lexicon = CompiledLexicon.load(lexicon_path)
+        except Exception as e:
+            print(f"⚠️  Não foi possível carregar o léxico pré-compilado: {e}", file=sys.stderr)
+    # Emails de uma exportação raramente se repetem: sem cache de resultados
+    return EmailClassifier(result_cache_size=0, lexicon=lexicon, scoring_mode=scoring_mode)
+
+
+def _init_worker(lexicon_path: str, scoring_mode: Optional[str] = None) -> None:
+    global _worker_classifier
+    if _worker_classifier is None or (scoring_mode and _worker_classifier.scoring_mode != scoring_mode):
+        _worker_classifier = _create_classifier(lexicon_path, scoring_mode)
+
+
+def _classify_chunk(chunk: List[BulkItem]) -> List[BulkResult]:
+    valid = [item for item in chunk if item[3] is None]
+    scores = iter(_worker_classifier.classify_many_detailed([text for _, _, text, _ in valid]))
+    results = []
+    for index, item_id, _, error in chunk:
+        if error is not None:
+            results.append((index, item_id, None, None, None, error))
+        else:
+            category, confidence, tokens_scored = next(scores)
+            results.append((index, item_id, category, confidence, tokens_scored, None))
+    return results
+
+
+def _chunks(items: Iterable[BulkItem], size: int) -> Iterator[List[BulkItem]]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def classify_bulk(items: Iterable[BulkItem], workers: Optional[int] = None,
+                  chunk_size: int = BULK_CHUNK_SIZE,
+                  lexicon_path: str = DEFAULT_LEXICON_PATH,
+                  scoring_mode: Optional[str] = None) -> Iterator[List[BulkResult]]:
+    """
+    Classifica ``items`` em paralelo e devolve os lotes de resultados na
+    ordem de entrada. No máximo ``2 * workers`` lotes ficam em processamento,
+    então a memória não cresce com o tamanho da entrada.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = _chunks(items, chunk_size)
+
+    if workers == 1:
+        _init_worker(lexicon_path, scoring_mode)
+        for chunk in chunks:
+            yield _classify_chunk(chunk)
+        return
+
+    methods = multiprocessing.get_all_start_methods()
+    if "fork" in methods:
+        # Carrega uma vez no pai; os workers herdam o classificador pronto
+        _init_worker(lexicon_path, scoring_mode)
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context("spawn")
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(lexicon_path, scoring_mode)) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_classify_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class ResultWriter:
+    """
+    Escreve resultados em NDJSON ou CSV e registra checkpoints atômicos com
+    o número de emails gravados e o tamanho da saída naquele ponto.
+    """
+
+    def __init__(self, output: Optional[str], output_format: str,
+                 checkpoint: Optional[str], source: str, resume: bool):
+        self.output_format = output_format
+        self.checkpoint = checkpoint
+        self.source = os.path.abspath(source) if source != "-" else source
+        self.processed = 0
+
+        offset = 0
+        if resume and checkpoint and os.path.exists(checkpoint):
+            with open(checkpoint) as f:
+                state = json.load(f)
+            if state.get("source") != self.source or state.get("output") != output:
+                raise ValueError("O checkpoint pertence a outra entrada ou saída")
+            self.processed = state["processed"]
+            offset = state["output_bytes"]
+
+        if output is None:
+            if self.processed:
+                raise ValueError("Retomar exige --output")
+            self.stream = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", newline="")
+        else:
+            mode = "r+b" if offset else "wb"
+            raw = open(output, mode)
+            # Descarta o que foi escrito depois do último checkpoint
+            raw.seek(offset)
+            raw.truncate()
+            self.stream = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+        self.output = output
+
+        self._csv = None
+        if output_format == "csv":
+            self._csv = csv.writer(self.stream)
+            if not offset:
+                self._csv.writerow(CSV_FIELDS)
+
+    def write(self, results: List[BulkResult]) -> None:
+        for index, item_id, category, confidence, tokens_scored, error in results:
+            if self._csv is not None:
+                self._csv.writerow([index, item_id, category, confidence, tokens_scored, error])
+            else:
+                row = {"index": index, "id": item_id, "category": category,
+                       "confidence": confidence, "tokens_scored": tokens_scored}
+                if error is not None:
+                    row["error"] = error
+                self.stream.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self.processed += len(results)
+        self._save_checkpoint()
+
+    def _save_checkpoint(self) -> None:
+        self.stream.flush()
+        if not self.checkpoint or self.output is None:
+            return
+        state = {
+            "source": self.source,
+            "output": self.output,
+            "processed": self.processed,
+            "output_bytes": self.stream.buffer.tell(),
+        }
+        temp_path = self.checkpoint + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(temp_path, self.checkpoint)
+
+    def close(self) -> None:
+        self.stream.flush()
+        if self.output is not None:
+            self.stream.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Classificação em massa de emails")
+    parser.add_argument("source", help="Diretório, arquivo mbox ou NDJSON ('-' para stdin)")
+    parser.add_argument("--input-format", choices=["dir", "mbox", "ndjson"], help="Detectado se omitido")
+    parser.add_argument("--output", help="Arquivo de saída (stdout se omitido)")
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=BULK_CHUNK_SIZE)
+    parser.add_argument("--checkpoint", help="Arquivo de checkpoint para retomar execuções")
+    parser.add_argument("--resume", action="store_true", help="Continua a partir do checkpoint")
+    parser.add_argument("--lexicon", default=DEFAULT_LEXICON_PATH)
+    parser.add_argument("--scoring-mode", choices=SCORING_MODES,
+                        help="early_exit ignora histórico citado e para de pontuar quando a categoria não muda mais")
+    args = parser.parse_args()
+
+    source_format = args.input_format or detect_format(args.source)
+    try:
+        writer = ResultWriter(args.output, args.format, args.checkpoint, args.source, args.resume)
+    except ValueError as e:
+        parser.error(str(e))
+
+    skip = writer.processed
+    if skip:
+        print(f"📦 Retomando após {skip} emails", file=sys.stderr)
+    items = (item for item in iter_source(args.source, source_format) if item[0] >= skip)
+
+    started = last_report = time.perf_counter()
+    done = 0
+    try:
+        for results in classify_bulk(items, args.workers, args.chunk_size, args.lexicon, args.scoring_mode):
+            writer.write(results)
+            done += len(results)
+            now = time.perf_counter()
+            if now - last_report >= BULK_PROGRESS_SECONDS:
+                last_report = now
+                print(f"   {skip + done} emails ({done / (now - started):.0f}/s)", file=sys.stderr)
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ {done} emails classificados em {elapsed:.1f}s "
+          f"({done / elapsed if elapsed else 0:.0f}/s, {args.workers} workers)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+"""
+Gera o artefato do léxico compilado usado no startup dos workers.
+
+Uso (a partir de apps/backend/src):
+    python -m classifiers.build_lexicon [caminho_de_saida]
+"""
+import sys
+
+from .lexicon import DEFAULT_LEXICON_PATH
+from .nlp_classifier import EmailClassifier
+
+
+def main() -> None:
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_LEXICON_PATH
+    classifier = EmailClassifier(result_cache_size=0)
+    classifier.lexicon.save(path)
+    print(f"✅ Léxico compilado salvo em {path} (versão {classifier.lexicon_version}, "
+          f"{len(classifier.lexicon.table)} n-grams)")
+
+
+if __name__ == "__main__":
+    main()
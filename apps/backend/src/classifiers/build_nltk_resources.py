@@ -0,0 +1,41 @@
+"""
+Passo de build: pré-computa os recursos do NLTK usados pelo classificador
+(stopwords em português e regras do RSLP) no módulo classifiers/_nltk_bundle.py,
+para que o runtime não leia o NLTK nem acesse a rede.
+
+Uso (a partir de apps/backend/src; pode baixar os recursos no build):
+    python -m classifiers.build_nltk_resources
+"""
+import os
+import tempfile
+
+BUNDLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "_nltk_bundle.py")
+
+
+def main() -> None:
+    import nltk
+    from nltk.corpus import stopwords
+    from nltk.stem import RSLPStemmer
+
+    download_dir = os.path.join(tempfile.gettempdir(), "nltk_data")
+    nltk.data.path.append(download_dir)
+    for resource, package in (('corpora/stopwords', 'stopwords'), ('stemmers/rslp', 'rslp')):
+        try:
+            nltk.data.find(resource)
+        except LookupError:
+            nltk.download(package, download_dir=download_dir, quiet=True)
+
+    stop_words = sorted(set(stopwords.words('portuguese')))
+    rules = RSLPStemmer()._model
+
+    with open(BUNDLE_PATH, "w", encoding="utf-8") as f:
+        f.write("# Gerado por classifiers/build_nltk_resources.py. Não editar.\n")
+        f.write(f"# NLTK {nltk.__version__}\n\n")
+        f.write(f"STOPWORDS = frozenset({stop_words!r})\n\n")
+        f.write(f"RSLP_RULES = {rules!r}\n")
+    print(f"✅ Recursos do NLTK salvos em {BUNDLE_PATH} "
+          f"({len(stop_words)} stopwords, {sum(len(step) for step in rules)} regras RSLP)")
+
+
+if __name__ == "__main__":
+    main()
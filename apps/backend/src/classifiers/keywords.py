@@ -0,0 +1,91 @@
+"""
+Palavras-chave do classificador, lidas de um arquivo JSON versionado
+(classifiers/data/keywords.json ou KEYWORDS_PATH). Formato:
+
+    {
+      "version": "1",
+      "weights": {"unigram": 1.0, "bigram": 2.0, "trigram": 3.0},
+      "produtivo":   {"keywords": [...], "bigrams": [...], "trigrams": [...]},
+      "improdutivo": {"keywords": [...], "bigrams": [...], "trigrams": [...]}
+    }
+
+A ordem de "keywords" importa: palavras consecutivas também formam
+bigramas e trigramas, como nas listas originais.
+"""
+import json
+import os
+from typing import Dict, List, Sequence, Set, Tuple
+
+DEFAULT_KEYWORDS_PATH = os.getenv("KEYWORDS_PATH") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "data", "keywords.json"
+)
+
+CLASSES = ("produtivo", "improdutivo")
+DEFAULT_WEIGHTS = {"unigram": 1.0, "bigram": 2.0, "trigram": 3.0}
+
+# (unigramas, bigramas, trigramas)
+NgramSets = Tuple[Set[str], Set[str], Set[str]]
+
+
+class KeywordSet:
+    """
+    Conjuntos de n-grams de cada classe, com a versão e os pesos do arquivo.
+    """
+
+    def __init__(self, version: str, produtivo: NgramSets, improdutivo: NgramSets,
+                 weights: Dict[str, float]):
+        self.version = version
+        self.produtivo = produtivo
+        self.improdutivo = improdutivo
+        self.weights = weights
+
+
+def create_ngrams_from_list(word_list: Sequence[str], n: int) -> Set[str]:
+    return {' '.join(word_list[i:i + n]) for i in range(len(word_list) - n + 1)}
+
+
+def _string_list(data: dict, field: str, where: str) -> List[str]:
+    values = data.get(field, [])
+    if not isinstance(values, list) or not all(isinstance(value, str) and value.strip() for value in values):
+        raise ValueError(f"'{where}.{field}' deve ser uma lista de textos não vazios")
+    return [value.strip() for value in values]
+
+
+def parse_keywords(data: dict) -> KeywordSet:
+    """
+    Valida o conteúdo do arquivo e monta os conjuntos de n-grams.
+    Levanta ValueError se o arquivo estiver inválido.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("O arquivo de palavras-chave deve conter um objeto JSON")
+    version = data.get("version")
+    if not isinstance(version, (str, int)) or str(version).strip() == "":
+        raise ValueError("Campo 'version' ausente ou inválido")
+
+    weights = dict(DEFAULT_WEIGHTS)
+    for level, weight in (data.get("weights") or {}).items():
+        if level not in DEFAULT_WEIGHTS or not isinstance(weight, (int, float)) or weight < 0:
+            raise ValueError(f"Peso inválido: {level}={weight!r}")
+        weights[level] = float(weight)
+
+    ngram_sets = []
+    for name in CLASSES:
+        section = data.get(name)
+        if not isinstance(section, dict):
+            raise ValueError(f"Seção '{name}' ausente")
+        keywords = _string_list(section, "keywords", name)
+        ngram_sets.append((
+            set(keywords),
+            create_ngrams_from_list(keywords, 2) | set(_string_list(section, "bigrams", name)),
+            create_ngrams_from_list(keywords, 3) | set(_string_list(section, "trigrams", name)),
+        ))
+    return KeywordSet(str(version).strip(), ngram_sets[0], ngram_sets[1], weights)
+
+
+def load_keywords(path: str = DEFAULT_KEYWORDS_PATH) -> KeywordSet:
+    with open(path, encoding="utf-8") as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"JSON inválido em {path}: {e}")
+    return parse_keywords(data)
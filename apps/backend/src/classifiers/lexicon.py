@@ -0,0 +1,289 @@
+import hashlib
+import os
+import pickle
+from typing import Dict, Iterable, List, Sequence, Set, Tuple
+
+LEXICON_FORMAT = 2
+
+DEFAULT_LEXICON_PATH = os.getenv(
+    "LEXICON_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "lexicon.pkl")
+)
+
+# Ordem dos n-grams: (nível do peso, tamanho do n-gram)
+NGRAM_LEVELS = (('unigram', 1), ('bigram', 2), ('trigram', 3))
+
+
+class ScoreState:
+    """
+    Estado acumulado de uma pontuação incremental: scores, acertos, os dois
+    últimos IDs vistos (para n-grams que cruzam partes) e tokens pontuados.
+    """
+
+    __slots__ = ("produtivo_score", "improdutivo_score", "produtivo_hits",
+                 "improdutivo_hits", "prev1", "prev2", "tokens")
+
+    def __init__(self):
+        self.produtivo_score = 0.0
+        self.improdutivo_score = 0.0
+        self.produtivo_hits = 0
+        self.improdutivo_hits = 0
+        self.prev1 = 0
+        self.prev2 = 0
+        self.tokens = 0
+
+    def totals(self) -> Tuple[float, float, int, int]:
+        return self.produtivo_score, self.improdutivo_score, self.produtivo_hits, self.improdutivo_hits
+
+
+class CompiledLexicon:
+    """
+    Léxico de n-grams compilado para pontuação em uma única passada.
+
+    Cada palavra do léxico recebe um ID inteiro (a partir de 1; 0 significa
+    "fora do léxico") e cada n-gram vira uma chave inteira numa única tabela
+    hash, calculada como ``(a * base + b) * base + c``. Com IDs em [1, base),
+    unigramas, bigramas e trigramas ocupam faixas de chaves disjuntas, então
+    não há colisão entre níveis e nenhuma string é montada na pontuação.
+
+    Os valores da tabela são ``(peso produtivo, peso improdutivo,
+    acerto produtivo, acerto improdutivo)``.
+    """
+
+    def __init__(self, stem_ids: Dict[str, int], table: Dict[int, Tuple[float, float, int, int]],
+                 weights: Dict[str, float], source_digest: str = "", version: str = ""):
+        self.stem_ids = stem_ids
+        self.table = table
+        self.weights = dict(weights)
+        self.base = len(stem_ids) + 1
+        self.source_digest = source_digest
+        # Versão do arquivo de palavras-chave de origem (classifiers.keywords)
+        self.version = version
+        self.max_gain_per_token = self._max_gain_per_token()
+
+    @staticmethod
+    def digest_sources(produtivo: Sequence[Set[str]], improdutivo: Sequence[Set[str]],
+                       weights: Dict[str, float], version: str = "") -> str:
+        """
+        Impressão digital das listas de palavras-chave e pesos de origem,
+        usada para detectar um artefato compilado desatualizado.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for ngram_sets in (produtivo, improdutivo):
+            for ngram_set in ngram_sets:
+                digest.update('\n'.join(sorted(ngram_set)).encode('utf-8'))
+                digest.update(b'\x00')
+        digest.update(repr(sorted(weights.items())).encode('utf-8'))
+        digest.update(version.encode('utf-8'))
+        return digest.hexdigest()
+
+    @classmethod
+    def compile(cls, produtivo: Sequence[Set[str]], improdutivo: Sequence[Set[str]],
+                weights: Dict[str, float], version: str = "") -> "CompiledLexicon":
+        """
+        Compila os conjuntos (unigramas, bigramas, trigramas) de cada classe.
+        Uma entrada cujo número de palavras não corresponde ao nível (ex.:
+        'prazo de entrega' entre os bigramas) não soma peso, mas o desempate
+        de classify_with_rules conta o n-gram em qualquer nível da classe:
+        ela fica no tamanho real, com peso zero e o acerto marcado. Entradas
+        com mais de três palavras nunca casam e são descartadas.
+        """
+        entries: Dict[Tuple[str, ...], List[float]] = {}
+        for class_index, ngram_sets in enumerate((produtivo, improdutivo)):
+            for (level, size), ngram_set in zip(NGRAM_LEVELS, ngram_sets):
+                for ngram in ngram_set:
+                    words = tuple(ngram.split(' '))
+                    if len(words) > len(NGRAM_LEVELS) or '' in words:
+                        continue
+                    entry = entries.setdefault(words, [0.0, 0.0, 0, 0])
+                    if len(words) == size:
+                        entry[class_index] = weights[level]
+                    entry[class_index + 2] = 1
+
+        stem_ids: Dict[str, int] = {}
+        for words in sorted(entries):
+            for word in words:
+                if word not in stem_ids:
+                    stem_ids[word] = len(stem_ids) + 1
+
+        base = len(stem_ids) + 1
+        table = {}
+        for words, entry in sorted(entries.items()):
+            key = 0
+            for word in words:
+                key = key * base + stem_ids[word]
+            table[key] = tuple(entry)
+        return cls(stem_ids, table, weights, cls.digest_sources(produtivo, improdutivo, weights, version), version)
+
+    def score(self, tokens: Iterable[str]) -> Tuple[float, float, int, int]:
+        """
+        Pontua uma sequência de stems numa única passada.
+        Retorna (score produtivo, score improdutivo, acertos produtivos, acertos improdutivos).
+        """
+        return self.update(ScoreState(), tokens).totals()
+
+    def update(self, state: "ScoreState", tokens: Iterable[str]) -> "ScoreState":
+        """
+        Continua a pontuação de ``state`` com mais stems. Os dois últimos IDs
+        ficam no estado, então n-grams que cruzam a emenda entre as partes
+        são contados como se o texto tivesse sido pontuado de uma vez.
+        """
+        stem_ids = self.stem_ids
+        table = self.table
+        base = self.base
+        produtivo_score = state.produtivo_score
+        improdutivo_score = state.improdutivo_score
+        produtivo_hits = state.produtivo_hits
+        improdutivo_hits = state.improdutivo_hits
+        prev1 = state.prev1
+        prev2 = state.prev2
+        count = 0
+        for token in tokens:
+            count += 1
+            token_id = stem_ids.get(token, 0)
+            if token_id:
+                hit = table.get(token_id)
+                if hit is not None:
+                    produtivo_score += hit[0]
+                    improdutivo_score += hit[1]
+                    produtivo_hits += hit[2]
+                    improdutivo_hits += hit[3]
+                if prev1:
+                    key = prev1 * base + token_id
+                    hit = table.get(key)
+                    if hit is not None:
+                        produtivo_score += hit[0]
+                        improdutivo_score += hit[1]
+                        produtivo_hits += hit[2]
+                        improdutivo_hits += hit[3]
+                    if prev2:
+                        hit = table.get((prev2 * base + prev1) * base + token_id)
+                        if hit is not None:
+                            produtivo_score += hit[0]
+                            improdutivo_score += hit[1]
+                            produtivo_hits += hit[2]
+                            improdutivo_hits += hit[3]
+            prev2, prev1 = prev1, token_id
+        state.produtivo_score = produtivo_score
+        state.improdutivo_score = improdutivo_score
+        state.produtivo_hits = produtivo_hits
+        state.improdutivo_hits = improdutivo_hits
+        state.prev1 = prev1
+        state.prev2 = prev2
+        state.tokens += count
+        return state
+
+    def explain(self, tokens: Sequence[str]) -> Tuple[Tuple[float, float, int, int], Dict[Tuple[str, int], list]]:
+        """
+        Como score(), devolvendo também os n-grams que casaram:
+        (n-gram, tamanho) -> [ocorrências, peso produtivo, peso improdutivo].
+        """
+        stem_ids = self.stem_ids
+        table = self.table
+        base = self.base
+        ids = [stem_ids.get(token, 0) for token in tokens]
+        totals = [0.0, 0.0, 0, 0]
+        matches: Dict[Tuple[str, int], list] = {}
+        for position, token_id in enumerate(ids):
+            key = 0
+            # Unigrama, bigrama e trigrama que terminam neste token
+            for size in (1, 2, 3):
+                start = position - size + 1
+                if start < 0 or not ids[start]:
+                    break
+                key = ids[start] * base ** (size - 1) + key
+                hit = table.get(key)
+                if hit is None:
+                    continue
+                for column in range(4):
+                    totals[column] += hit[column]
+                if not hit[0] and not hit[1]:
+                    # Só conta no desempate
+                    continue
+                match = matches.setdefault((' '.join(tokens[start:position + 1]), size), [0, 0.0, 0.0])
+                match[0] += 1
+                match[1] += hit[0]
+                match[2] += hit[1]
+        return (totals[0], totals[1], totals[2], totals[3]), matches
+
+    def _max_gain_per_token(self) -> float:
+        """
+        Maior pontuação que um único token pode somar a uma classe
+        (unigrama + bigrama + trigrama que terminam nele).
+        """
+        best = {1: 0.0, 2: 0.0, 3: 0.0}
+        for key, hit in self.table.items():
+            size = 1 if key < self.base else 2 if key < self.base ** 2 else 3
+            best[size] = max(best[size], hit[0], hit[1])
+        return sum(best.values())
+
+    def score_many(self, token_lists: Sequence[Sequence[str]]) -> tuple:
+        """
+        Pontua um lote: todos os acertos vão para vetores únicos, reduzidos
+        por documento com numpy.bincount.
+        """
+        # Import tardio: o numpy só é necessário no caminho em lote
+        import numpy as np
+
+        stem_ids = self.stem_ids
+        table = self.table
+        base = self.base
+        hit_docs = []
+        hits = []
+        for position, tokens in enumerate(token_lists):
+            prev1 = prev2 = 0
+            for token in tokens:
+                token_id = stem_ids.get(token, 0)
+                if token_id:
+                    hit = table.get(token_id)
+                    if hit is not None:
+                        hit_docs.append(position)
+                        hits.append(hit)
+                    if prev1:
+                        key = prev1 * base + token_id
+                        hit = table.get(key)
+                        if hit is not None:
+                            hit_docs.append(position)
+                            hits.append(hit)
+                        if prev2:
+                            hit = table.get((prev2 * base + prev1) * base + token_id)
+                            if hit is not None:
+                                hit_docs.append(position)
+                                hits.append(hit)
+                prev2, prev1 = prev1, token_id
+
+        size = len(token_lists)
+        doc_index = np.asarray(hit_docs, dtype=np.intp)
+        matrix = np.asarray(hits, dtype=np.float64).reshape(-1, 4)
+        return tuple(
+            np.bincount(doc_index, weights=matrix[:, column], minlength=size)
+            for column in range(4)
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "format": LEXICON_FORMAT,
+            "stem_ids": self.stem_ids,
+            "table": self.table,
+            "weights": self.weights,
+            "source_digest": self.source_digest,
+            "version": self.version,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CompiledLexicon":
+        if data.get("format") != LEXICON_FORMAT:
+            raise ValueError(f"Formato de léxico não suportado: {data.get('format')}")
+        return cls(data["stem_ids"], data["table"], data["weights"], data.get("source_digest", ""),
+                   data.get("version", ""))
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "wb") as f:
+            pickle.dump(self.to_dict(), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path: str) -> "CompiledLexicon":
+        # Artefato gerado pelo próprio build (save); não carregar arquivos de terceiros
+        with open(path, "rb") as f:
+            return cls.from_dict(pickle.load(f))
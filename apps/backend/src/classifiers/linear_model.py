@@ -0,0 +1,240 @@
+"""
+Classificador linear sobre n-grams com hashing de features.
+
+Unigramas, bigramas e trigramas dos stems (os mesmos tokens do
+classificador por regras) são mapeados por hash para um vetor esparso de
+tamanho fixo e pontuados por uma regressão logística guardada como array
+NumPy. Um lote vira um único produto esparso × denso: o numpy não tem
+matrizes esparsas, então a matriz fica em coordenadas (documento, feature,
+valor) e o produto é um ``np.bincount`` ponderado.
+
+Treino offline: ``python -m classifiers.train_linear emails.csv``.
+"""
+import os
+import time
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+LINEAR_MODEL_FORMAT = 1
+
+DEFAULT_LINEAR_MODEL_PATH = os.getenv("LINEAR_MODEL_PATH") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "data", "linear_model.npz"
+)
+LINEAR_FEATURES = int(os.getenv("LINEAR_FEATURES", 2 ** 18))
+
+# Constantes de mistura (64 bits) para combinar os hashes dos tokens
+_PRIME = np.uint64(0x100000001B3)
+_MIX = np.uint64(0xBF58476D1CE4E5B9)
+_BIGRAM_SALT = np.uint64(0x9E3779B97F4A7C15)
+_TRIGRAM_SALT = np.uint64(0xC2B2AE3D27D4EB4F)
+_SHIFT_A = np.uint64(31)
+_SHIFT_B = np.uint64(29)
+
+SparseRows = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def _mix(keys: np.ndarray) -> np.ndarray:
+    keys = (keys ^ (keys >> _SHIFT_A)) * _MIX
+    return keys ^ (keys >> _SHIFT_B)
+
+
+def _hashed_ngrams(token_lists: Sequence[Sequence[str]], n_features: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (documento, feature) de cada n-gram: todos os unigramas, depois os
+    bigramas e os trigramas, na ordem do texto. O hash (crc32) é estável
+    entre processos.
+    """
+    lengths = np.fromiter((len(tokens) for tokens in token_lists), dtype=np.int64, count=len(token_lists))
+    total = int(lengths.sum())
+    hashes = np.fromiter(
+        (zlib.crc32(token.encode('utf-8')) for tokens in token_lists for token in tokens),
+        dtype=np.uint64, count=total
+    )
+    docs = np.repeat(np.arange(len(token_lists), dtype=np.int64), lengths)
+
+    # N-grams só dentro do mesmo documento
+    same_bigram = docs[1:] == docs[:-1]
+    same_trigram = docs[2:] == docs[:-2]
+    with np.errstate(over='ignore'):
+        bigrams = (hashes[:-1] * _PRIME + hashes[1:]) ^ _BIGRAM_SALT
+        trigrams = ((hashes[:-2] * _PRIME + hashes[1:-1]) * _PRIME + hashes[2:]) ^ _TRIGRAM_SALT
+        keys = _mix(np.concatenate((hashes, bigrams[same_bigram], trigrams[same_trigram])))
+    features = (keys % np.uint64(n_features)).astype(np.int64)
+    feature_docs = np.concatenate((docs, docs[1:][same_bigram], docs[2:][same_trigram]))
+    return feature_docs, features
+
+
+def hash_features(token_lists: Sequence[Sequence[str]], n_features: int) -> SparseRows:
+    """
+    Matriz esparsa (documentos × n_features) em coordenadas: devolve
+    (documento, feature, valor), com a contagem de cada n-gram normalizada
+    pela norma L2 do documento.
+    """
+    feature_docs, features = _hashed_ngrams(token_lists, n_features)
+    cells, counts = np.unique(feature_docs * n_features + features, return_counts=True)
+    row = cells // n_features
+    column = cells % n_features
+    counts = counts.astype(np.float64)
+    norms = np.sqrt(np.bincount(row, weights=counts * counts, minlength=len(token_lists)))
+    return row, column, counts / norms[row]
+
+
+class LinearState:
+    """
+    Estado acumulado de uma pontuação incremental: contagem de cada feature,
+    produto com os pesos, soma dos quadrados das contagens (para a norma L2)
+    e os dois últimos stems (para n-grams que cruzam partes).
+    """
+
+    __slots__ = ("counts", "dot", "sum_squares", "boundary", "tokens")
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.dot = 0.0
+        self.sum_squares = 0
+        self.boundary: List[str] = []
+        self.tokens = 0
+
+
+def _sigmoid(margins: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(margins, -30.0, 30.0)))
+
+
+class LinearModel:
+    """
+    Regressão logística binária: margem positiva = "Produtivo".
+    """
+
+    def __init__(self, weights: np.ndarray, bias: float, version: str = ""):
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = float(bias)
+        self.n_features = len(self.weights)
+        self.version = version
+
+    def margins(self, token_lists: Sequence[Sequence[str]]) -> np.ndarray:
+        row, column, values = hash_features(token_lists, self.n_features)
+        return np.bincount(row, weights=values * self.weights[column], minlength=len(token_lists)) + self.bias
+
+    def predict_many(self, token_lists: Sequence[Sequence[str]]) -> List[Tuple[str, float]]:
+        if not token_lists:
+            return []
+        probabilities = _sigmoid(self.margins(token_lists))
+        return [
+            ("Produtivo", float(p)) if p >= 0.5 else ("Improdutivo", float(1.0 - p))
+            for p in probabilities
+        ]
+
+    def predict(self, tokens: Sequence[str]) -> Tuple[str, float]:
+        return self.predict_many([tokens])[0]
+
+    def explain(self, tokens: Sequence[str]) -> Tuple[float, Dict[Tuple[str, int], list]]:
+        """
+        Margem do texto e a contribuição de cada n-gram para ela:
+        (n-gram, tamanho) -> [ocorrências, contribuição]. Contribuição
+        positiva puxa para "Produtivo".
+        """
+        _, features = _hashed_ngrams([tokens], self.n_features)
+        ngrams = [(token, 1) for token in tokens]
+        ngrams += [(' '.join(pair), 2) for pair in zip(tokens, tokens[1:])]
+        ngrams += [(' '.join(triple), 3) for triple in zip(tokens, tokens[1:], tokens[2:])]
+        _, feature_counts = np.unique(features, return_counts=True)
+        norm = float(np.sqrt(np.sum(feature_counts.astype(np.float64) ** 2))) or 1.0
+        weights = self.weights[features]
+        contributions: Dict[Tuple[str, int], list] = {}
+        margin = self.bias
+        for ngram, weight in zip(ngrams, weights.tolist()):
+            entry = contributions.setdefault(ngram, [0, 0.0])
+            entry[0] += 1
+            entry[1] += weight / norm
+            margin += weight / norm
+        return margin, contributions
+
+    def update(self, state: LinearState, tokens: Sequence[str]) -> LinearState:
+        """
+        Continua a pontuação de ``state`` com mais stems, com as mesmas
+        features de pontuar o texto inteiro de uma vez.
+        """
+        tokens = list(tokens)
+        joined = state.boundary + tokens
+        _, features = _hashed_ngrams([joined], self.n_features)
+        # Unigramas e o bigrama só da fronteira já foram contados
+        carried = len(state.boundary)
+        keep = np.ones(len(features), dtype=bool)
+        keep[:carried] = False
+        keep[len(joined):len(joined) + max(carried - 1, 0)] = False
+        new_features, new_counts = np.unique(features[keep], return_counts=True)
+        counts = state.counts
+        for feature, count, weight in zip(new_features.tolist(), new_counts.tolist(),
+                                          self.weights[new_features].tolist()):
+            previous = counts.get(feature, 0)
+            counts[feature] = previous + count
+            state.sum_squares += 2 * previous * count + count * count
+            state.dot += count * weight
+        state.boundary = joined[-2:]
+        state.tokens += len(tokens)
+        return state
+
+    def predict_state(self, state: LinearState) -> Tuple[str, float]:
+        margin = self.bias
+        if state.sum_squares:
+            margin += state.dot / float(np.sqrt(state.sum_squares))
+        p = self.probability(margin)
+        return ("Produtivo", p) if p >= 0.5 else ("Improdutivo", 1.0 - p)
+
+    def probability(self, margin: float) -> float:
+        return float(_sigmoid(np.array([margin]))[0])
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Arquivo aberto pelo chamador: o numpy não acrescenta ".npz" ao nome
+        with open(path, "wb") as f:
+            np.savez_compressed(
+                f, format=np.array(LINEAR_MODEL_FORMAT), weights=self.weights,
+                bias=np.array(self.bias), version=np.array(self.version)
+            )
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_LINEAR_MODEL_PATH) -> "LinearModel":
+        if not os.path.exists(path):
+            raise ValueError(
+                f"Modelo linear não encontrado em {path}. "
+                "Treine com: python -m classifiers.train_linear emails.csv"
+            )
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["format"]) != LINEAR_MODEL_FORMAT:
+                raise ValueError(f"Formato de modelo linear não suportado: {int(data['format'])}")
+            return cls(data["weights"], float(data["bias"]), str(data["version"]))
+
+
+def train_linear_model(token_lists: Sequence[Sequence[str]], labels: Sequence[str],
+                       n_features: int = LINEAR_FEATURES, epochs: int = 300,
+                       learning_rate: float = 0.5, l2: float = 1e-4,
+                       version: Optional[str] = None) -> LinearModel:
+    """
+    Treina a regressão logística com gradiente em lote completo (AdaGrad).
+    ``labels`` são "Produtivo" ou "Improdutivo".
+    """
+    if not token_lists:
+        raise ValueError("Nenhum exemplo para treinar")
+    target = np.array([1.0 if label == "Produtivo" else 0.0 for label in labels])
+    row, column, values = hash_features(token_lists, n_features)
+    size = len(token_lists)
+
+    weights = np.zeros(n_features)
+    bias = 0.0
+    weight_history = np.zeros(n_features)
+    bias_history = 0.0
+    for _ in range(epochs):
+        margins = np.bincount(row, weights=values * weights[column], minlength=size) + bias
+        error = _sigmoid(margins) - target
+        weight_grad = np.bincount(column, weights=values * error[row], minlength=n_features) / size
+        weight_grad += l2 * weights
+        bias_grad = float(error.mean())
+        weight_history += weight_grad * weight_grad
+        bias_history += bias_grad * bias_grad
+        weights -= learning_rate * weight_grad / (np.sqrt(weight_history) + 1e-8)
+        bias -= learning_rate * bias_grad / (bias_history ** 0.5 + 1e-8)
+
+    return LinearModel(weights, bias, version or time.strftime("%Y%m%d%H%M%S"))
@@ -0,0 +1,67 @@
+"""
+Mede o custo de startup do classificador em interpretadores novos, para
+acompanhar a evolução entre releases.
+
+Uso (a partir de apps/backend/src):
+    python -m classifiers.measure_startup [--runs N] [--output arquivo.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+_PROBE = """
+import json, time
+started = time.perf_counter()
+from classifiers import shared
+imported = time.perf_counter()
+shared.warm_up()
+ready = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "warm_up_ms": (ready - imported) * 1000,
+    "total_ms": (ready - started) * 1000,
+    "nltk_imported": "nltk" in __import__("sys").modules,
+}))
+"""
+
+
+def measure(runs: int) -> dict:
+    src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE], cwd=src_dir,
+            capture_output=True, text=True, check=True
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    report = {"runs": runs, "python": sys.version.split()[0]}
+    for key in ("import_ms", "warm_up_ms", "total_ms"):
+        values = [sample[key] for sample in samples]
+        report[key] = {
+            "median": round(statistics.median(values), 2),
+            "min": round(min(values), 2),
+            "max": round(max(values), 2),
+        }
+    report["nltk_imported"] = any(sample["nltk_imported"] for sample in samples)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Mede o tempo de startup do classificador")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="Salva o relatório JSON neste arquivo")
+    args = parser.parse_args()
+
+    report = measure(args.runs)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Índice de emails quase idênticos (avisos em massa, faturas de modelo,
+respostas automáticas) com MinHash e LSH.
+
+Cada email vira uma assinatura MinHash dos seus shingles (os trigramas de
+stems de extract_ngrams). A assinatura é dividida em faixas; emails que
+coincidem em alguma faixa são candidatos, e o candidato é aceito se a
+similaridade de Jaccard estimada passar do limiar. Um email aceito reutiliza
+a classificação e a resposta sugerida do grupo ("cluster") encontrado.
+"""
+import os
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+import numpy as np
+
+# Limiar de similaridade de Jaccard estimada para reutilizar um grupo
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", 0.8))
+# Grupos mantidos no índice (0 desativa) e validade de cada grupo
+NEAR_DUP_MAX_CLUSTERS = int(os.getenv("NEAR_DUP_MAX_CLUSTERS", 10000))
+NEAR_DUP_TTL_SECONDS = float(os.getenv("NEAR_DUP_TTL_SECONDS", 600))
+# Funções de hash da assinatura e faixas do LSH (linhas por faixa = permutações / faixas)
+NEAR_DUP_PERMUTATIONS = int(os.getenv("NEAR_DUP_PERMUTATIONS", 64))
+NEAR_DUP_BANDS = int(os.getenv("NEAR_DUP_BANDS", 16))
+
+# Emails muito curtos têm poucos shingles e a estimativa não é confiável
+MIN_SHINGLES = 5
+
+_PRIME = (1 << 31) - 1
+
+
+class Cluster:
+    """
+    Grupo de emails quase idênticos: a assinatura do primeiro email e o
+    resultado reutilizado pelos demais.
+    """
+
+    __slots__ = ("id", "signature", "category", "confidence", "suggested_response",
+                 "version", "expires_at", "matches")
+
+    def __init__(self, signature: np.ndarray, category: str, confidence: float,
+                 version: str, expires_at: float):
+        self.id = uuid.uuid4().hex
+        self.signature = signature
+        self.category = category
+        self.confidence = confidence
+        self.suggested_response: Optional[str] = None
+        self.version = version
+        self.expires_at = expires_at
+        self.matches = 0
+
+
+class NearDuplicateIndex:
+    """
+    Índice LSH limitado a ``max_clusters`` grupos, que expiram
+    ``ttl_seconds`` depois de criados (os mais antigos saem primeiro).
+    Thread-safe.
+    """
+
+    def __init__(self, threshold: float = NEAR_DUP_THRESHOLD, max_clusters: int = NEAR_DUP_MAX_CLUSTERS,
+                 ttl_seconds: float = NEAR_DUP_TTL_SECONDS, permutations: int = NEAR_DUP_PERMUTATIONS,
+                 bands: int = NEAR_DUP_BANDS, seed: int = 1):
+        if max_clusters <= 0:
+            raise ValueError("max_clusters deve ser positivo")
+        if permutations % bands:
+            raise ValueError("O número de permutações deve ser múltiplo do número de faixas")
+        self.threshold = threshold
+        self.max_clusters = max_clusters
+        self.ttl_seconds = ttl_seconds
+        self.bands = bands
+        self.rows = permutations // bands
+        # Permutações h(x) = (a * x + b) mod p, com p primo de 31 bits (sem overflow em 64 bits)
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _PRIME, size=(permutations, 1)).astype(np.uint64)
+        self._b = rng.randint(0, _PRIME, size=(permutations, 1)).astype(np.uint64)
+        self._clusters: "OrderedDict[str, Cluster]" = OrderedDict()
+        self._buckets: Dict[Tuple[int, bytes], Set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def signature(self, shingles: Iterable[str]) -> Optional[np.ndarray]:
+        """
+        Assinatura MinHash dos shingles, ou None se forem poucos.
+        """
+        hashes = np.fromiter((zlib.crc32(shingle.encode('utf-8')) % _PRIME for shingle in set(shingles)),
+                             dtype=np.uint64)
+        if len(hashes) < MIN_SHINGLES:
+            return None
+        return ((self._a * hashes + self._b) % np.uint64(_PRIME)).min(axis=1)
+
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def lookup(self, signature: np.ndarray, version: str = "") -> Optional[Tuple[Cluster, float]]:
+        """
+        Grupo mais parecido acima do limiar, com a similaridade estimada.
+        Grupos expirados ou de outra versão do classificador são ignorados.
+        """
+        now = time.time()
+        best: Optional[Tuple[Cluster, float]] = None
+        with self._lock:
+            candidates = set()
+            for key in self._band_keys(signature):
+                candidates.update(self._buckets.get(key, ()))
+            for cluster_id in candidates:
+                cluster = self._clusters[cluster_id]
+                if cluster.expires_at <= now or cluster.version != version:
+                    continue
+                similarity = float(np.mean(cluster.signature == signature))
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (cluster, similarity)
+            if best is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                best[0].matches += 1
+        return best
+
+    def add(self, signature: np.ndarray, category: str, confidence: float, version: str = "") -> Cluster:
+        now = time.time()
+        cluster = Cluster(signature, category, confidence, version, now + self.ttl_seconds)
+        with self._lock:
+            # Inserção em ordem de criação: expirados e excedentes estão no início
+            while self._clusters:
+                oldest = next(iter(self._clusters.values()))
+                if oldest.expires_at > now and len(self._clusters) < self.max_clusters:
+                    break
+                self._remove(oldest)
+                self.evictions += 1
+            self._clusters[cluster.id] = cluster
+            for key in self._band_keys(signature):
+                self._buckets.setdefault(key, set()).add(cluster.id)
+        return cluster
+
+    def attach_response(self, cluster_id: str, suggested_response: str) -> None:
+        with self._lock:
+            cluster = self._clusters.get(cluster_id)
+            if cluster is not None and cluster.suggested_response is None:
+                cluster.suggested_response = suggested_response
+
+    def _remove(self, cluster: Cluster) -> None:
+        del self._clusters[cluster.id]
+        for key in self._band_keys(cluster.signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(cluster.id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clusters.clear()
+            self._buckets.clear()
+
+    def __len__(self) -> int:
+        return len(self._clusters)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._clusters),
+                "maxsize": self.max_clusters,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -1,52 +1,181 @@
-import nltk
 import os
-from nltk.corpus import stopwords
-from nltk.stem import RSLPStemmer
-from nltk.util import ngrams
 import re
-from typing import Tuple, List, Set
+import time
+import hashlib
+import logging
+from functools import lru_cache
+from typing import Tuple, List, Optional
 
-# ========== CONFIGURAÇÃO NLTK PARA VERCEL ==========
-# Configurar NLTK para usar diretório temporário no Vercel
-nltk_data_path = '/tmp/nltk_data'
+from .cache import LRUCache
+from .keywords import DEFAULT_KEYWORDS_PATH, KeywordSet, load_keywords
+from .lexicon import CompiledLexicon, ScoreState
+from .observer import NULL_OBSERVER
+from .threads import ThreadState
+from .reply_cleaner import find_quote_start, iter_text_chunks, strip_reply_history
+from .resources import RSLPStemmer, load_stopwords, tokenize_words, word_tokenize
 
-# Adiciona o caminho do temp ao path do NLTK
-nltk.data.path.append(nltk_data_path)
+STEM_CACHE_SIZE = int(os.getenv("STEM_CACHE_SIZE", 50000))
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", 10000))
+# "full" pontua o texto inteiro; "early_exit" remove histórico citado e
+# assinatura e pontua em blocos, parando quando a categoria não pode mais mudar
+SCORING_MODE = os.getenv("SCORING_MODE", "full")
+EARLY_EXIT_TOKEN_BUDGET = int(os.getenv("EARLY_EXIT_TOKEN_BUDGET", 400))
+EARLY_EXIT_CHUNK_CHARS = int(os.getenv("EARLY_EXIT_CHUNK_CHARS", 1000))
+SCORING_MODES = ("full", "early_exit")
+# "rules" pontua pelo léxico de palavras-chave; "linear" usa o modelo treinado
+# por classifiers.train_linear (features de n-grams por hashing)
+CLASSIFIER_BACKEND = os.getenv("CLASSIFIER_BACKEND", "rules")
+BACKENDS = ("rules", "linear")
+# N-grams listados por explain(), os de maior contribuição primeiro
+EXPLAIN_MAX_MATCHES = int(os.getenv("EXPLAIN_MAX_MATCHES", 50))
+NGRAM_LEVEL_NAMES = {1: "unigram", 2: "bigram", 3: "trigram"}
+# Formato de result_key(); muda quando o texto que entra na chave muda
+RESULT_KEY_FORMAT = 2
 
-# Tenta criar o diretório (pode falhar em alguns ambientes, mas tenta mesmo assim)
-try:
-    os.makedirs(nltk_data_path, exist_ok=True)
-except:
-    pass
+logger = logging.getLogger(__name__)
 
-# Download NLTK
-nltk_resources = ['punkt', 'stopwords', 'rslp']
-for resource in nltk_resources:
-    try:
-        if resource == 'punkt':
-            nltk.data.find(f'tokenizers/{resource}')
+
+def _chunk_tokens(chunks: Optional[List[Tuple[str, Optional[List[str]]]]]) -> Optional[List[str]]:
+    # Stems das partes pré-processadas de scoring_chunks(), em ordem (as demais
+    # ficam além do orçamento de tokens)
+    if chunks is None:
+        return None
+    return [token for _, tokens in chunks if tokens is not None for token in tokens]
+
+
+class StreamingClassification:
+    """
+    Classificação incremental de um texto que chega em partes (ex.: páginas
+    de um PDF). Cada parte é pré-processada e pontuada ao chegar, e feed()
+    devolve True quando não vale mais ler: o orçamento de caracteres ou de
+    tokens acabou, ou a diferença de scores já não pode inverter a categoria
+    com os tokens que ainda cabem no orçamento. Com ``stop_at_quote`` a
+    leitura também para no início do histórico citado ("Em ... escreveu:").
+    """
+    
+    def __init__(self, classifier: "EmailClassifier", char_budget: int = 0, token_budget: int = 0,
+                 stop_at_quote: bool = False):
+        self.classifier = classifier
+        self.char_budget = char_budget
+        self.token_budget = token_budget
+        self.stop_at_quote = stop_at_quote
+        # Mesma versão do léxico do começo ao fim, mesmo se houver recarga no meio
+        self.lexicon = classifier.lexicon
+        # Stems lidos, reaproveitáveis depois (ex.: shingles do índice de quase-duplicados);
+        # no backend linear eles são pontuados em result()
+        self.model = classifier.linear_model
+        self.tokens: List[str] = []
+        self.state = ScoreState()
+        self.chars = 0
+        self.stop_reason: Optional[str] = None
+        self.preprocess_seconds = 0.0
+        self.scoring_seconds = 0.0
+    
+    @property
+    def tokens_scored(self) -> int:
+        return self.state.tokens
+    
+    def feed(self, text: str, tokens: Optional[List[str]] = None) -> bool:
+        """
+        ``tokens`` são os stems de ``text`` já calculados; só valem se a parte
+        couber inteira no orçamento de caracteres e não houver corte na citação.
+        """
+        if self.stop_reason is not None:
+            return True
+        if self.char_budget and len(text) > self.char_budget - self.chars:
+            text = text[:self.char_budget - self.chars]
+            tokens = None
+        quote_start = find_quote_start(text) if self.stop_at_quote else -1
+        if quote_start >= 0:
+            text = text[:quote_start]
+            tokens = None
+        self.chars += len(text)
+        
+        started = time.perf_counter()
+        if tokens is None:
+            tokens = self.classifier.preprocess_tokens(text)
+        if self.token_budget:
+            tokens = tokens[:self.token_budget - self.state.tokens]
+        scored = time.perf_counter()
+        self.tokens.extend(tokens)
+        if self.model is not None:
+            self.state.tokens += len(tokens)
         else:
-            nltk.data.find(f'corpora/{resource}')
-        print(f"✅ Recurso NLTK '{resource}' já disponível em {nltk_data_path}")
-    except LookupError:
-        print(f"⚠️  Recurso NLTK '{resource}' não encontrado, tentando baixar...")
-        try:
-            # Tenta baixar para o diretório temp
-            nltk.download(resource, download_dir=nltk_data_path, quiet=True)
-            print(f"✅ Recurso NLTK '{resource}' baixado com sucesso")
-        except Exception as e:
-            print(f"❌ Não foi possível baixar o recurso '{resource}': {e}")
-            print("📦 Continuando sem este recurso do NLTK...")
+            self.lexicon.update(self.state, tokens)
+        self.preprocess_seconds += scored - started
+        self.scoring_seconds += time.perf_counter() - scored
+        
+        self.stop_reason = "quoted_reply" if quote_start >= 0 else self._stop_reason()
+        return self.stop_reason is not None
+    
+    def _stop_reason(self) -> Optional[str]:
+        if self.char_budget and self.chars >= self.char_budget:
+            return "char_budget"
+        if self.token_budget and self.state.tokens >= self.token_budget:
+            return "token_budget"
+        
+        # Limite superior de tokens que ainda podem ser pontuados (cada token tem 3+ caracteres)
+        remaining = []
+        if self.char_budget:
+            remaining.append((self.char_budget - self.chars) // 3 + 1)
+        if self.token_budget:
+            remaining.append(self.token_budget - self.state.tokens)
+        if not remaining or self.model is not None:
+            return None
+        margin = abs(self.state.produtivo_score - self.state.improdutivo_score)
+        if margin > self.lexicon.max_gain_per_token * min(remaining):
+            return "stable_margin"
+        return None
+    
+    def result(self) -> Tuple[str, float]:
+        observer = self.classifier.observer
+        if self.model is not None:
+            started = time.perf_counter()
+            result = self.model.predict(self.tokens)
+            self.scoring_seconds += time.perf_counter() - started
+        else:
+            result = self.classifier._decide(*self.state.totals())
+        observer.observe_stage("preprocess", self.preprocess_seconds)
+        observer.observe_stage("scoring", self.scoring_seconds)
+        return result
+
 
 class EmailClassifier:
-    def __init__(self):
+    def __init__(self, stem_cache_size: Optional[int] = None, result_cache_size: Optional[int] = None,
+                 lexicon: Optional[CompiledLexicon] = None, scoring_mode: Optional[str] = None,
+                 token_budget: Optional[int] = None, keywords_path: Optional[str] = None,
+                 backend: Optional[str] = None, linear_model=None):
         
         self.classifier = None
+        self.scoring_mode = SCORING_MODE if scoring_mode is None else scoring_mode
+        if self.scoring_mode not in SCORING_MODES:
+            raise ValueError(f"Modo de pontuação inválido: {self.scoring_mode}")
+        self.token_budget = EARLY_EXIT_TOKEN_BUDGET if token_budget is None else token_budget
+        self.backend = CLASSIFIER_BACKEND if backend is None else backend
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Backend de classificação inválido: {self.backend}")
+        self.linear_model = None
+        if self.backend == "linear":
+            # Import tardio: o numpy só é necessário com o backend linear
+            from .linear_model import LinearModel
+            self.linear_model = linear_model if linear_model is not None else LinearModel.load()
         self.stemmer = RSLPStemmer()
-        try:
-            self.stop_words = set(stopwords.words('portuguese'))
-        except:
-            print("⚠️  Não foi possível carregar stopwords do NLTK, usando lista manual")
+        # Recebe duração das etapas e fallbacks (ver classifiers.observer)
+        self.observer = NULL_OBSERVER
+        
+        # Caches limitados: stem por palavra e resultado por texto normalizado (0 desativa)
+        stem_cache_size = STEM_CACHE_SIZE if stem_cache_size is None else stem_cache_size
+        result_cache_size = RESULT_CACHE_SIZE if result_cache_size is None else result_cache_size
+        if stem_cache_size > 0:
+            self.stem = lru_cache(maxsize=stem_cache_size)(self.stemmer.stem)
+        else:
+            self.stem = self.stemmer.stem
+        self.result_cache = LRUCache(result_cache_size) if result_cache_size > 0 else None
+        # Camada opcional em disco, compartilhada entre processos (ver classifiers.persistent_cache)
+        self.persistent_cache = None
+        self.stop_words = load_stopwords()
+        if self.stop_words is None:
+            logger.warning("Não foi possível carregar stopwords do NLTK, usando lista manual")
             # Lista básica de stopwords em português como fallback
             self.stop_words = {
                 'de', 'a', 'o', 'que', 'e', 'do', 'da', 'em', 'um', 'para',
@@ -57,110 +186,70 @@ class EmailClassifier:
             }
         
         
-        self.improdutivo_unigrams = set()
-        self.improdutivo_bigrams = set()
-        self.improdutivo_trigrams = set()
-        self.produtivo_unigrams = set()
-        self.produtivo_bigrams = set()
-        self.produtivo_trigrams = set()
-        self._initialize_keywords()
-        self.weights = {
-            'unigram': 1.0,
-            'bigram': 2.0,
-            'trigram': 3.0
-        }
+        # Palavras-chave do arquivo versionado; reload_lexicon() troca por uma nova versão
+        self.keywords_path = DEFAULT_KEYWORDS_PATH if keywords_path is None else keywords_path
+        self._apply_keywords(load_keywords(self.keywords_path))
+        self.lexicon = self._check_lexicon(lexicon) if lexicon is not None else self.compile_lexicon()
         
-        print("✅ Classificador de emails inicializado com sucesso")
+        logger.info("Classificador de emails inicializado com sucesso")
     
-    def _initialize_keywords(self):
-
-        improdutivo_keyword_list = [
-            'saudação', 'cumprimento', 'veneração', 'reverência', 'homenagem',
-            'cortesia', 'gentileza', 'fineza', 'atenção', 'consideração',
-            'olá', 'oi', 'alô', 'bomdia', 'boatarde',
-            'boanoite', 'saudações', 'saúdo', 'saudável', 'cumprimentar',
-            'adeus', 'tchau', 'atélogo', 'atébreve', 'atémais',
-            'agradecimento', 'gratidão', 'reconhecimento', 'obrigado', 'grato',
-            'parabéns', 'felicitações', 'congratulações', 'beneplácito', 'exultação',
-            'elogio', 'louvor', 'enaltecimento', 'encômio', 'apologia'
-        ]
-        
-        produtivo_keyword_list = [
-            'proposta', 'contrato', 'aditivo', 'escritura', 'procuração',
-            'pagamento', 'fatura', 'orçamento', 'financiamento', 'empréstimo',
-            'venda', 'compra', 'negócio', 'transação', 'aquisição',
-            'projeto', 'entrega', 'serviço', 'produto', 'metodologia',
-            'cronograma', 'prazo', 'etapa', 'fase', 'marco',
-            'cláusula', 'penalidade', 'multa', 'indenização', 'arbitragem',
-            'admissão', 'demissão', 'rescisão', 'folha', 'ponto',
-            'software', 'hardware', 'aplicativo', 'plataforma', 'nuvem',
-            'estoque', 'inventário', 'armazenamento', 'distribuição', 'logística'
-        ]
-        
-      
-        self.improdutivo_unigrams = set(improdutivo_keyword_list)
-        self.produtivo_unigrams = set(produtivo_keyword_list)      
-        self._generate_ngrams_from_keywords(improdutivo_keyword_list, produtivo_keyword_list)
-        self._add_manual_ngrams()
-    
-    def _generate_ngrams_from_keywords(self, improdutivo_list, produtivo_list):
-        improdutivo_bigrams = self._create_ngrams_from_list(improdutivo_list, 2)
-        improdutivo_trigrams = self._create_ngrams_from_list(improdutivo_list, 3)
-        
-
-        produtivo_bigrams = self._create_ngrams_from_list(produtivo_list, 2)
-        produtivo_trigrams = self._create_ngrams_from_list(produtivo_list, 3)
-        
-        self.improdutivo_bigrams.update(improdutivo_bigrams)
-        self.improdutivo_trigrams.update(improdutivo_trigrams)
-        self.produtivo_bigrams.update(produtivo_bigrams)
-        self.produtivo_trigrams.update(produtivo_trigrams)
-    
-    def _create_ngrams_from_list(self, word_list: List[str], n: int) -> Set[str]:
-        ngrams_set = set()
-        for i in range(len(word_list) - n + 1):
-            ngram = ' '.join(word_list[i:i+n])
-            ngrams_set.add(ngram)
-        return ngrams_set
-    
-    def _add_manual_ngrams(self):
-        manual_improdutivo_bigrams = {
-            'bom dia', 'boa tarde', 'boa noite', 'até logo', 'até breve',
-            'muito obrigado', 'muito grato', 'parabéns pelo', 'feliz aniversário',
-            'com licença', 'por favor', 'me desculpe', 'sinto muito',
-            'tudo bem', 'como vai', 'estou bem', 'tenha um', 'ótimo dia'
-        }
-        
-        manual_improdutivo_trigrams = {
-            'tenha um bom', 'um bom dia', 'boa tarde a', 'tarde a todos',
-            'muito obrigado pela', 'obrigado pela atenção', 'feliz aniversário meu',
-            'com licença pode', 'por favor pode', 'me desculpe pelo'
-        }
-
-        manual_produtivo_bigrams = {
-            'proposta comercial', 'contrato de', 'pagamento da', 'fatura número',
-            'orçamento aprovado', 'reunião de', 'relatório de', 'projeto de',
-            'prazo de entrega', 'entrega do', 'serviço prestado', 'produto final',
-            'cronograma de', 'metodologia ágil', 'cláusula contratual', 'multa por',
-            'indenização por', 'admissão de', 'demissão sem', 'software de',
-            'hardware necessário', 'estoque de', 'inventário físico', 'logística de'
-        }
-        
-        manual_produtivo_trigrams = {
-            'contrato de prestação', 'pagamento da fatura', 'fatura número de',
-            'orçamento aprovado pelo', 'reunião de trabalho', 'relatório de atividades',
-            'projeto de implementação', 'prazo de entrega do', 'entrega do produto',
-            'serviço prestado pela', 'cronograma de atividades', 'metodologia ágil scrum',
-            'cláusula contratual de', 'multa por atraso', 'indenização por danos',
-            'admissão de funcionário', 'demissão sem justa', 'software de gestão',
-            'hardware necessário para', 'estoque de produtos', 'inventário físico de'
-        }
-        
-      
-        self.improdutivo_bigrams.update(manual_improdutivo_bigrams)
-        self.improdutivo_trigrams.update(manual_improdutivo_trigrams)
-        self.produtivo_bigrams.update(manual_produtivo_bigrams)
-        self.produtivo_trigrams.update(manual_produtivo_trigrams)
+    def _apply_keywords(self, keywords: KeywordSet) -> None:
+        self.keywords = keywords
+        self.produtivo_unigrams, self.produtivo_bigrams, self.produtivo_trigrams = keywords.produtivo
+        self.improdutivo_unigrams, self.improdutivo_bigrams, self.improdutivo_trigrams = keywords.improdutivo
+        self.weights = keywords.weights
+    
+    @property
+    def lexicon_version(self) -> str:
+        return self.lexicon.version
+    
+    @property
+    def model_version(self) -> str:
+        # Identifica o que produziu a classificação: léxico (regras) ou modelo linear
+        if self.linear_model is not None:
+            return f"linear:{self.linear_model.version}"
+        return self.lexicon.version
+    
+    def reload_lexicon(self, path: Optional[str] = None) -> bool:
+        """
+        Recarrega as palavras-chave e troca o léxico compilado de uma vez.
+        Classificações em andamento terminam com a referência que já tinham,
+        então o caminho de leitura não usa lock. Levanta ValueError se o
+        arquivo for inválido (a versão ativa continua valendo) e devolve
+        False se nada mudou.
+        """
+        keywords = load_keywords(path or self.keywords_path)
+        digest = CompiledLexicon.digest_sources(keywords.produtivo, keywords.improdutivo,
+                                                keywords.weights, keywords.version)
+        if digest == self.lexicon.source_digest:
+            return False
+        lexicon = CompiledLexicon.compile(keywords.produtivo, keywords.improdutivo,
+                                          keywords.weights, keywords.version)
+        self._apply_keywords(keywords)
+        self.lexicon = lexicon
+        if self.result_cache is not None:
+            self.result_cache.clear()
+        logger.info("Léxico atualizado para a versão %s (%d n-grams)", lexicon.version, len(lexicon.table))
+        return True
+    
+    def compile_lexicon(self) -> CompiledLexicon:
+        produtivo, improdutivo = self._keyword_sets()
+        return CompiledLexicon.compile(produtivo, improdutivo, self.weights, self.keywords.version)
+    
+    def _keyword_sets(self):
+        return (
+            (self.produtivo_unigrams, self.produtivo_bigrams, self.produtivo_trigrams),
+            (self.improdutivo_unigrams, self.improdutivo_bigrams, self.improdutivo_trigrams),
+        )
+    
+    def _check_lexicon(self, lexicon: CompiledLexicon) -> CompiledLexicon:
+        # Um artefato gerado a partir de outras palavras-chave é recompilado
+        produtivo, improdutivo = self._keyword_sets()
+        digest = CompiledLexicon.digest_sources(produtivo, improdutivo, self.weights, self.keywords.version)
+        if lexicon.source_digest != digest:
+            logger.warning("Léxico pré-compilado desatualizado, recompilando")
+            return self.compile_lexicon()
+        return lexicon
     
     def extract_ngrams(self, tokens: List[str]) -> Tuple[List[str], List[str], List[str]]:
         unigrams = tokens
@@ -168,78 +257,144 @@ class EmailClassifier:
         # Bigramas
         bigrams = []
         if len(tokens) >= 2:
-            bigrams = [' '.join(bigram) for bigram in ngrams(tokens, 2)]
+            bigrams = [' '.join(bigram) for bigram in zip(tokens, tokens[1:])]
         
         # Trigramas
         trigrams = []
         if len(tokens) >= 3:
-            trigrams = [' '.join(trigram) for trigram in ngrams(tokens, 3)]
+            trigrams = [' '.join(trigram) for trigram in zip(tokens, tokens[1:], tokens[2:])]
         
         return unigrams, bigrams, trigrams
     
     def tokenize_with_fallback(self, text: str) -> List[str]:
         try:
-            words = nltk.word_tokenize(text, language='portuguese')
+            words = word_tokenize(text)
         except Exception as e:
-            print(f"⚠️  NLTK tokenize falhou, usando fallback simples: {e}")
+            logger.warning("Tokenização falhou, usando fallback simples: %s", e)
             # Fallback simples: dividir por espaços e caracteres não alfanuméricos
             words = re.findall(r'\b\w+\b', text.lower())
         
         return words
     
-    def preprocess_text(self, text: str) -> Tuple[List[str], List[str], List[str]]:
+    def normalize_text(self, text: str) -> str:
         text = text.lower()
         text = re.sub(r'[^\w\sáàâãéèêíïóôõöúçñ]', ' ', text, flags=re.UNICODE)
-        text = re.sub(r'\d+', '', text)
-        words = self.tokenize_with_fallback(text)
-        words = [word for word in words if word not in self.stop_words and len(word) > 2]
+        return re.sub(r'\d+', '', text)
+    
+    def filter_words(self, words: List[str]) -> List[str]:
+        return [word for word in words if word not in self.stop_words and len(word) > 2]
+    
+    def _tokenize_words(self, text: str) -> List[str]:
+        # Uma varredura: mesmo resultado de normalize_text + tokenize_with_fallback + filter_words
+        return tokenize_words(text, self.stop_words)
+    
+    def preprocess_tokens(self, text: str) -> List[str]:
+        words = self._tokenize_words(text)
         try:
-            words = [self.stemmer.stem(word) for word in words]
+            stem = self.stem
+            words = [stem(word) for word in words]
         except Exception as e:
-            print(f"⚠️  Stemming falhou: {e}")
-
-        unigrams, bigrams, trigrams = self.extract_ngrams(words)
+            logger.warning("Stemming falhou: %s", e)
+            self.observer.count_fallback("stemming_error")
+        return words
+    
+    def preprocess_text(self, text: str) -> Tuple[List[str], List[str], List[str]]:
+        unigrams, bigrams, trigrams = self.extract_ngrams(self.preprocess_tokens(text))
         
         return unigrams, bigrams, trigrams
     
-    def calculate_ngram_scores(self, text_unigrams: List[str], 
-                               text_bigrams: List[str], 
-                               text_trigrams: List[str]) -> Tuple[float, float]:
-        produtivo_score = 0.0
-        improdutivo_score = 0.0
-        
-        
-        for unigram in text_unigrams:
-            if unigram in self.produtivo_unigrams:
-                produtivo_score += self.weights['unigram']
-            if unigram in self.improdutivo_unigrams:
-                improdutivo_score += self.weights['unigram']
-        
-        
-        for bigram in text_bigrams:
-            if bigram in self.produtivo_bigrams:
-                produtivo_score += self.weights['bigram']
-            if bigram in self.improdutivo_bigrams:
-                improdutivo_score += self.weights['bigram']
-        
-     
-        for trigram in text_trigrams:
-            if trigram in self.produtivo_trigrams:
-                produtivo_score += self.weights['trigram']
-            if trigram in self.improdutivo_trigrams:
-                improdutivo_score += self.weights['trigram']
-        
-        return produtivo_score, improdutivo_score
+    def shingles(self, text: str) -> List[str]:
+        return self.shingles_from_tokens(self.preprocess_tokens(text))
+    
+    def shingles_from_tokens(self, tokens: List[str]) -> List[str]:
+        # Trigramas de stems (n-grams menores em textos curtos) para o índice de quase-duplicados
+        unigrams, bigrams, trigrams = self.extract_ngrams(tokens)
+        return trigrams or bigrams or unigrams
+    
+    def scoring_chunks(self, text: str) -> List[Tuple[str, Optional[List[str]]]]:
+        """
+        Partes do texto que classify_detailed() pontua, com os stems de cada
+        uma: o texto inteiro ou, no modo early_exit, os blocos do texto sem
+        histórico citado e assinatura. No early_exit só os blocos até o
+        orçamento de tokens são pré-processados (os seguintes vêm com None),
+        como na classificação. Passadas de volta para a classificação,
+        evitam pré-processar o email duas vezes (ex.: shingles do índice de
+        quase-duplicados e pontuação).
+        """
+        started = time.perf_counter()
+        if self.scoring_mode == "early_exit":
+            chunks = []
+            tokens_read = 0
+            for chunk in iter_text_chunks(strip_reply_history(text), EARLY_EXIT_CHUNK_CHARS):
+                if self.token_budget and tokens_read >= self.token_budget:
+                    chunks.append((chunk, None))
+                    continue
+                tokens = self.preprocess_tokens(chunk)
+                tokens_read += len(tokens)
+                chunks.append((chunk, tokens))
+        else:
+            chunks = [(text, self.preprocess_tokens(text))]
+        self.observer.observe_stage("preprocess", time.perf_counter() - started)
+        return chunks
+    
+    def shingles_from_chunks(self, chunks: List[Tuple[str, Optional[List[str]]]]) -> List[str]:
+        # Shingles do que a classificação lê: no early_exit, os stems até o orçamento de tokens
+        tokens = _chunk_tokens(chunks)
+        if self.scoring_mode == "early_exit" and self.token_budget:
+            tokens = tokens[:self.token_budget]
+        return self.shingles_from_tokens(tokens)
     
     def classify_with_rules(self, text: str) -> Tuple[str, float]:
-        unigrams, bigrams, trigrams = self.preprocess_text(text)
-        
-        
-        produtivo_score, improdutivo_score = self.calculate_ngram_scores(
-            unigrams, bigrams, trigrams
-        )
-        
-       
+        return self._score_full(text)[:2]
+    
+    def _score_full(self, text: str, tokens: Optional[List[str]] = None) -> Tuple[str, float, int]:
+        if tokens is None:
+            started = time.perf_counter()
+            tokens = self.preprocess_tokens(text)
+            self.observer.observe_stage("preprocess", time.perf_counter() - started)
+        scored = time.perf_counter()
+        
+        # Pontuação e contagem de desempate numa única passada pelo léxico compilado
+        produtivo_score, improdutivo_score, produtivo_count, improdutivo_count = self.lexicon.score(tokens)
+        self.observer.observe_stage("scoring", time.perf_counter() - scored)
+        
+        category, confidence = self._decide(produtivo_score, improdutivo_score, produtivo_count, improdutivo_count)
+        return category, confidence, len(tokens)
+    
+    def _score_early(self, text: str, chunks: Optional[List[Tuple[str, Optional[List[str]]]]] = None) -> Tuple[str, float, int]:
+        """
+        Pontua só a mensagem nova, em blocos, até a margem entre as categorias
+        não poder mais ser invertida pelos tokens restantes ou o orçamento de
+        tokens acabar. Sem orçamento, a categoria é a mesma de pontuar o texto
+        limpo inteiro. ``chunks`` vem de scoring_chunks().
+        """
+        if chunks is None:
+            text = strip_reply_history(text)
+            chunks = [(chunk, None) for chunk in iter_text_chunks(text, EARLY_EXIT_CHUNK_CHARS)]
+        char_budget = sum(len(chunk) for chunk, _ in chunks)
+        stream = StreamingClassification(self, char_budget=char_budget, token_budget=self.token_budget)
+        for chunk, tokens in chunks:
+            if stream.feed(chunk, tokens):
+                break
+        category, confidence = stream.result()
+        return category, confidence, stream.tokens_scored
+    
+    def _score_linear(self, text: str, tokens: Optional[List[str]] = None) -> Tuple[str, float, int]:
+        if tokens is None:
+            started = time.perf_counter()
+            if self.scoring_mode == "early_exit":
+                text = strip_reply_history(text)
+            tokens = self.preprocess_tokens(text)
+            self.observer.observe_stage("preprocess", time.perf_counter() - started)
+        if self.scoring_mode == "early_exit" and self.token_budget:
+            tokens = tokens[:self.token_budget]
+        scored = time.perf_counter()
+        category, confidence = self.linear_model.predict(tokens)
+        self.observer.observe_stage("scoring", time.perf_counter() - scored)
+        return category, confidence, len(tokens)
+    
+    def _decide(self, produtivo_score: float, improdutivo_score: float,
+                produtivo_count: int, improdutivo_count: int) -> Tuple[str, float]:
         total_score = produtivo_score + improdutivo_score
         
         if total_score == 0:
@@ -256,15 +411,6 @@ class EmailClassifier:
             confidence = min(0.95, 0.5 + (improdutivo_ratio * 0.5))
             return "Improdutivo", confidence
         else:
-            produtivo_count = len([ngram for ngram in unigrams + bigrams + trigrams 
-                                 if ngram in self.produtivo_unigrams or 
-                                 ngram in self.produtivo_bigrams or 
-                                 ngram in self.produtivo_trigrams])
-            improdutivo_count = len([ngram for ngram in unigrams + bigrams + trigrams 
-                                   if ngram in self.improdutivo_unigrams or 
-                                   ngram in self.improdutivo_bigrams or 
-                                   ngram in self.improdutivo_trigrams])
-            
             if produtivo_count > improdutivo_count:
                 return "Produtivo", 0.6
             elif improdutivo_count > produtivo_count:
@@ -272,42 +418,306 @@ class EmailClassifier:
             else:
                 return "Produtivo", 0.5  # Default Produtivo
     
-    def find_key_ngrams(self, text: str, category: str = "both") -> dict:
-        unigrams, bigrams, trigrams = self.preprocess_text(text)
-        
-        result = {
-            "produtivo": {"unigrams": [], "bigrams": [], "trigrams": []},
-            "improdutivo": {"unigrams": [], "bigrams": [], "trigrams": []}
-        }
-        
-        if category in ["both", "produtivo"]:
-            result["produtivo"]["unigrams"] = [u for u in unigrams if u in self.produtivo_unigrams]
-            result["produtivo"]["bigrams"] = [b for b in bigrams if b in self.produtivo_bigrams]
-            result["produtivo"]["trigrams"] = [t for t in trigrams if t in self.produtivo_trigrams]
-        
-        if category in ["both", "improdutivo"]:
-            result["improdutivo"]["unigrams"] = [u for u in unigrams if u in self.improdutivo_unigrams]
-            result["improdutivo"]["bigrams"] = [b for b in bigrams if b in self.improdutivo_bigrams]
-            result["improdutivo"]["trigrams"] = [t for t in trigrams if t in self.improdutivo_trigrams]
-        
-        return result
+    def explain(self, text: str, max_matches: int = EXPLAIN_MAX_MATCHES) -> dict:
+        """
+        Classifica e explica a decisão com uma única passada de
+        pré-processamento: categoria, confiança, score de cada classe e os
+        n-grams (stems) que casaram, com ocorrências e contribuição para cada
+        classe. No backend de regras a contribuição é o peso somado ao score
+        da classe; no linear, a parte da margem do modelo (positiva para
+        Produtivo) e os scores são as probabilidades. A decisão é a mesma de
+        classify(), exceto no modo early_exit, em que o texto limpo é
+        pontuado até o orçamento de tokens sem a parada antecipada.
+        """
+        if not text or len(text.strip()) < 10:
+            return {"category": "Improdutivo", "confidence": 0.5, "tokens_scored": 0,
+                    "backend": self.backend, "scores": {}, "matches": []}
+        if self.scoring_mode == "early_exit":
+            text = strip_reply_history(text)
+        tokens = self.preprocess_tokens(text)
+        if self.scoring_mode == "early_exit" and self.token_budget:
+            tokens = tokens[:self.token_budget]
+        
+        matches = []
+        if self.linear_model is not None:
+            margin, contributions = self.linear_model.explain(tokens)
+            probability = self.linear_model.probability(margin)
+            category, confidence = ("Produtivo", probability) if probability >= 0.5 else ("Improdutivo", 1.0 - probability)
+            scores = {"Produtivo": probability, "Improdutivo": 1.0 - probability}
+            for (ngram, size), (count, contribution) in contributions.items():
+                matches.append({"ngram": ngram, "level": NGRAM_LEVEL_NAMES[size], "count": count,
+                                "produtivo": max(contribution, 0.0), "improdutivo": max(-contribution, 0.0)})
+        else:
+            totals, hits = self.lexicon.explain(tokens)
+            category, confidence = self._decide(*totals)
+            scores = {"Produtivo": totals[0], "Improdutivo": totals[1]}
+            for (ngram, size), (count, produtivo, improdutivo) in hits.items():
+                matches.append({"ngram": ngram, "level": NGRAM_LEVEL_NAMES[size], "count": count,
+                                "produtivo": produtivo, "improdutivo": improdutivo})
+        matches.sort(key=lambda match: max(match["produtivo"], match["improdutivo"]), reverse=True)
+        return {"category": category, "confidence": confidence, "tokens_scored": len(tokens),
+                "backend": self.backend, "scores": scores, "matches": matches[:max_matches]}
     
     def classify(self, text: str) -> Tuple[str, float]:
+        return self.classify_detailed(text)[:2]
+    
+    def classify_detailed(self, text: str, chunks: Optional[List[Tuple[str, Optional[List[str]]]]] = None) -> Tuple[str, float, int]:
+        """
+        Como classify(), devolvendo também quantos tokens foram pontuados.
+        ``chunks`` (de scoring_chunks()) evita pré-processar o texto de novo.
+        """
         if not text or len(text.strip()) < 10:
-            return "Improdutivo", 0.5
+            return "Improdutivo", 0.5, 0
+        
+        persistent = self.persistent_cache
+        key = self.result_key(text) if self.result_cache is not None or persistent is not None else None
+        if key is not None and self.result_cache is not None:
+            cached = self.result_cache.get(key)
+            if cached is not None:
+                return cached
+        
+        lexicon = self.lexicon
+        version = self._cache_version(lexicon) if persistent is not None else None
+        if key is not None and persistent is not None:
+            stored = persistent.get("classification", version, key)
+            if stored is not None:
+                result = tuple(stored)
+                if self.result_cache is not None:
+                    self.result_cache.put(key, result)
+                return result
         
         try:
-            return self.classify_with_rules(text)
+            if self.linear_model is not None:
+                result = self._score_linear(text, _chunk_tokens(chunks))
+            elif self.scoring_mode == "early_exit":
+                result = self._score_early(text, chunks)
+            else:
+                result = self._score_full(text, _chunk_tokens(chunks))
                 
         except Exception as e:
-            print(f"Classification error: {e}")
-            text_lower = text.lower()
-            if any(word in text_lower for word in ['reunião', 'contrato', 'projeto', 'relatório', 'prazo', 'entrega']):
-                return "Produtivo", 0.6
-            elif any(word in text_lower for word in ['olá', 'oi', 'bom dia', 'obrigado', 'parabéns']):
-                return "Improdutivo", 0.6
+            logger.error("Classification error: %s", e)
+            self.observer.count_fallback("classify_error")
+            return (*self._fallback_classify(text), 0)
+        
+        # Não guarda resultado calculado com um léxico que já foi trocado
+        if key is not None and self.lexicon is lexicon:
+            if self.result_cache is not None:
+                self.result_cache.put(key, result)
+            if persistent is not None:
+                persistent.put("classification", version, key, result)
+        return result
+    
+    def start_stream(self, char_budget: int = 0, token_budget: int = 0) -> StreamingClassification:
+        return StreamingClassification(self, char_budget, token_budget,
+                                       stop_at_quote=self.scoring_mode == "early_exit")
+    
+    def start_thread(self, thread_id: str) -> ThreadState:
+        if self.linear_model is not None:
+            from .linear_model import LinearState
+            return ThreadState(thread_id, self.model_version, LinearState())
+        return ThreadState(thread_id, self.model_version, ScoreState())
+    
+    def update_thread(self, state: ThreadState, text: str) -> Tuple[str, float, int]:
+        """
+        Acrescenta uma mensagem à conversa e devolve categoria e confiança da
+        conversa inteira, com os tokens pontuados da mensagem. Só a mensagem
+        nova é pré-processada; o resultado é o mesmo de _score_full() (ou do
+        modelo linear) sobre as mensagens unidas por quebras de linha. Levanta
+        ValueError se o estado for de outra versão do classificador.
+        """
+        lexicon = self.lexicon
+        linear_model = self.linear_model
+        version = f"linear:{linear_model.version}" if linear_model is not None else lexicon.version
+        if state.version != version:
+            raise ValueError("Estado da conversa criado por outra versão do classificador")
+        with state.lock:
+            started = time.perf_counter()
+            tokens = self.preprocess_tokens(text)
+            scored = time.perf_counter()
+            if linear_model is not None:
+                linear_model.update(state.score, tokens)
+                result = linear_model.predict_state(state.score)
+            else:
+                lexicon.update(state.score, tokens)
+                result = self._decide(*state.score.totals())
+            state.messages += 1
+        self.observer.observe_stage("preprocess", scored - started)
+        self.observer.observe_stage("scoring", time.perf_counter() - scored)
+        return (*result, len(tokens))
+    
+    def _cache_version(self, lexicon: CompiledLexicon) -> str:
+        # Tudo o que muda o resultado: backend, léxico (conteúdo) ou modelo e modo de pontuação
+        if self.linear_model is not None:
+            source = f"linear:{self.linear_model.version}"
+        else:
+            source = f"rules:{lexicon.source_digest}"
+        return f"{source}:{self.scoring_mode}:{self.token_budget}:k{RESULT_KEY_FORMAT}"
+    
+    def warm_result_cache(self, limit: int) -> int:
+        """
+        Carrega no cache em memória as classificações mais recentes do cache
+        persistente, para a versão atual. Devolve quantas foram carregadas.
+        """
+        if self.persistent_cache is None or self.result_cache is None:
+            return 0
+        entries = self.persistent_cache.recent("classification", self._cache_version(self.lexicon), limit)
+        for key, value in entries:
+            self.result_cache.put(key, tuple(value))
+        return len(entries)
+    
+    def result_key(self, text: str) -> bytes:
+        if self.scoring_mode == "early_exit":
+            # Histórico e assinatura são achados por linha e a parada antecipada
+            # depende da posição dos blocos: a chave é o texto limpo, como está
+            normalized = strip_reply_history(text)
+        else:
+            # Caixa e espaços não alteram a classificação, então ficam fora da chave
+            normalized = ' '.join(text.lower().split())
+        return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).digest()
+    
+    def cache_stats(self) -> dict:
+        stats = {"result_cache": self.result_cache.stats() if self.result_cache is not None else None}
+        if hasattr(self.stem, "cache_info"):
+            info = self.stem.cache_info()
+            stats["stem_cache"] = {
+                "size": info.currsize,
+                "maxsize": info.maxsize,
+                "hits": info.hits,
+                "misses": info.misses,
+            }
+        else:
+            stats["stem_cache"] = None
+        return stats
+    
+    def _fallback_classify(self, text: str) -> Tuple[str, float]:
+        text_lower = text.lower()
+        if any(word in text_lower for word in ['reunião', 'contrato', 'projeto', 'relatório', 'prazo', 'entrega']):
+            return "Produtivo", 0.6
+        elif any(word in text_lower for word in ['olá', 'oi', 'bom dia', 'obrigado', 'parabéns']):
+            return "Improdutivo", 0.6
+        else:
+            return "Produtivo", 0.5
+    
+    def classify_many(self, texts: List[str]) -> List[Tuple[str, float]]:
+        return [result[:2] for result in self.classify_many_detailed(texts)]
+    
+    def classify_many_detailed(self, texts: List[str],
+                               chunk_lists: Optional[List[Optional[List[Tuple[str, Optional[List[str]]]]]]] = None
+                               ) -> List[Tuple[str, float, int]]:
+        """
+        Classifica um lote de emails de uma vez, com o mesmo resultado de
+        chamar classify_detailed() em cada um. O vocabulário do lote é
+        stemizado uma única vez e os n-grams de todos os emails são pontuados
+        juntos. No modo early_exit do backend de regras, emails longos seguem
+        o caminho em blocos. ``chunk_lists``, paralela a ``texts``, traz o
+        resultado de scoring_chunks() dos emails já pré-processados.
+        """
+        results: List[Optional[Tuple[str, float, int]]] = [None] * len(texts)
+        lexicon = self.lexicon
+        linear_model = self.linear_model
+        persistent = self.persistent_cache
+        version = self._cache_version(lexicon) if persistent is not None else None
+        started = time.perf_counter()
+        docs = []
+        keys = {}
+        pending = []
+        for index, text in enumerate(texts):
+            if not text or len(text.strip()) < 10:
+                results[index] = ("Improdutivo", 0.5, 0)
+                continue
+            chunks = chunk_lists[index] if chunk_lists is not None else None
+            if (self.scoring_mode == "early_exit" and self.linear_model is None
+                    and len(text) > EARLY_EXIT_CHUNK_CHARS):
+                results[index] = self.classify_detailed(text, chunks)
+                continue
+            if self.result_cache is not None or persistent is not None:
+                keys[index] = self.result_key(text)
+            if self.result_cache is not None:
+                cached = self.result_cache.get(keys[index])
+                if cached is not None:
+                    results[index] = cached
+                    continue
+            pending.append((index, text))
+        
+        if persistent is not None and pending:
+            # Uma consulta ao disco para todo o lote
+            stored = persistent.get_many("classification", version, [keys[index] for index, _ in pending])
+            remaining = []
+            for index, text in pending:
+                value = stored.get(keys[index])
+                if value is None:
+                    remaining.append((index, text))
+                    continue
+                results[index] = tuple(value)
+                if self.result_cache is not None:
+                    self.result_cache.put(keys[index], results[index])
+            pending = remaining
+        
+        stemmed = {}
+        for index, text in pending:
+            try:
+                chunks = chunk_lists[index] if chunk_lists is not None else None
+                if chunks is not None:
+                    # Stems já calculados: entram direto na pontuação
+                    words = stemmed[index] = _chunk_tokens(chunks)
+                elif self.scoring_mode == "early_exit":
+                    # Mesma categoria do caminho em blocos: texto limpo e orçamento de tokens
+                    words = self._tokenize_words(strip_reply_history(text))
+                else:
+                    words = self._tokenize_words(text)
+                if self.scoring_mode == "early_exit" and self.token_budget:
+                    words = words[:self.token_budget]
+                docs.append((index, words))
+            except Exception as e:
+                logger.error("Classification error: %s", e)
+                self.observer.count_fallback("classify_error")
+                results[index] = (*self._fallback_classify(text), 0)
+        
+        # Stemming do vocabulário único do lote
+        stems = {}
+        failed_words = set()
+        for word in {word for index, words in docs if index not in stemmed for word in words}:
+            try:
+                stems[word] = self.stem(word)
+            except Exception as e:
+                logger.warning("Stemming falhou: %s", e)
+                self.observer.count_fallback("stemming_error")
+                failed_words.add(word)
+        
+        token_lists = []
+        for index, words in docs:
+            if index in stemmed or (failed_words and any(word in failed_words for word in words)):
+                token_lists.append(words)
             else:
-                return "Produtivo", 0.5
+                token_lists.append([stems[word] for word in words])
+        
+        scored = time.perf_counter()
+        if linear_model is not None:
+            # Um único produto esparso × denso para o lote inteiro
+            decisions = linear_model.predict_many(token_lists)
+        else:
+            produtivo_scores, improdutivo_scores, produtivo_counts, improdutivo_counts = \
+                lexicon.score_many(token_lists)
+            decisions = [
+                self._decide(float(produtivo_scores[position]), float(improdutivo_scores[position]),
+                             int(produtivo_counts[position]), int(improdutivo_counts[position]))
+                for position in range(len(token_lists))
+            ]
+        # Lotes têm etapas próprias: a duração é do lote inteiro, não de um email
+        self.observer.observe_stage("batch_preprocess", scored - started)
+        self.observer.observe_stage("batch_scoring", time.perf_counter() - scored)
+        
+        computed = []
+        for (index, words), (category, confidence) in zip(docs, decisions):
+            results[index] = (category, confidence, len(words))
+            if index in keys and self.lexicon is lexicon:
+                if self.result_cache is not None:
+                    self.result_cache.put(keys[index], results[index])
+                computed.append((keys[index], results[index]))
+        if persistent is not None and computed:
+            persistent.put_many("classification", version, computed)
+        
+        return results
 
 
 # Exemplo de uso
@@ -329,7 +739,7 @@ if __name__ == "__main__":
         print(f"Classificação: {category} (Confiança: {confidence:.2f})")
         
         # Mostrar n-grams encontrados
-        key_ngrams = classifier.find_key_ngrams(email, "both")
-        print("N-grams produtivos encontrados:", key_ngrams["produtivo"])
-        print("N-grams improdutivos encontrados:", key_ngrams["improdutivo"])
+        matches = classifier.explain(email)["matches"]
+        print("N-grams produtivos encontrados:", [match["ngram"] for match in matches if match["produtivo"]])
+        print("N-grams improdutivos encontrados:", [match["ngram"] for match in matches if match["improdutivo"]])
         print("-" * 50)
\ No newline at end of file
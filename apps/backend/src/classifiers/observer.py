@@ -0,0 +1,15 @@
+class NullObserver:
+    """
+    Observador padrão do classificador e do gerador de respostas: não
+    registra nada. A API troca por um que alimenta as métricas de /metrics
+    (utils.metrics.StageMetrics), com a mesma interface.
+    """
+
+    def observe_stage(self, stage: str, seconds: float) -> None:
+        pass
+
+    def count_fallback(self, reason: str) -> None:
+        pass
+
+
+NULL_OBSERVER = NullObserver()
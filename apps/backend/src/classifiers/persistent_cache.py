@@ -0,0 +1,314 @@
+"""
+Cache persistente em disco (SQLite em modo WAL) para classificações e
+respostas geradas, compartilhado entre os workers e mantido entre reinícios.
+
+Cada entrada é identificada por (tipo, versão, chave): a chave é o hash do
+texto normalizado (o mesmo dos caches em memória) e a versão identifica o
+que produziu o valor (léxico ou modelo e modo de pontuação; modelo do LLM),
+então trocar o léxico nunca devolve um resultado antigo. O total gravado é
+mantido por triggers e, acima de ``max_bytes``, as entradas mais antigas
+saem primeiro.
+
+Cada thread de cada processo abre a própria conexão; o WAL permite leituras
+simultâneas com uma escrita, e o busy_timeout espera pelo lock em vez de
+falhar. As gravações e a remoção de entradas antigas ficam numa thread de
+escrita por processo, então quem classifica nunca espera pelo lock de
+escrita. Erros de disco nunca interrompem a classificação: a consulta vira
+um miss e a gravação é ignorada.
+"""
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Arquivo do cache (vazio desativa)
+PERSISTENT_CACHE_PATH = os.getenv("PERSISTENT_CACHE_PATH", "")
+PERSISTENT_CACHE_MAX_MB = float(os.getenv("PERSISTENT_CACHE_MAX_MB", 256))
+# Entradas mais recentes carregadas nos caches em memória no startup
+PERSISTENT_CACHE_WARM_ENTRIES = int(os.getenv("PERSISTENT_CACHE_WARM_ENTRIES", 1000))
+
+# Espera pelo lock de escrita de outro processo antes de desistir
+BUSY_TIMEOUT_SECONDS = 5.0
+# Gravações deste processo entre verificações de tamanho (ou o intervalo, o que vier antes)
+EVICTION_CHECK_WRITES = 200
+EVICTION_INTERVAL_SECONDS = 30.0
+# Lotes aguardando a thread de escrita; com a fila cheia, novos lotes são descartados
+WRITE_QUEUE_MAX = 1000
+# A remoção leva o total a esta fração do limite
+EVICTION_TARGET = 0.9
+# Custo aproximado de uma linha além da chave e do valor
+ROW_OVERHEAD = 64
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    kind TEXT NOT NULL,
+    version TEXT NOT NULL,
+    key BLOB NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    PRIMARY KEY (kind, version, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_created ON entries (created);
+CREATE TABLE IF NOT EXISTS totals (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    entries INTEGER NOT NULL,
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO totals (id, entries, bytes) VALUES (0, 0, 0);
+CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries
+    BEGIN UPDATE totals SET entries = entries + 1, bytes = bytes + new.size WHERE id = 0; END;
+CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries
+    BEGIN UPDATE totals SET entries = entries - 1, bytes = bytes - old.size WHERE id = 0; END;
+"""
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class PersistentCache:
+    """
+    Tabela (tipo, versão, chave) -> valor JSON num arquivo SQLite, limitada
+    a ``max_bytes``. Segura para várias threads e processos.
+    """
+
+    def __init__(self, path: str, max_bytes: int = int(PERSISTENT_CACHE_MAX_MB * 1024 * 1024)):
+        if max_bytes <= 0:
+            raise ValueError("max_bytes deve ser positivo")
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._queue: Optional[queue.Queue] = None
+        self._writer: Optional[threading.Thread] = None
+        self._writer_pid: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+        self.dropped = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # Com WAL, NORMAL só arrisca as últimas gravações numa queda de energia
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _connection(self) -> sqlite3.Connection:
+        # Uma conexão por thread e por processo: conexões não atravessam fork()
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            local.conn = self._connect()
+            local.pid = os.getpid()
+        return local.conn
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def _failed(self, action: str, error: Exception) -> None:
+        self._count("errors")
+        logger.warning("Cache persistente: falha ao %s: %s", action, error)
+
+    def get(self, kind: str, version: str, key: bytes) -> Optional[Any]:
+        return self.get_many(kind, version, [key]).get(key)
+
+    def get_many(self, kind: str, version: str, keys: Sequence[bytes]) -> Dict[bytes, Any]:
+        """
+        Valores encontrados para ``keys``, numa única consulta por lote.
+        """
+        if not keys:
+            return {}
+        found = {}
+        try:
+            conn = self._connection()
+            # Lotes abaixo do limite de parâmetros do SQLite
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT key, value FROM entries WHERE kind = ? AND version = ? "
+                    f"AND key IN ({','.join('?' * len(chunk))})",
+                    (kind, version, *chunk)
+                ).fetchall()
+                found.update((bytes(key), json.loads(value)) for key, value in rows)
+        except (sqlite3.Error, ValueError) as e:
+            self._failed("ler", e)
+            return {}
+        self._count("hits", len(found))
+        self._count("misses", len(set(keys)) - len(found))
+        return found
+
+    def put(self, kind: str, version: str, key: bytes, value: Any) -> None:
+        self.put_many(kind, version, [(key, value)])
+
+    def put_many(self, kind: str, version: str, items: Iterable[Tuple[bytes, Any]]) -> None:
+        """
+        Entrega os itens à thread de escrita e volta sem esperar pelo disco.
+        Chaves já presentes ficam como estão: o valor de uma mesma (versão,
+        chave) não muda.
+        """
+        now = time.time()
+        rows = []
+        for key, value in items:
+            encoded = json.dumps(value, ensure_ascii=False)
+            rows.append((kind, version, key, encoded, len(key) + len(encoded.encode("utf-8")) + ROW_OVERHEAD, now))
+        if not rows:
+            return
+        try:
+            self._writer_queue().put_nowait(rows)
+        except queue.Full:
+            self._count("dropped", len(rows))
+
+    def _writer_queue(self) -> queue.Queue:
+        # Uma thread de escrita por processo: threads não atravessam fork()
+        if self._writer_pid != os.getpid():
+            with self._lock:
+                if self._writer_pid != os.getpid():
+                    self._queue = queue.Queue(WRITE_QUEUE_MAX)
+                    self._writer = threading.Thread(target=self._run_writer, args=(self._queue,),
+                                                    name="persistent-cache-writer", daemon=True)
+                    self._writer.start()
+                    self._writer_pid = os.getpid()
+        return self._queue
+
+    def _run_writer(self, pending: queue.Queue) -> None:
+        last_check = time.monotonic()
+        stop = False
+        while not stop:
+            try:
+                batches = [pending.get(timeout=EVICTION_INTERVAL_SECONDS)]
+            except queue.Empty:
+                batches = []
+            # O que mais estiver na fila vai na mesma transação
+            while True:
+                try:
+                    batches.append(pending.get_nowait())
+                except queue.Empty:
+                    break
+            stop = _STOP in batches
+            rows = [row for batch in batches if batch is not _STOP for row in batch]
+            if rows:
+                self._write(rows)
+            if self._writes >= EVICTION_CHECK_WRITES or time.monotonic() - last_check >= EVICTION_INTERVAL_SECONDS:
+                self._writes = 0
+                last_check = time.monotonic()
+                self.evict()
+            for _ in batches:
+                pending.task_done()
+
+    def _write(self, rows: List[tuple]) -> None:
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(
+                    "INSERT OR IGNORE INTO entries (kind, version, key, value, size, created) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+        except sqlite3.Error as e:
+            self._failed("gravar", e)
+            return
+        self._writes += len(rows)
+
+    def flush(self) -> None:
+        """
+        Espera a thread de escrita gravar o que já foi entregue a ela.
+        """
+        if self._writer_pid == os.getpid():
+            self._queue.join()
+
+    def close(self) -> None:
+        """
+        Grava o que está pendente e encerra a thread de escrita do processo.
+        """
+        if self._writer_pid != os.getpid():
+            return
+        self._queue.put(_STOP)
+        self._writer.join()
+        self._writer_pid = None
+
+    def evict(self) -> int:
+        """
+        Remove as entradas mais antigas até o total ficar abaixo de
+        EVICTION_TARGET do limite. Devolve quantas foram removidas.
+        """
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                total = conn.execute("SELECT bytes FROM totals WHERE id = 0").fetchone()[0]
+                if total <= self.max_bytes:
+                    return 0
+                excess = total - int(self.max_bytes * EVICTION_TARGET)
+                freed = 0
+                cutoff = None
+                with closing(conn.execute("SELECT created, size FROM entries ORDER BY created")) as rows:
+                    for created, size in rows:
+                        freed += size
+                        cutoff = created
+                        if freed >= excess:
+                            break
+                removed = conn.execute("DELETE FROM entries WHERE created <= ?", (cutoff,)).rowcount
+        except sqlite3.Error as e:
+            self._failed("remover entradas antigas", e)
+            return 0
+        self._count("evictions", removed)
+        logger.info("Cache persistente: %d entradas antigas removidas", removed)
+        return removed
+
+    def recent(self, kind: str, version: str, limit: int) -> List[Tuple[bytes, Any]]:
+        """
+        As ``limit`` entradas mais recentes da versão, para aquecer os
+        caches em memória. Usa uma conexão própria, fechada ao final, para
+        não deixar conexão aberta num processo que ainda vai fazer fork.
+        """
+        if limit <= 0:
+            return []
+        try:
+            with closing(self._connect()) as conn:
+                rows = conn.execute(
+                    "SELECT key, value FROM entries WHERE kind = ? AND version = ? "
+                    "ORDER BY created DESC LIMIT ?",
+                    (kind, version, limit)
+                ).fetchall()
+        except sqlite3.Error as e:
+            self._failed("ler entradas recentes", e)
+            return []
+        return [(bytes(key), json.loads(value)) for key, value in reversed(rows)]
+
+    def clear(self) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM entries")
+
+    def stats(self) -> dict:
+        try:
+            conn = self._connection()
+            size, total = conn.execute("SELECT entries, bytes FROM totals WHERE id = 0").fetchone()
+        except sqlite3.Error:
+            size = total = None
+        with self._lock:
+            return {
+                "size": size,
+                "bytes": total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "errors": self.errors,
+                "pending": self._queue.qsize() if self._writer_pid == os.getpid() else 0,
+                "dropped": self.dropped,
+            }
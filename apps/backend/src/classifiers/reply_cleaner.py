@@ -0,0 +1,97 @@
+"""
+Remoção do histórico citado e da assinatura de um email antes da
+classificação: em threads longas o que decide a categoria é a mensagem nova.
+"""
+import re
+from typing import Iterator
+
+# Cabeçalhos que abrem o histórico citado (Gmail, Outlook, Apple Mail, em
+# português e inglês) e blocos de linhas com ">". Cada padrão vem com um
+# trecho literal: o texto é varrido com str.find e o padrão só é testado no
+# início da linha (ou da linha anterior, para o "Em ... escreveu:" quebrado
+# em duas linhas), em vez de uma regex multilinha sobre o texto inteiro.
+_QUOTE_MARKERS = [
+    ("escreveu:", re.compile(r"(?:Em|EM|em) [^\n]{1,200}(?:\n[^\n]{0,200})?escreveu:[ \t]*$", re.MULTILINE), True),
+    ("wrote:", re.compile(r"On [^\n]{1,200}(?:\n[^\n]{0,200})?wrote:[ \t]*$", re.MULTILINE), True),
+    ("--", re.compile(
+        r"-{2,}\s*(?:Mensagem original|Original Message|Mensagem encaminhada|Forwarded message)\s*-{2,}",
+        re.IGNORECASE
+    ), False),
+    ("De: ", re.compile(r"De: [^\n]+\n(?:[^\n]*\n){0,3}?(?:Enviad[oa](?: em)?|Data): "), False),
+    ("From: ", re.compile(r"From: [^\n]+\n(?:[^\n]*\n){0,3}?(?:Sent|Date): "), False),
+    (">", re.compile(r"[ \t]*>[^\n]*\n[ \t]*>"), False),
+]
+
+# Delimitador de assinatura (RFC 3676) e rodapés de clientes de celular
+_SIGNATURE_MARKERS = [
+    ("--", re.compile(r"-- ?[ \t]*$", re.MULTILINE), False),
+    ("__", re.compile(r"__+[ \t]*$", re.MULTILINE), False),
+    ("do meu ", re.compile(r"Enviad[oa] do meu "), False),
+    ("de meu ", re.compile(r"Enviad[oa] de meu "), False),
+    ("Sent from my ", re.compile(r"Sent from my "), False),
+]
+
+_WHITESPACE = re.compile(r"\s")
+
+
+def _find_line(text: str, markers: list, end: int) -> int:
+    """
+    Início da primeira linha (antes de ``end``) em que algum padrão casa.
+    """
+    best = end
+    for marker, pattern, previous_line in markers:
+        pos = text.find(marker, 0, best)
+        while pos >= 0:
+            line_start = text.rfind("\n", 0, pos) + 1
+            if line_start >= best:
+                break
+            candidates = [line_start]
+            if previous_line and line_start:
+                candidates.insert(0, text.rfind("\n", 0, line_start - 1) + 1)
+            matched = next((start for start in candidates if pattern.match(text, start)), -1)
+            if matched >= 0:
+                best = matched
+                break
+            pos = text.find(marker, pos + len(marker), best)
+    return best
+
+
+def find_quote_start(text: str) -> int:
+    """
+    Posição onde começa o histórico citado, ou -1 se não houver.
+    """
+    start = _find_line(text, _QUOTE_MARKERS, len(text))
+    return start if start < len(text) else -1
+
+
+def strip_reply_history(text: str, min_length: int = 10) -> str:
+    """
+    Remove o histórico citado e a assinatura. Se sobrar menos que
+    ``min_length`` caracteres (ex.: um encaminhamento sem comentário), o
+    texto original é mantido.
+    """
+    cut = find_quote_start(text)
+    stripped = text if cut < 0 else text[:cut]
+    stripped = stripped[:_find_line(stripped, _SIGNATURE_MARKERS, len(stripped))].strip()
+    return stripped if len(stripped) >= min_length else text
+
+
+def iter_text_chunks(text: str, size: int) -> Iterator[str]:
+    """
+    Divide o texto em blocos de cerca de ``size`` caracteres, sempre cortando
+    em espaço: os tokens dos blocos são os mesmos do texto inteiro.
+    """
+    start = 0
+    length = len(text)
+    while start < length:
+        end = start + size
+        if end >= length:
+            yield text[start:]
+            return
+        cut = max(text.rfind(' ', start, end), text.rfind('\n', start, end), text.rfind('\t', start, end))
+        if cut <= start:
+            # Sem espaço no bloco: avança até o próximo
+            match = _WHITESPACE.search(text, end)
+            cut = match.start() if match else length
+        yield text[start:cut + 1]
+        start = cut + 1
@@ -0,0 +1,245 @@
+"""
+Recursos de linguagem do classificador (stopwords, regras do RSLP e
+tokenizador) sem acesso à rede e sem importar o NLTK no caminho comum.
+
+Ordem de carga:
+1. ``_nltk_bundle.py``, gerado no build por ``python -m classifiers.build_nltk_resources``;
+2. dados locais do NLTK, com import tardio do pacote;
+3. download para /tmp/nltk_data, com NLTK_ALLOW_DOWNLOAD=1 ou na Vercel
+   (VERCEL=1), onde o build da função (@vercel/python) pode não executar o
+   vercel-build da raiz e deixar o deploy sem o bundle.
+
+Sem as regras do RSLP o classificador não sobe (o stemming mudaria todas as
+classificações sem aviso).
+"""
+import logging
+import os
+import re
+from typing import List, Optional, Set
+
+NLTK_DATA_PATH = '/tmp/nltk_data'
+# Fora da Vercel o runtime não acessa a rede, salvo NLTK_ALLOW_DOWNLOAD=1
+ALLOW_DOWNLOAD = os.getenv("NLTK_ALLOW_DOWNLOAD", os.getenv("VERCEL", "0")) == "1"
+
+logger = logging.getLogger(__name__)
+
+RSLP_STEPS = ["step0.pt", "step1.pt", "step2.pt", "step3.pt", "step4.pt", "step5.pt", "step6.pt"]
+
+# Contrações do NLTKWordTokenizer que ainda podem ocorrer depois da remoção de
+# pontuação em preprocess_text (as demais regras dependem de pontuação).
+_CONTRACTIONS = [
+    re.compile(r"(?i)\b(can)(?#X)(not)\b"),
+    re.compile(r"(?i)\b(gim)(?#X)(me)\b"),
+    re.compile(r"(?i)\b(gon)(?#X)(na)\b"),
+    re.compile(r"(?i)\b(got)(?#X)(ta)\b"),
+    re.compile(r"(?i)\b(lem)(?#X)(me)\b"),
+    re.compile(r"(?i)\b(wan)(?#X)(na)(?=\s)"),
+]
+
+
+def word_tokenize(text: str) -> List[str]:
+    """
+    Equivalente a ``nltk.word_tokenize(text, language='portuguese')`` para
+    texto já normalizado (só letras, dígitos, '_' e espaços): sem pontuação o
+    Punkt devolve uma única sentença e o tokenizador só separa contrações.
+    """
+    text = " " + text + " "
+    for regexp in _CONTRACTIONS:
+        text = regexp.sub(r" \1 \2 ", text)
+    return text.split()
+
+
+class _NormalizeTable(dict):
+    """
+    Tabela para ``str.translate`` equivalente às duas substituições de
+    normalize_text: dígitos são removidos, o que não é ``\\w`` nem espaço vira
+    espaço. Códigos fora do Latin-1 são classificados na primeira ocorrência.
+    """
+
+    def __init__(self):
+        super().__init__()
+        for code in range(256):
+            self[code] = self._classify(code)
+
+    @staticmethod
+    def _classify(code: int):
+        char = chr(code)
+        if char.isdecimal():
+            return None
+        if char.isalnum() or char == '_' or char.isspace():
+            return char
+        return ' '
+
+    def __missing__(self, code: int):
+        value = self[code] = self._classify(code)
+        return value
+
+
+_NORMALIZE_TABLE = _NormalizeTable()
+
+_CONTRACTION_SPLITS = {
+    "cannot": ("can", "not"),
+    "gimme": ("gim", "me"),
+    "gonna": ("gon", "na"),
+    "gotta": ("got", "ta"),
+    "lemme": ("lem", "me"),
+    "wanna": ("wan", "na"),
+}
+
+
+def tokenize_words(text: str, stop_words: Set[str], min_length: int = 3) -> List[str]:
+    """
+    Normaliza, tokeniza e filtra em uma única varredura. Produz os mesmos
+    tokens que ``word_tokenize(normalize_text(text))`` seguido do filtro de
+    stopwords e de palavras curtas.
+    """
+    words = []
+    append = words.append
+    for word in text.lower().translate(_NORMALIZE_TABLE).split():
+        if word in _CONTRACTION_SPLITS:
+            words.extend(part for part in _CONTRACTION_SPLITS[word]
+                         if len(part) >= min_length and part not in stop_words)
+        elif len(word) >= min_length and word not in stop_words:
+            append(word)
+    return words
+
+
+def _first_line(error: Exception) -> str:
+    lines = [line.strip() for line in str(error).splitlines() if line.strip()]
+    return lines[0] if lines else type(error).__name__
+
+
+def _bundle():
+    try:
+        from . import _nltk_bundle
+        return _nltk_bundle
+    except ImportError:
+        return None
+
+
+def _nltk_find(resource: str):
+    """
+    Localiza um recurso do NLTK apenas em disco (import tardio do NLTK).
+    """
+    import nltk
+    if NLTK_DATA_PATH not in nltk.data.path:
+        nltk.data.path.append(NLTK_DATA_PATH)
+    try:
+        return nltk.data.find(resource)
+    except LookupError:
+        if not ALLOW_DOWNLOAD:
+            # A mensagem do NLTK ocupa várias linhas no log
+            raise LookupError(f"recurso '{resource}' não encontrado em {nltk.data.path}") from None
+    # 'stemmers/rslp/step0.pt' -> pacote 'rslp'
+    package = resource.split('/')[1]
+    logger.warning("Recurso NLTK '%s' não encontrado, tentando baixar...", package)
+    os.makedirs(NLTK_DATA_PATH, exist_ok=True)
+    nltk.download(package, download_dir=NLTK_DATA_PATH, quiet=True)
+    return nltk.data.find(resource)
+
+
+def load_stopwords() -> Optional[Set[str]]:
+    bundle = _bundle()
+    if bundle is not None:
+        return set(bundle.STOPWORDS)
+    try:
+        path = _nltk_find('corpora/stopwords/portuguese')
+        with open(str(path), encoding='utf-8') as f:
+            return {line.strip() for line in f if line.strip()}
+    except Exception as e:
+        logger.warning("Stopwords do NLTK indisponíveis: %s", _first_line(e))
+        return None
+
+
+def parse_rslp_rules(raw: str) -> list:
+    """
+    Lê um arquivo de regras do RSLP no mesmo formato do nltk.stem.RSLPStemmer.
+    """
+    rules = []
+    for line in raw.split("\n"):
+        if line == "" or line[0] == "#":
+            continue
+        tokens = line.replace("\t\t", "\t").split("\t")
+        rules.append([
+            tokens[0][1:-1],
+            int(tokens[1]),
+            tokens[2][1:-1],
+            [token[1:-1] for token in tokens[3].split(",")],
+        ])
+    return rules
+
+
+def load_rslp_rules() -> Optional[list]:
+    bundle = _bundle()
+    if bundle is not None:
+        return bundle.RSLP_RULES
+    try:
+        steps = []
+        for filename in RSLP_STEPS:
+            path = _nltk_find(f'stemmers/rslp/{filename}')
+            with open(str(path), encoding='utf-8') as f:
+                steps.append(parse_rslp_rules(f.read()))
+        return steps
+    except Exception as e:
+        logger.warning("Regras do RSLP indisponíveis: %s", _first_line(e))
+        return None
+
+
+class RSLPStemmer:
+    """
+    Mesmo algoritmo do nltk.stem.RSLPStemmer, sobre regras já carregadas.
+    Levanta RuntimeError se não houver regras.
+    """
+
+    def __init__(self, rules: Optional[list] = None):
+        rules = load_rslp_rules() if rules is None else rules
+        if not rules or not any(rules):
+            raise RuntimeError(
+                "Regras do RSLP não encontradas: gere classifiers/_nltk_bundle.py com "
+                "'python -m classifiers.build_nltk_resources' ou instale os dados 'rslp' do NLTK"
+            )
+        self._model = [
+            [(suffix, min_size, replacement, frozenset(exceptions))
+             for suffix, min_size, replacement, exceptions in step]
+            for step in rules
+        ]
+
+    def stem(self, word: str) -> str:
+        word = word.lower()
+
+        # the word ends in 's'? apply rule for plural reduction
+        if word[-1] == "s":
+            word = self.apply_rule(word, 0)
+
+        # the word ends in 'a'? apply rule for feminine reduction
+        if word[-1] == "a":
+            word = self.apply_rule(word, 1)
+
+        # augmentative reduction
+        word = self.apply_rule(word, 3)
+
+        # adverb reduction
+        word = self.apply_rule(word, 2)
+
+        # noun reduction
+        prev_word = word
+        word = self.apply_rule(word, 4)
+        if word == prev_word:
+            # verb reduction
+            prev_word = word
+            word = self.apply_rule(word, 5)
+            if word == prev_word:
+                # vowel removal
+                word = self.apply_rule(word, 6)
+
+        return word
+
+    def apply_rule(self, word: str, rule_index: int) -> str:
+        for suffix, min_size, replacement, exceptions in self._model[rule_index]:
+            suffix_length = len(suffix)
+            if word[-suffix_length:] == suffix:
+                if len(word) >= suffix_length + min_size:
+                    if word not in exceptions:
+                        word = word[:-suffix_length] + replacement
+                        break
+        return word
@@ -1,26 +1,60 @@
+import asyncio
+import hashlib
+import logging
 import os
-from typing import Literal
+import time
+from typing import Literal, Optional, Tuple
 import random
 
+from .cache import LRUCache
+from .observer import NULL_OBSERVER
+
 try:
     import openai
     OPENAI_AVAILABLE = True
 except ImportError:
     OPENAI_AVAILABLE = False
 
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+# Permite apontar para um servidor compatível (ex.: mock local em testes)
+OPENAI_API_BASE = os.getenv("OPENAI_API_BASE")
+OPENAI_TIMEOUT_SECONDS = float(os.getenv("OPENAI_TIMEOUT_SECONDS", 8))
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", 16))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", 5000))
+OPENAI_TEMPERATURE = 0.7
+OPENAI_MAX_TOKENS = 200
+
+logger = logging.getLogger(__name__)
+
 class ResponseGenerator:
-    def __init__(self):
+    def __init__(self, response_cache_size: Optional[int] = None):
         self.use_openai = False
         
+        # Respostas do LLM por (categoria, hash do email normalizado); 0 desativa
+        response_cache_size = RESPONSE_CACHE_SIZE if response_cache_size is None else response_cache_size
+        self.response_cache = LRUCache(response_cache_size) if response_cache_size > 0 else None
+        # Camada opcional em disco, compartilhada entre processos (ver classifiers.persistent_cache)
+        self.persistent_cache = None
+        self._reply_version = self.reply_version()
+        
+        # Sessão HTTP e semáforo do caminho assíncrono, criados no event loop em uso
+        self._session = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.timeouts = 0
+        # Recebe duração das etapas e fallbacks (ver classifiers.observer)
+        self.observer = NULL_OBSERVER
+        
         if OPENAI_AVAILABLE:
             api_key = os.getenv("OPENAI_API_KEY")
             if api_key:
                 openai.api_key = api_key
+                if OPENAI_API_BASE:
+                    openai.api_base = OPENAI_API_BASE
                 self.use_openai = True
             else:
-                print("Warning: OPENAI_API_KEY not found. Using local response generation.")
+                logger.warning("OPENAI_API_KEY not found. Using local response generation.")
         else:
-            print("Warning: OpenAI not installed. Using local response generation.")
+            logger.warning("OpenAI not installed. Using local response generation.")
     
     def generate_local_response(self, email_text: str, category: Literal["Produtivo", "Improdutivo"]) -> str:
         if category == "Produtivo":
@@ -40,7 +74,7 @@ class ResponseGenerator:
         response = random.choice(templates)
         return response.format(protocol) if "{}" in response else response
     
-    def generate_openai_response(self, email_text: str, category: Literal["Produtivo", "Improdutivo"]) -> str:
+    def _build_messages(self, email_text: str, category: Literal["Produtivo", "Improdutivo"]) -> list:
         if category == "Produtivo":
             prompt = f"""
             Você é um assistente de uma empresa financeira. Gere uma resposta profissional e útil para o seguinte email.
@@ -61,24 +95,178 @@ class ResponseGenerator:
             Resposta (em português brasileiro, máximo 100 palavras):
             """
         
+        return [
+            {"role": "system", "content": "Você é um assistente profissional de uma empresa financeira."},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def reply_version(self) -> str:
+        """
+        Versão das respostas guardadas no cache persistente: modelo,
+        parâmetros de geração e o prompt de cada categoria (montado com um
+        email de referência longo, para que mudar o texto ou o corte do
+        email também mude a versão).
+        """
+        probe = ''.join(chr(ord('a') + i % 26) for i in range(4096))
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(repr((OPENAI_TEMPERATURE, OPENAI_MAX_TOKENS)).encode('utf-8'))
+        for category in ("Produtivo", "Improdutivo"):
+            digest.update(repr(self._build_messages(probe, category)).encode('utf-8'))
+        return f"{OPENAI_MODEL}:{digest.hexdigest()}"
+    
+    def _cache_key(self, email_text: str, category: str) -> tuple:
+        normalized = ' '.join(email_text.lower().split())
+        return category, hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).digest()
+    
+    def _cached_response(self, key: tuple) -> Optional[str]:
+        if self.response_cache is not None:
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                return cached
+        if self.persistent_cache is not None:
+            cached = self.persistent_cache.get("reply", self._reply_version, self._persistent_key(key))
+            if cached is not None and self.response_cache is not None:
+                self.response_cache.put(key, cached)
+            return cached
+        return None
+    
+    def _store_response(self, key: tuple, content: str) -> None:
+        if self.response_cache is not None:
+            self.response_cache.put(key, content)
+        if self.persistent_cache is not None:
+            self.persistent_cache.put("reply", self._reply_version, self._persistent_key(key), content)
+    
+    @staticmethod
+    def _persistent_key(key: tuple) -> bytes:
+        category, digest = key
+        return category.encode('utf-8') + b':' + digest
+    
+    def generate_openai_response(self, email_text: str, category: Literal["Produtivo", "Improdutivo"]) -> str:
+        key = self._cache_key(email_text, category)
+        cached = self._cached_response(key)
+        if cached is not None:
+            return cached
+        
         try:
             response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "Você é um assistente profissional de uma empresa financeira."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=200
+                model=OPENAI_MODEL,
+                messages=self._build_messages(email_text, category),
+                temperature=OPENAI_TEMPERATURE,
+                max_tokens=OPENAI_MAX_TOKENS,
+                request_timeout=OPENAI_TIMEOUT_SECONDS
             )
             
-            return response.choices[0].message.content.strip()
+            content = response.choices[0].message.content.strip()
         except Exception as e:
-            print(f"OpenAI error: {e}")
+            logger.error("OpenAI error: %s", e)
+            self.observer.count_fallback("openai_error")
             return self.generate_local_response(email_text, category)
+        
+        self._store_response(key, content)
+        return content
+    
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            import aiohttp
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=OPENAI_MAX_CONCURRENCY, keepalive_timeout=30)
+            )
+        return self._session
+    
+    async def agenerate_openai_response(self, email_text: str, category: Literal["Produtivo", "Improdutivo"]) -> str:
+        content = await self._agenerate_openai_content(email_text, category)
+        return content if content is not None else self.generate_local_response(email_text, category)
+    
+    async def _agenerate_openai_content(self, email_text: str, category: Literal["Produtivo", "Improdutivo"]) -> Optional[str]:
+        # Resposta do LLM (ou do cache), ou None se a chamada falhar
+        key = self._cache_key(email_text, category)
+        cached = self._cached_response(key)
+        if cached is not None:
+            return cached
+        
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
+        
+        try:
+            async with self._semaphore:
+                # O openai 0.28 reutiliza a sessão definida em openai.aiosession (pool de conexões)
+                token = openai.aiosession.set(await self._get_session())
+                try:
+                    response = await asyncio.wait_for(
+                        openai.ChatCompletion.acreate(
+                            model=OPENAI_MODEL,
+                            messages=self._build_messages(email_text, category),
+                            temperature=OPENAI_TEMPERATURE,
+                            max_tokens=OPENAI_MAX_TOKENS,
+                            request_timeout=OPENAI_TIMEOUT_SECONDS
+                        ),
+                        OPENAI_TIMEOUT_SECONDS
+                    )
+                finally:
+                    openai.aiosession.reset(token)
+            
+            content = response.choices[0].message.content.strip()
+        except (asyncio.TimeoutError, openai.error.Timeout):
+            self.timeouts += 1
+            logger.warning("OpenAI timeout after %gs, using local response", OPENAI_TIMEOUT_SECONDS)
+            self.observer.count_fallback("openai_timeout")
+            return None
+        except Exception as e:
+            logger.error("OpenAI error: %s", e)
+            self.observer.count_fallback("openai_error")
+            return None
+        
+        self._store_response(key, content)
+        return content
     
     def generate_response(self, email_text: str, category: Literal["Produtivo", "Improdutivo"]) -> str:
+        started = time.perf_counter()
         if self.use_openai:
-            return self.generate_openai_response(email_text, category)
+            response = self.generate_openai_response(email_text, category)
         else:
-            return self.generate_local_response(email_text, category)
\ No newline at end of file
+            response = self.generate_local_response(email_text, category)
+        self.observer.observe_stage("response_generation", time.perf_counter() - started)
+        return response
+    
+    async def agenerate_response(self, email_text: str, category: Literal["Produtivo", "Improdutivo"]) -> str:
+        return (await self.agenerate_response_detailed(email_text, category))[0]
+    
+    async def agenerate_response_detailed(self, email_text: str,
+                                          category: Literal["Produtivo", "Improdutivo"]) -> Tuple[str, bool]:
+        """
+        Como agenerate_response(), indicando se a resposta veio do LLM. A
+        resposta local tem número de protocolo aleatório e é própria deste
+        email: não deve ser reaproveitada para outro.
+        """
+        started = time.perf_counter()
+        response = await self._agenerate_openai_content(email_text, category) if self.use_openai else None
+        from_llm = response is not None
+        if not from_llm:
+            response = self.generate_local_response(email_text, category)
+        self.observer.observe_stage("response_generation", time.perf_counter() - started)
+        return response, from_llm
+    
+    def warm_response_cache(self, limit: int) -> int:
+        """
+        Carrega no cache em memória as respostas mais recentes do cache
+        persistente para o modelo e o prompt atuais. Devolve quantas foram
+        carregadas.
+        """
+        if self.persistent_cache is None or self.response_cache is None or not self.use_openai:
+            return 0
+        entries = self.persistent_cache.recent("reply", self._reply_version, limit)
+        for key, content in entries:
+            category, _, digest = key.partition(b':')
+            self.response_cache.put((category.decode('utf-8'), digest), content)
+        return len(entries)
+    
+    def cache_stats(self) -> dict:
+        return {
+            "response_cache": self.response_cache.stats() if self.response_cache is not None else None,
+            "openai_timeouts": self.timeouts,
+        }
+    
+    async def aclose(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
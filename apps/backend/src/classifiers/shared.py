@@ -0,0 +1,210 @@
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+_import_started = time.perf_counter()
+
+from .keywords import DEFAULT_KEYWORDS_PATH
+from .lexicon import CompiledLexicon, DEFAULT_LEXICON_PATH
+from .near_duplicates import NEAR_DUP_MAX_CLUSTERS, NearDuplicateIndex
+from .nlp_classifier import EmailClassifier
+from .persistent_cache import PERSISTENT_CACHE_PATH, PERSISTENT_CACHE_WARM_ENTRIES, PersistentCache
+from .response_generator import ResponseGenerator
+from .threads import THREAD_STATE_MAX, ThreadStore
+
+logger = logging.getLogger(__name__)
+
+# Intervalo de verificação do arquivo de palavras-chave, em segundos (0 desativa)
+LEXICON_RELOAD_SECONDS = float(os.getenv("LEXICON_RELOAD_SECONDS", 5))
+
+# Instâncias compartilhadas pelo processo (main.py e vercel_app.py)
+_lock = threading.Lock()
+_classifier: Optional[EmailClassifier] = None
+_response_generator: Optional[ResponseGenerator] = None
+_watcher: Optional["LexiconWatcher"] = None
+_near_duplicates: Optional[NearDuplicateIndex] = None
+_thread_store: Optional[ThreadStore] = None
+_persistent_cache: Optional[PersistentCache] = None
+_persistent_cache_failed = False
+
+# Custos de startup do processo, em milissegundos (expostos em /health)
+startup_timings = {"import_ms": round((time.perf_counter() - _import_started) * 1000, 2)}
+
+
+def load_prebuilt_lexicon(path: str = DEFAULT_LEXICON_PATH) -> Optional[CompiledLexicon]:
+    """
+    Carrega o léxico gerado por ``python -m classifiers.build_lexicon``.
+    Sem artefato (ou com artefato inválido) o classificador compila o léxico.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        return CompiledLexicon.load(path)
+    except Exception as e:
+        logger.warning("Não foi possível carregar o léxico pré-compilado: %s", e)
+        return None
+
+
+def get_persistent_cache() -> Optional[PersistentCache]:
+    """
+    Cache em disco do processo, ou None se desativado (PERSISTENT_CACHE_PATH
+    vazio) ou se o arquivo não puder ser aberto.
+    """
+    global _persistent_cache, _persistent_cache_failed
+    if _persistent_cache is None and PERSISTENT_CACHE_PATH and not _persistent_cache_failed:
+        with _lock:
+            if _persistent_cache is None and not _persistent_cache_failed:
+                try:
+                    _persistent_cache = PersistentCache(PERSISTENT_CACHE_PATH)
+                except Exception as e:
+                    logger.warning("Cache persistente indisponível em %s: %s", PERSISTENT_CACHE_PATH, e)
+                    _persistent_cache_failed = True
+    return _persistent_cache
+
+
+def get_classifier() -> EmailClassifier:
+    global _classifier
+    if _classifier is None:
+        persistent_cache = get_persistent_cache()
+        with _lock:
+            if _classifier is None:
+                started = time.perf_counter()
+                classifier = EmailClassifier(lexicon=load_prebuilt_lexicon())
+                classifier.persistent_cache = persistent_cache
+                _classifier = classifier
+                startup_timings["classifier_init_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return _classifier
+
+
+def get_response_generator() -> ResponseGenerator:
+    global _response_generator
+    if _response_generator is None:
+        persistent_cache = get_persistent_cache()
+        with _lock:
+            if _response_generator is None:
+                response_generator = ResponseGenerator()
+                response_generator.persistent_cache = persistent_cache
+                _response_generator = response_generator
+    return _response_generator
+
+
+def get_near_duplicate_index() -> Optional[NearDuplicateIndex]:
+    """
+    Índice de quase-duplicados do processo, ou None se desativado
+    (NEAR_DUP_MAX_CLUSTERS=0).
+    """
+    global _near_duplicates
+    if _near_duplicates is None and NEAR_DUP_MAX_CLUSTERS > 0:
+        with _lock:
+            if _near_duplicates is None:
+                _near_duplicates = NearDuplicateIndex()
+    return _near_duplicates
+
+
+def get_thread_store() -> Optional[ThreadStore]:
+    """
+    Estados de conversa do processo, ou None se desativado (THREAD_STATE_MAX=0).
+    """
+    global _thread_store
+    if _thread_store is None and THREAD_STATE_MAX > 0:
+        with _lock:
+            if _thread_store is None:
+                _thread_store = ThreadStore()
+    return _thread_store
+
+
+def warm_up() -> None:
+    """
+    Cria as instâncias compartilhadas e executa uma classificação de
+    aquecimento, para que a primeira requisição pague apenas a pontuação.
+    """
+    started = time.perf_counter()
+    classifier = get_classifier()
+    get_response_generator()
+    classifier.classify_with_rules("Olá, segue a proposta do contrato para aquecimento.")
+    if get_persistent_cache() is not None:
+        # Partida a quente: os emails mais recentes já respondem da memória
+        warmed = classifier.warm_result_cache(PERSISTENT_CACHE_WARM_ENTRIES)
+        warmed += get_response_generator().warm_response_cache(PERSISTENT_CACHE_WARM_ENTRIES)
+        startup_timings["persistent_cache_warm_entries"] = warmed
+    startup_timings["warm_up_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+
+def set_observer(observer) -> None:
+    """
+    Liga as instâncias compartilhadas a um observador de etapas e fallbacks
+    (ver classifiers.observer).
+    """
+    get_classifier().observer = observer
+    get_response_generator().observer = observer
+
+
+def _file_signature(path: str) -> Optional[tuple]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class LexiconWatcher:
+    """
+    Thread que observa o arquivo de palavras-chave e, quando ele muda,
+    recarrega o léxico do classificador. A troca é uma atribuição de
+    referência: as requisições nunca esperam pela recarga. Um arquivo
+    inválido é ignorado e a versão ativa continua em uso.
+    """
+
+    def __init__(self, classifier: EmailClassifier, path: str = DEFAULT_KEYWORDS_PATH,
+                 interval: float = LEXICON_RELOAD_SECONDS):
+        self.classifier = classifier
+        self.path = path
+        self.interval = interval
+        self._signature = _file_signature(path)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="lexicon-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def check(self) -> bool:
+        signature = _file_signature(self.path)
+        if signature is None or signature == self._signature:
+            return False
+        self._signature = signature
+        try:
+            return self.classifier.reload_lexicon(self.path)
+        except Exception as e:
+            logger.error("Falha ao recarregar palavras-chave de %s, mantendo a versão %s: %s",
+                         self.path, self.classifier.lexicon_version, e)
+            self.classifier.observer.count_fallback("lexicon_reload_error")
+            return False
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
+
+
+def start_lexicon_watcher() -> None:
+    global _watcher
+    if LEXICON_RELOAD_SECONDS <= 0 or _watcher is not None:
+        return
+    classifier = get_classifier()
+    _watcher = LexiconWatcher(classifier, classifier.keywords_path)
+    _watcher.start()
+
+
+def stop_lexicon_watcher() -> None:
+    global _watcher
+    if _watcher is not None:
+        _watcher.stop()
+        _watcher = None
@@ -0,0 +1,140 @@
+"""
+Estado incremental de classificação por conversa (thread).
+
+Cada conversa guarda só o que a pontuação precisa para continuar: os scores
+acumulados e os dois últimos stems (ScoreState do léxico, ou LinearState do
+backend linear). Uma nova resposta é pré-processada e pontuada sozinha, e o
+resultado é o mesmo de reclassificar a conversa inteira.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Optional, Tuple, Union
+
+from .lexicon import ScoreState
+
+if TYPE_CHECKING:
+    from .linear_model import LinearState
+
+# Conversas mantidas (0 desativa) e validade desde a última mensagem
+THREAD_STATE_MAX = int(os.getenv("THREAD_STATE_MAX", 10000))
+THREAD_STATE_TTL_SECONDS = float(os.getenv("THREAD_STATE_TTL_SECONDS", 86400))
+
+
+class ThreadState:
+    """
+    Estado de uma conversa, válido apenas para a versão do classificador
+    que o criou. ``lock`` (reentrante) serializa mensagens da mesma conversa.
+    """
+
+    __slots__ = ("thread_id", "version", "score", "messages", "expires_at", "lock")
+
+    def __init__(self, thread_id: str, version: str, score: Union[ScoreState, "LinearState"]):
+        self.thread_id = thread_id
+        self.version = version
+        self.score = score
+        self.messages = 0
+        self.expires_at = 0.0
+        self.lock = threading.RLock()
+
+    @property
+    def tokens(self) -> int:
+        return self.score.tokens
+
+
+class ThreadStore:
+    """
+    Estados de conversa limitados a ``max_threads`` (os usados há mais tempo
+    saem primeiro) e que expiram ``ttl_seconds`` depois do último acesso.
+    Thread-safe.
+    """
+
+    def __init__(self, max_threads: int = THREAD_STATE_MAX, ttl_seconds: float = THREAD_STATE_TTL_SECONDS):
+        if max_threads <= 0:
+            raise ValueError("max_threads deve ser positivo")
+        self.max_threads = max_threads
+        self.ttl_seconds = ttl_seconds
+        self._states: "OrderedDict[str, ThreadState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, thread_id: str, version: str = "") -> Optional[ThreadState]:
+        """
+        Estado da conversa, ou None se não existir, tiver expirado ou for de
+        outra versão do classificador (nesses casos ele é descartado).
+        """
+        with self._lock:
+            return self._get(thread_id, version, time.time())
+
+    def get_or_create(self, thread_id: str, version: str,
+                      factory: Callable[[], ThreadState]) -> Tuple[ThreadState, bool]:
+        """
+        Estado da conversa, criado com ``factory()`` se não houver um válido,
+        e se ele foi criado agora. Busca e criação são atômicas: mensagens
+        simultâneas de uma conversa nova recebem o mesmo estado. O estado
+        criado volta com ``lock`` adquirido, para o chamador reconstruir o
+        histórico antes de qualquer outra mensagem, e cabe a ele liberar.
+        """
+        with self._lock:
+            now = time.time()
+            state = self._get(thread_id, version, now)
+            if state is not None:
+                return state, False
+            state = factory()
+            state.lock.acquire()
+            self._insert(state, now)
+            return state, True
+
+    def put(self, state: ThreadState) -> None:
+        with self._lock:
+            self._insert(state, time.time())
+
+    def _get(self, thread_id: str, version: str, now: float) -> Optional[ThreadState]:
+        state = self._states.get(thread_id)
+        if state is not None and (state.expires_at <= now or state.version != version):
+            del self._states[thread_id]
+            state = None
+        if state is None:
+            self.misses += 1
+            return None
+        # Cada acesso renova a validade e vai para o fim da ordem de uso
+        state.expires_at = now + self.ttl_seconds
+        self._states.move_to_end(thread_id)
+        self.hits += 1
+        return state
+
+    def _insert(self, state: ThreadState, now: float) -> None:
+        state.expires_at = now + self.ttl_seconds
+        self._states[state.thread_id] = state
+        self._states.move_to_end(state.thread_id)
+        # Ordem de uso = ordem de expiração: expirados e excedentes estão no início
+        while self._states:
+            oldest = next(iter(self._states.values()))
+            if oldest.expires_at > now and len(self._states) <= self.max_threads:
+                break
+            del self._states[oldest.thread_id]
+            self.evictions += 1
+
+    def discard(self, thread_id: str) -> bool:
+        with self._lock:
+            return self._states.pop(thread_id, None) is not None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._states.clear()
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._states),
+                "maxsize": self.max_threads,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
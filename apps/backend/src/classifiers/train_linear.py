@@ -0,0 +1,93 @@
+"""
+Treina o classificador linear (classifiers.linear_model) a partir de um CSV
+rotulado, com uma coluna de texto e outra com "Produtivo"/"Improdutivo".
+
+Uso (a partir de apps/backend/src):
+    python -m classifiers.train_linear emails.csv [--output caminho.npz]
+        [--text-column text] [--label-column category] [--holdout 0.2]
+"""
+import argparse
+import csv
+import random
+import sys
+import time
+from typing import List, Tuple
+
+from .linear_model import DEFAULT_LINEAR_MODEL_PATH, LINEAR_FEATURES, LinearModel, train_linear_model
+from .nlp_classifier import EmailClassifier
+
+LABELS = {"produtivo": "Produtivo", "improdutivo": "Improdutivo"}
+
+
+def read_labelled_csv(path: str, text_column: str, label_column: str) -> List[Tuple[str, str]]:
+    # Emails longos passam do limite padrão de 128 KB por campo
+    csv.field_size_limit(2 ** 31 - 1)
+    rows = []
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for column in (text_column, label_column):
+            if column not in (reader.fieldnames or []):
+                raise ValueError(f"Coluna '{column}' não encontrada no CSV")
+        for line, row in enumerate(reader, start=2):
+            label = LABELS.get((row[label_column] or "").strip().lower())
+            if label is None:
+                raise ValueError(f"Linha {line}: rótulo inválido {row[label_column]!r}")
+            rows.append(((row[text_column] or ""), label))
+    return rows
+
+
+def accuracy(predicted: List[str], expected: List[str]) -> float:
+    return sum(1 for p, e in zip(predicted, expected) if p == e) / len(expected) if expected else 0.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Treina o classificador linear de emails")
+    parser.add_argument("csv", help="CSV rotulado")
+    parser.add_argument("--output", default=DEFAULT_LINEAR_MODEL_PATH)
+    parser.add_argument("--text-column", default="text")
+    parser.add_argument("--label-column", default="category")
+    parser.add_argument("--features", type=int, default=LINEAR_FEATURES, help="Tamanho do vetor de features")
+    parser.add_argument("--epochs", type=int, default=300)
+    parser.add_argument("--learning-rate", type=float, default=0.5)
+    parser.add_argument("--l2", type=float, default=1e-4)
+    parser.add_argument("--holdout", type=float, default=0.2, help="Fração separada para avaliação")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    try:
+        rows = read_labelled_csv(args.csv, args.text_column, args.label_column)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+    if not rows:
+        print("❌ Nenhum exemplo no CSV", file=sys.stderr)
+        sys.exit(1)
+
+    random.Random(args.seed).shuffle(rows)
+    split = len(rows) - int(len(rows) * args.holdout)
+    train_rows, test_rows = rows[:split], rows[split:]
+
+    classifier = EmailClassifier(result_cache_size=0)
+    started = time.perf_counter()
+    token_lists = [classifier.preprocess_tokens(text) for text, _ in train_rows]
+    model = train_linear_model(
+        token_lists, [label for _, label in train_rows], n_features=args.features,
+        epochs=args.epochs, learning_rate=args.learning_rate, l2=args.l2
+    )
+    model.save(args.output)
+    print(f"✅ Modelo linear {model.version} salvo em {args.output} "
+          f"({len(train_rows)} exemplos, {time.perf_counter() - started:.1f}s)")
+
+    if test_rows:
+        expected = [label for _, label in test_rows]
+        linear = LinearModel.load(args.output).predict_many(
+            [classifier.preprocess_tokens(text) for text, _ in test_rows]
+        )
+        rules = [classifier.classify_with_rules(text) for text, _ in test_rows]
+        print(f"Acurácia em {len(test_rows)} exemplos separados: "
+              f"linear {accuracy([c for c, _ in linear], expected):.3f} | "
+              f"regras {accuracy([c for c, _ in rules], expected):.3f}")
+
+
+if __name__ == "__main__":
+    main()
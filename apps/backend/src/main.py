@@ -1,16 +1,39 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form
+from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.requests import ClientDisconnect
 from typing import Optional
+import asyncio
+import json
+import logging
 import os
 import sys
 
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from classifiers.nlp_classifier import EmailClassifier
-from classifiers.response_generator import ResponseGenerator
+from classifiers.shared import (
+    get_classifier, get_response_generator, get_near_duplicate_index, get_thread_store, get_persistent_cache, set_observer, warm_up,
+    startup_timings, start_lexicon_watcher, stop_lexicon_watcher
+)
 from utils.text_processor import extract_text_from_file
-from models.schemas import EmailResponse
+from utils.pdf_pool import get_pdf_pool, parse_page_range, PdfPoolSaturated, PdfExtractionTimeout
+from utils.batch_input import parse_batch_payload, iter_ndjson_batches
+from utils.jobs import JobQueue, JobQueueFull, FINISHED
+from utils.limits import (
+    RequestLimitMiddleware, BATCH_MAX_BYTES, MAX_TEXT_BYTES, MAX_UPLOAD_BYTES, MULTIPART_OVERHEAD,
+    check_text_size
+)
+from utils.log import configure_logging
+from utils.streaming import DuplexStreamingResponse
+from utils.metrics import REGISTRY, CLASSIFICATIONS, stage_metrics
+from models.schemas import (
+    EmailResponse, BatchItemResult, BatchResponse, JobStatus, NearDuplicate, Explanation,
+    ThreadMessageRequest, ThreadResponse
+)
+
+configure_logging()
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="Email Classifier API",
@@ -18,6 +41,19 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Limites de tamanho e por cliente, antes de qualquer parse (o CORS fica por fora
+# para que os 413/429 também levem os cabeçalhos)
+app.add_middleware(
+    RequestLimitMiddleware,
+    body_limits={
+        "/api/classify": max(MAX_TEXT_BYTES, MAX_UPLOAD_BYTES) + MULTIPART_OVERHEAD,
+        "/api/classify/batch": BATCH_MAX_BYTES,
+        "/api/classify/thread": BATCH_MAX_BYTES,
+        # Conexão longa: sem limite total, cada linha é limitada a MAX_TEXT_BYTES
+        "/api/classify/stream": 0,
+    },
+)
+
 # Configuração CORS
 app.add_middleware(
     CORSMiddleware,
@@ -28,36 +64,100 @@ app.add_middleware(
 )
 
 
-classifier = None
-response_gen = None
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", 1000))
+# Orçamento de leitura de arquivos enviados (0 = sem limite)
+FILE_CHAR_BUDGET = int(os.getenv("FILE_CHAR_BUDGET", 50000))
+FILE_TOKEN_BUDGET = int(os.getenv("FILE_TOKEN_BUDGET", 0))
+
+# Emails lidos do stream e ainda não escritos na resposta, por conexão
+STREAM_MAX_IN_FLIGHT = int(os.getenv("STREAM_MAX_IN_FLIGHT", 64))
+
+JOB_WAIT_MAX_SECONDS = 30
 
-def get_classifier():
-    global classifier
-    if classifier is None:
-        classifier = EmailClassifier()
-    return classifier
+async def generate_reply_job(payload: dict) -> dict:
+    suggested_response, from_llm = await get_response_generator().agenerate_response_detailed(
+        payload["text"], payload["category"]
+    )
+    near_duplicates = get_near_duplicate_index()
+    if payload.get("cluster_id") and from_llm and near_duplicates is not None:
+        near_duplicates.attach_response(payload["cluster_id"], suggested_response)
+    return {"suggested_response": suggested_response}
+
+def find_near_duplicate(near_duplicates, classifier, text: str, version: str, tokens=None):
+    """
+    Assinatura MinHash do email, o grupo quase idêntico encontrado
+    (grupo, similaridade), se houver, e as partes pré-processadas do texto,
+    para a classificação não repetir o pré-processamento. Com ``tokens``
+    (stems já lidos por um stream de arquivo) o texto não é pré-processado
+    de novo e as partes vêm None. A assinatura é None em emails curtos.
+    """
+    if tokens is None:
+        chunks = classifier.scoring_chunks(text)
+        shingles = classifier.shingles_from_chunks(chunks)
+    else:
+        chunks = None
+        shingles = classifier.shingles_from_tokens(tokens)
+    signature = near_duplicates.signature(shingles)
+    if signature is None:
+        return None, None, chunks
+    return signature, near_duplicates.lookup(signature, version), chunks
 
-def get_response_generator():
-    global response_gen
-    if response_gen is None:
-        response_gen = ResponseGenerator()
-    return response_gen
+# Respostas sugeridas geradas em segundo plano (modo async_response)
+reply_jobs = JobQueue(generate_reply_job)
+
+@app.on_event("startup")
+async def startup():
+    # Aquece o classificador compartilhado antes da primeira requisição
+    warm_up()
+    # O aquecimento não entra nas métricas
+    set_observer(stage_metrics)
+    start_lexicon_watcher()
+    reply_jobs.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await reply_jobs.stop()
+    stop_lexicon_watcher()
+    persistent_cache = get_persistent_cache()
+    if persistent_cache is not None:
+        # Grava o que ainda está na fila da thread de escrita
+        await asyncio.get_running_loop().run_in_executor(None, persistent_cache.close)
+    get_pdf_pool().shutdown()
+    await get_response_generator().aclose()
 
 @app.post("/api/classify", response_model=EmailResponse)
 async def classify_email(
     email_text: Optional[str] = Form(None),
-    file: Optional[UploadFile] = File(None)
+    file: Optional[UploadFile] = File(None),
+    async_response: bool = Form(False),
+    explain: bool = Form(False),
+    pdf_pages: Optional[str] = Form(None)
 ):
     """
     CLASSIFICAÇÃO DOS EMAILS
+    Com async_response=true a categoria volta na hora e a resposta sugerida
+    é gerada em segundo plano (GET /api/jobs/{job_id}). Com explain=true a
+    resposta traz os n-grams e scores que decidiram a categoria. pdf_pages
+    ("1-5") limita as páginas lidas de um PDF.
     """
    
     try:
+        classifier = get_classifier()
+        stream = None
+        pages = parse_page_range(pdf_pages)
         
         if email_text:
+            check_text_size(email_text)
             text = email_text.strip()
+        elif file and explain:
+            # A explicação pontua o texto inteiro de uma vez, sem o caminho página a página
+            text = await extract_text_from_file(file, pages=pages)
+            if FILE_CHAR_BUDGET:
+                text = text[:FILE_CHAR_BUDGET]
         elif file:
-            text = await extract_text_from_file(file)
+            # Arquivos são classificados página a página, parando ao fim do orçamento
+            stream = classifier.start_stream(FILE_CHAR_BUDGET, FILE_TOKEN_BUDGET)
+            text = await extract_text_from_file(file, on_chunk=stream.feed, pages=pages)
         else:
             raise HTTPException(
                 status_code=400, 
@@ -66,38 +166,445 @@ async def classify_email(
         
         if not text or len(text) < 10:
 
-            print("Text is too short or empty.")
+            logger.debug("Text is too short or empty.")
             raise HTTPException(
                 status_code=400,
                 detail="Text is too short or empty. Minimum 10 characters required."
             )
         
-        # Get classificação
-        classifier = get_classifier()
-        response_gen = get_response_generator()
+        # Email quase idêntico a um recente: reutiliza a classificação e a resposta do grupo
+        # (só respostas do LLM; a local é gerada de novo). Uma explicação descreve este
+        # texto, então não reaproveita grupos.
+        near_duplicates = None if explain else get_near_duplicate_index()
+        model_version = classifier.model_version
+        signature = cluster = near_duplicate = explanation = chunks = None
+        # Pré-processamento e pontuação são CPU: fora do event loop, como no lote
+        loop = asyncio.get_running_loop()
+        if near_duplicates is not None:
+            # Arquivos: os stems que o stream já leu, sem pré-processar o texto de novo
+            tokens = stream.tokens if stream is not None and stream.tokens_scored else None
+            signature, match, chunks = await loop.run_in_executor(
+                None, find_near_duplicate, near_duplicates, classifier, text, model_version, tokens
+            )
+            if match is not None:
+                cluster, similarity = match
+                near_duplicate = NearDuplicate(cluster_id=cluster.id, similarity=round(similarity, 4))
         
         # Classificação email
-        category, confidence = classifier.classify(text)
+        if cluster is not None:
+            category, confidence, tokens_scored = cluster.category, cluster.confidence, 0
+            lexicon_version = classifier.lexicon_version
+        elif explain:
+            lexicon_version = classifier.lexicon_version
+            details = await loop.run_in_executor(None, classifier.explain, text)
+            category, confidence, tokens_scored = details["category"], details["confidence"], details["tokens_scored"]
+            explanation = Explanation(**details)
+        elif stream is not None and stream.tokens_scored:
+            category, confidence = stream.result()
+            tokens_scored = stream.tokens_scored
+            lexicon_version = stream.lexicon.version
+        else:
+            lexicon_version = classifier.lexicon_version
+            category, confidence, tokens_scored = await loop.run_in_executor(
+                None, classifier.classify_detailed, text, chunks
+            )
+        if signature is not None and cluster is None:
+            cluster = near_duplicates.add(signature, category, confidence, model_version)
+        CLASSIFICATIONS.inc(category)
     
-        suggested_response = response_gen.generate_response(text, category)
+        job_id = None
+        suggested_response = None
+        if cluster is not None and cluster.suggested_response is not None:
+            suggested_response = cluster.suggested_response
+        elif async_response:
+            job_id = await reply_jobs.submit(
+                {"text": text, "category": category, "cluster_id": cluster.id if cluster else None},
+                category=category
+            )
+        else:
+            suggested_response, from_llm = await get_response_generator().agenerate_response_detailed(text, category)
+            if cluster is not None and from_llm:
+                near_duplicates.attach_response(cluster.id, suggested_response)
         
         preview = text[:100] + "..." if len(text) > 100 else text
         
-        print(f"Classified as {category} with confidence {confidence:.2f}")
+        logger.debug("Classified as %s with confidence %.2f", category, confidence)
         return EmailResponse(
             category=category,
             confidence=confidence,
             suggested_response=suggested_response,
-            original_text_preview=preview
+            original_text_preview=preview,
+            job_id=job_id,
+            tokens_scored=tokens_scored,
+            lexicon_version=lexicon_version,
+            near_duplicate=near_duplicate,
+            explanation=explanation
         )
         
     except HTTPException:
         raise
+    except (PdfPoolSaturated, JobQueueFull) as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except PdfExtractionTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+@app.post("/api/classify/batch", response_model=BatchResponse)
+async def classify_email_batch(request: Request, include_response: bool = False, explain: bool = False):
+    """
+    CLASSIFICAÇÃO EM LOTE (array JSON ou NDJSON)
+    Com explain=true cada item traz a explicação da categoria.
+    """
+    body = await request.body()
+    content_type = request.headers.get("content-type", "")
+    results = []
+    valid = []
+
+    classifier = get_classifier()
+    lexicon_version = classifier.lexicon_version
+    model_version = classifier.model_version
+    near_duplicates = None if explain else get_near_duplicate_index()
+    clusters = {}
+
+    def parse_items() -> None:
+        try:
+            items = parse_batch_payload(body, content_type)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        if not items:
+            raise HTTPException(status_code=400, detail="No emails provided in batch.")
+        if len(items) > BATCH_MAX_ITEMS:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Batch too large. Maximum {BATCH_MAX_ITEMS} emails per request."
+            )
+
+        for index, (item_id, text, error) in enumerate(items):
+            if error is None and (not text or len(text) < 10):
+                error = "Text is too short or empty. Minimum 10 characters required."
+            results.append(BatchItemResult(index=index, id=item_id, error=error))
+            if error is None:
+                valid.append((index, text))
+
+    def parse_and_classify() -> None:
+        parse_items()
+        signatures = {}
+        pending = []
+        for index, text in valid:
+            result = results[index]
+            if explain:
+                # Uma passada de pré-processamento por email, com a explicação junto
+                details = classifier.explain(text)
+                result.category, result.confidence = details["category"], details["confidence"]
+                result.tokens_scored = details["tokens_scored"]
+                result.explanation = Explanation(**details)
+                CLASSIFICATIONS.inc(result.category)
+                continue
+            chunks = None
+            if near_duplicates is not None:
+                signature, match, chunks = find_near_duplicate(near_duplicates, classifier, text, model_version)
+                if match is not None:
+                    cluster, similarity = match
+                    clusters[index] = cluster
+                    result.category, result.confidence, result.tokens_scored = cluster.category, cluster.confidence, 0
+                    result.near_duplicate = NearDuplicate(cluster_id=cluster.id, similarity=round(similarity, 4))
+                    CLASSIFICATIONS.inc(cluster.category)
+                    continue
+                signatures[index] = signature
+            pending.append((index, text, chunks))
+
+        classifications = classifier.classify_many_detailed(
+            [text for _, text, _ in pending], [chunks for _, _, chunks in pending]
+        )
+        for (index, _, _), (category, confidence, tokens_scored) in zip(pending, classifications):
+            results[index].category = category
+            results[index].confidence = confidence
+            results[index].tokens_scored = tokens_scored
+            if signatures.get(index) is not None:
+                clusters[index] = near_duplicates.add(signatures[index], category, confidence, model_version)
+            CLASSIFICATIONS.inc(category)
+
+    try:
+        # Decodificação MIME (mbox/.eml), pré-processamento e pontuação de um lote grande
+        # levam centenas de ms de CPU: fora do event loop
+        await asyncio.get_running_loop().run_in_executor(None, parse_and_classify)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+    if include_response:
+        response_gen = get_response_generator()
+
+        async def attach_response(index: int, text: str) -> None:
+            result = results[index]
+            cluster = clusters.get(index)
+            if cluster is not None and cluster.suggested_response is not None:
+                result.suggested_response = cluster.suggested_response
+                return
+            try:
+                result.suggested_response, from_llm = await response_gen.agenerate_response_detailed(
+                    text, result.category
+                )
+                if cluster is not None and from_llm:
+                    near_duplicates.attach_response(cluster.id, result.suggested_response)
+            except Exception as e:
+                result.error = f"Response generation failed: {str(e)}"
+
+        # Concorrência limitada pelo semáforo do ResponseGenerator
+        await asyncio.gather(*(attach_response(index, text) for index, text in valid))
+
+    failed = sum(1 for result in results if result.category is None)
+    return BatchResponse(
+        total=len(results),
+        succeeded=len(results) - failed,
+        failed=failed,
+        lexicon_version=lexicon_version,
+        results=results
+    )
+
+@app.post("/api/classify/thread", response_model=ThreadResponse)
+async def classify_thread_message(request: ThreadMessageRequest):
+    """
+    CLASSIFICAÇÃO DE CONVERSAS
+    Acrescenta a mensagem à conversa thread_id e devolve a categoria da
+    conversa inteira, pré-processando só a mensagem nova. Sem estado guardado
+    (primeira mensagem, estado expirado ou léxico atualizado), as mensagens
+    anteriores enviadas em history reconstroem a conversa; com estado,
+    history é ignorado.
+    """
+    if not request.thread_id or not request.message.strip():
+        raise HTTPException(status_code=400, detail="thread_id and message are required.")
+    for text in [request.message, *(request.history or ())]:
+        check_text_size(text)
+
+    classifier = get_classifier()
+    store = get_thread_store()
+
+    def classify_message():
+        if store is None:
+            state, created = classifier.start_thread(request.thread_id), True
+        else:
+            # Criação atômica: o estado novo vem com o lock já adquirido até o histórico ser refeito
+            state, created = store.get_or_create(request.thread_id, classifier.model_version,
+                                                 lambda: classifier.start_thread(request.thread_id))
+        try:
+            with state.lock:
+                if created:
+                    for text in request.history or ():
+                        classifier.update_thread(state, text)
+                # Totais lidos junto com a mensagem, antes de outra entrar
+                return created, classifier.update_thread(state, request.message), state.tokens, state.messages
+        except Exception:
+            if created and store is not None:
+                store.discard(request.thread_id)
+            raise
+        finally:
+            if created and store is not None:
+                state.lock.release()
+
+    try:
+        created, (category, confidence, tokens_scored), thread_tokens, messages = \
+            await asyncio.get_running_loop().run_in_executor(None, classify_message)
+        status = ("rebuilt" if request.history else "created") if created else "updated"
+        CLASSIFICATIONS.inc(category)
+
+        suggested_response = None
+        if request.include_response:
+            suggested_response = await get_response_generator().agenerate_response(request.message, category)
+        return ThreadResponse(
+            thread_id=request.thread_id,
+            category=category,
+            confidence=confidence,
+            tokens_scored=tokens_scored,
+            thread_tokens=thread_tokens,
+            messages=messages,
+            state=status,
+            suggested_response=suggested_response,
+            lexicon_version=classifier.lexicon_version
+        )
+    except ValueError as e:
+        # Léxico trocado entre a leitura do estado e a pontuação
+        raise HTTPException(status_code=409, detail=f"{str(e)}. Retry the request.")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@app.delete("/api/classify/thread/{thread_id}")
+async def close_thread(thread_id: str):
+    store = get_thread_store()
+    if store is None or not store.discard(thread_id):
+        raise HTTPException(status_code=404, detail="Thread not found or expired.")
+    return {"thread_id": thread_id, "deleted": True}
+
+@app.post("/api/classify/stream")
+async def classify_email_stream(request: Request, include_response: bool = False):
+    """
+    CLASSIFICAÇÃO EM STREAMING (NDJSON)
+    Lê o corpo em blocos conforme chega e escreve uma linha NDJSON por email
+    assim que ele é classificado (em ordem de conclusão; "index" é a posição
+    na entrada). No máximo STREAM_MAX_IN_FLIGHT emails ficam lidos e ainda
+    não escritos: se o cliente não lê as respostas, a leitura do corpo para
+    e o TCP segura o produtor.
+    """
+    classifier = get_classifier()
+    response_gen = get_response_generator() if include_response else None
+    slots = asyncio.Semaphore(STREAM_MAX_IN_FLIGHT)
+    lines: asyncio.Queue = asyncio.Queue()
+
+    async def attach_response(result: dict, text: str) -> None:
+        try:
+            result["suggested_response"] = await response_gen.agenerate_response(text, result["category"])
+        except Exception as e:
+            result["error"] = f"Response generation failed: {str(e)}"
+        lines.put_nowait(result)
+
+    async def produce() -> None:
+        loop = asyncio.get_running_loop()
+        index = 0
+        replies = set()
+        try:
+            async for items in iter_ndjson_batches(request.stream(), MAX_TEXT_BYTES):
+                # Grupos do tamanho da janela: um bloco grande não espera por vagas que só ele liberaria
+                for start in range(0, len(items), STREAM_MAX_IN_FLIGHT):
+                    group = items[start:start + STREAM_MAX_IN_FLIGHT]
+                    for _ in group:
+                        await slots.acquire()
+                    pending = []
+                    for item_id, text, error in group:
+                        if error is None and (not text or len(text) < 10):
+                            error = "Text is too short or empty. Minimum 10 characters required."
+                        if error is None:
+                            pending.append((index, item_id, text))
+                        else:
+                            lines.put_nowait({"index": index, "id": item_id, "error": error})
+                        index += 1
+                    # Fora do event loop: as outras conexões continuam sendo atendidas
+                    classifications = await loop.run_in_executor(
+                        None, classifier.classify_many_detailed, [text for _, _, text in pending]
+                    )
+                    for (i, item_id, text), (category, confidence, tokens_scored) in zip(pending, classifications):
+                        CLASSIFICATIONS.inc(category)
+                        result = {"index": i, "id": item_id, "category": category, "confidence": confidence,
+                                  "tokens_scored": tokens_scored, "error": None}
+                        if response_gen is None:
+                            lines.put_nowait(result)
+                        else:
+                            task = asyncio.create_task(attach_response(result, text))
+                            replies.add(task)
+                            task.add_done_callback(replies.discard)
+            await asyncio.gather(*replies)
+        except ClientDisconnect:
+            logger.info("Cliente desconectou do stream após %d emails", index)
+        except Exception as e:
+            logger.exception("Falha no stream de classificação")
+            lines.put_nowait({"index": None, "error": f"Internal server error: {str(e)}"})
+        finally:
+            for task in replies:
+                task.cancel()
+            lines.put_nowait(None)
+
+    async def results():
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                line = await lines.get()
+                if line is None:
+                    break
+                yield json.dumps(line, ensure_ascii=False) + "\n"
+                if line["index"] is not None:
+                    slots.release()
+        finally:
+            producer.cancel()
+
+    return DuplexStreamingResponse(results())
+
+
+def job_status(job: dict) -> JobStatus:
+    result = job.get("result") or {}
+    return JobStatus(
+        id=job["id"],
+        status=job["status"],
+        category=job.get("category"),
+        suggested_response=result.get("suggested_response"),
+        error=job.get("error")
+    )
+
+@app.get("/api/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str, wait: float = 0):
+    """
+    Status da resposta sugerida. Com wait > 0 (segundos) faz long-poll até concluir.
+    """
+    wait = min(max(wait, 0), JOB_WAIT_MAX_SECONDS)
+    job = await reply_jobs.backend.wait(job_id, wait) if wait else await reply_jobs.backend.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired.")
+    return job_status(job)
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """
+    Stream SSE: envia o status atual e o status final quando o job concluir.
+    """
+    job = await reply_jobs.backend.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired.")
+
+    async def events():
+        current = job
+        yield f"event: status\ndata: {job_status(current).model_dump_json()}\n\n"
+        while current is not None and current["status"] not in FINISHED:
+            current = await reply_jobs.backend.wait(job_id, 15)
+            if current is None:
+                break
+            if current["status"] in FINISHED:
+                yield f"event: status\ndata: {job_status(current).model_dump_json()}\n\n"
+            else:
+                # Keep-alive para proxies não encerrarem a conexão
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    return all_cache_stats()
+
+def all_cache_stats() -> dict:
+    near_duplicates = get_near_duplicate_index()
+    thread_store = get_thread_store()
+    persistent_cache = get_persistent_cache()
+    return {
+        **get_classifier().cache_stats(),
+        **get_response_generator().cache_stats(),
+        "near_duplicate_index": near_duplicates.stats() if near_duplicates is not None else None,
+        "thread_states": thread_store.stats() if thread_store is not None else None,
+        "persistent_cache": persistent_cache.stats() if persistent_cache is not None else None,
+    }
+
+def cache_samples() -> list:
+    stats = all_cache_stats()
+    samples = []
+    for cache in ("result_cache", "stem_cache", "response_cache", "near_duplicate_index", "thread_states",
+                  "persistent_cache"):
+        if stats.get(cache):
+            for key, result in (("hits", "hit"), ("misses", "miss")):
+                samples.append(("email_cache_requests_total", {"cache": cache, "result": result}, stats[cache][key]))
+    return samples
+
+REGISTRY.register_collector(
+    "email_cache_requests_total", "Consultas aos caches por resultado (hit/miss).", cache_samples
+)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Métricas no formato de texto do Prometheus.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
 async def root():
     return {
@@ -105,6 +612,14 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "POST /api/classify": "Classify email and generate response",
+            "POST /api/classify/batch": "Classify a JSON array or NDJSON batch of emails",
+            "POST /api/classify/thread": "Add a message to a thread and classify the whole thread incrementally",
+            "DELETE /api/classify/thread/{thread_id}": "Forget a thread's classification state",
+            "POST /api/classify/stream": "Classify a chunked NDJSON stream, one result line per email",
+            "GET /api/jobs/{job_id}": "Background suggested response status (?wait= for long-poll)",
+            "GET /api/jobs/{job_id}/events": "Background suggested response as Server-Sent Events",
+            "GET /api/cache/stats": "Classifier cache hit/miss counters",
+            "GET /metrics": "Stage latency histograms and counters (Prometheus format)",
             "GET /health": "Health check",
             "GET /": "This info page"
         }
@@ -115,7 +630,10 @@ async def health_check():
     return {
         "status": "healthy", 
         "service": "Email Classifier API",
-        "timestamp": __import__("datetime").datetime.now().isoformat()
+        "timestamp": __import__("datetime").datetime.now().isoformat(),
+        "classifier_backend": get_classifier().backend,
+        "lexicon_version": get_classifier().lexicon_version,
+        "startup": startup_timings
     }
 
 
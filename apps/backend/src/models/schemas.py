@@ -1,11 +1,74 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, Optional, List, Union
 
 class EmailRequest(BaseModel):
     email_text: Optional[str] = None
 
+class ThreadMessageRequest(BaseModel):
+    thread_id: str
+    message: str
+    history: Optional[List[str]] = None
+    include_response: bool = False
+
+class NearDuplicate(BaseModel):
+    cluster_id: str
+    similarity: float
+
+class NgramMatch(BaseModel):
+    ngram: str
+    level: str
+    count: int
+    produtivo: float
+    improdutivo: float
+
+class Explanation(BaseModel):
+    backend: str
+    scores: Dict[str, float]
+    matches: List[NgramMatch]
+
 class EmailResponse(BaseModel):
     category: str
     confidence: float
-    suggested_response: str
-    original_text_preview: str
\ No newline at end of file
+    suggested_response: Optional[str] = None
+    original_text_preview: str
+    job_id: Optional[str] = None
+    tokens_scored: Optional[int] = None
+    lexicon_version: Optional[str] = None
+    near_duplicate: Optional[NearDuplicate] = None
+    explanation: Optional[Explanation] = None
+
+class ThreadResponse(BaseModel):
+    thread_id: str
+    category: str
+    confidence: float
+    tokens_scored: int
+    thread_tokens: int
+    messages: int
+    state: str
+    suggested_response: Optional[str] = None
+    lexicon_version: Optional[str] = None
+
+class JobStatus(BaseModel):
+    id: str
+    status: str
+    category: Optional[str] = None
+    suggested_response: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchItemResult(BaseModel):
+    index: int
+    id: Optional[Union[str, int]] = None
+    category: Optional[str] = None
+    confidence: Optional[float] = None
+    tokens_scored: Optional[int] = None
+    near_duplicate: Optional[NearDuplicate] = None
+    explanation: Optional[Explanation] = None
+    suggested_response: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchResponse(BaseModel):
+    total: int
+    succeeded: int
+    failed: int
+    lexicon_version: Optional[str] = None
+    results: List[BatchItemResult]
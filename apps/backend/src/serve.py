@@ -0,0 +1,208 @@
+"""
+Modo de produção com vários workers.
+
+O processo mestre importa a aplicação, aquece o classificador (léxico
+compilado, stopwords, tabelas do stemmer, n-grams) e abre o socket uma única
+vez; depois faz fork de N workers uvicorn que herdam tudo pronto. Antes do
+fork o gc.freeze() tira esses objetos da coleta de lixo, então as páginas
+continuam compartilhadas entre os workers (copy-on-write) em vez de serem
+copiadas na primeira coleta.
+
+Cada worker sai graciosamente depois de WORKER_MAX_REQUESTS requisições ou
+acima de WORKER_MAX_MEMORY_MB de RSS, e o mestre sobe outro no lugar.
+Somente POSIX (usa fork).
+
+Uso (a partir de apps/backend/src):
+    python serve.py --workers 4 --port 8000 [--max-requests 10000] [--max-memory-mb 512]
+"""
+import argparse
+import gc
+import logging
+import os
+import random
+import resource
+import signal
+import socket
+import sys
+import time
+from typing import Dict, Optional
+
+import uvicorn
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.log import configure_logging
+
+SERVE_WORKERS = int(os.getenv("SERVE_WORKERS", os.cpu_count() or 1))
+# Reciclagem dos workers (0 desativa)
+WORKER_MAX_REQUESTS = int(os.getenv("WORKER_MAX_REQUESTS", 0))
+WORKER_MAX_MEMORY_MB = int(os.getenv("WORKER_MAX_MEMORY_MB", 0))
+# Tempo para um worker terminar as requisições em andamento ao sair
+WORKER_GRACEFUL_SECONDS = int(os.getenv("WORKER_GRACEFUL_SECONDS", 30))
+
+# Intervalo de verificação da memória, em ticks de 0,1s do uvicorn
+MEMORY_CHECK_TICKS = 50
+# Um worker que morre antes disso espera um pouco antes de ser reposto
+MIN_WORKER_LIFETIME = 1.0
+
+logger = logging.getLogger("serve")
+
+
+def current_rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # Sem /proc: pico de RSS (KB no Linux)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class RecyclingServer(uvicorn.Server):
+    """
+    Servidor uvicorn que também sai (graciosamente) ao passar do limite de
+    memória; o limite de requisições é o limit_max_requests do próprio uvicorn.
+    """
+
+    def __init__(self, config: uvicorn.Config, max_memory_bytes: int = 0):
+        super().__init__(config)
+        self.max_memory_bytes = max_memory_bytes
+
+    async def on_tick(self, counter: int) -> bool:
+        if self.max_memory_bytes and counter % MEMORY_CHECK_TICKS == 0:
+            rss = current_rss_bytes()
+            if rss > self.max_memory_bytes:
+                logger.info("Worker %d com %d MB de RSS, reciclando", os.getpid(), rss // (1024 * 1024))
+                return True
+        return await super().on_tick(counter)
+
+
+def run_worker(app, sock: socket.socket, max_requests: int, max_memory_mb: int) -> None:
+    # Espalha as reciclagens para os workers não reiniciarem juntos
+    limit = max_requests + random.randint(0, max_requests // 10) if max_requests else None
+    config = uvicorn.Config(
+        app, log_config=None, limit_max_requests=limit,
+        timeout_graceful_shutdown=WORKER_GRACEFUL_SECONDS
+    )
+    server = RecyclingServer(config, max_memory_mb * 1024 * 1024)
+    server.run(sockets=[sock])
+
+
+class Supervisor:
+    """
+    Mantém ``workers`` processos filhos rodando até receber SIGTERM/SIGINT.
+    """
+
+    def __init__(self, app, sock: socket.socket, workers: int, max_requests: int, max_memory_mb: int):
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.max_requests = max_requests
+        self.max_memory_mb = max_memory_mb
+        self.children: Dict[int, float] = {}
+        self.stopping = False
+
+    def spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                signal.signal(signal.SIGINT, signal.SIG_DFL)
+                run_worker(self.app, self.sock, self.max_requests, self.max_memory_mb)
+            except BaseException:
+                logger.exception("Worker %d falhou", os.getpid())
+                code = 1
+            finally:
+                logging.shutdown()
+                os._exit(code)
+        self.children[pid] = time.monotonic()
+        logger.info("Worker %d iniciado", pid)
+
+    def stop(self, signum: int, frame) -> None:
+        self.stopping = True
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.workers):
+            self.spawn()
+        while not self.stopping:
+            pid, status = self._reap()
+            if pid is None:
+                time.sleep(0.2)
+                continue
+            started = self.children.pop(pid)
+            logger.info("Worker %d saiu (código %d)", pid, os.waitstatus_to_exitcode(status))
+            if self.stopping:
+                break
+            if time.monotonic() - started < MIN_WORKER_LIFETIME:
+                time.sleep(MIN_WORKER_LIFETIME)
+            self.spawn()
+        self.shutdown()
+
+    def _reap(self):
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return None, 0
+        return (pid, status) if pid else (None, 0)
+
+    def shutdown(self) -> None:
+        for pid in self.children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + WORKER_GRACEFUL_SECONDS + 5
+        while self.children and time.monotonic() < deadline:
+            pid, _ = self._reap()
+            if pid is None:
+                time.sleep(0.1)
+            else:
+                self.children.pop(pid, None)
+        for pid in self.children:
+            logger.warning("Worker %d não terminou a tempo, encerrando", pid)
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        self.children.clear()
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Servidor de produção com vários workers")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=SERVE_WORKERS)
+    parser.add_argument("--max-requests", type=int, default=WORKER_MAX_REQUESTS,
+                        help="Recicla o worker depois de N requisições (0 desativa)")
+    parser.add_argument("--max-memory-mb", type=int, default=WORKER_MAX_MEMORY_MB,
+                        help="Recicla o worker acima deste RSS (0 desativa)")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    started = time.perf_counter()
+    from main import app
+    from classifiers.shared import warm_up
+    warm_up()
+    # Objetos carregados até aqui ficam fora do GC: os workers não tocam nas páginas herdadas
+    gc.collect()
+    gc.freeze()
+    logger.info("Aplicação pré-carregada em %.0f ms", (time.perf_counter() - started) * 1000)
+
+    sock = bind_socket(args.host, args.port)
+    logger.info("Escutando em %s:%d com %d workers", args.host, args.port, args.workers)
+    Supervisor(app, sock, args.workers, args.max_requests, args.max_memory_mb).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import json
+from typing import Any, AsyncIterator, List, Optional, Tuple, Union
+
+from .email_parser import iter_mbox_messages, parse_message
+
+ItemId = Optional[Union[str, int]]
+BatchItem = Tuple[ItemId, Optional[str], Optional[str]]
+
+
+def parse_batch_item(item: Any) -> BatchItem:
+    """
+    Normaliza um item do lote em (id, texto, erro).
+    Aceita uma string ou um objeto {"id": ..., "email_text": ...}.
+    """
+    if isinstance(item, str):
+        return None, item.strip(), None
+    if isinstance(item, dict):
+        item_id = item.get("id")
+        text = item.get("email_text", item.get("text"))
+        if not isinstance(text, str):
+            return item_id, None, "Item sem campo 'email_text'"
+        return item_id, text.strip(), None
+    return None, None, "Item inválido: use uma string ou um objeto com 'email_text'"
+
+
+def parse_ndjson_line(line: bytes) -> BatchItem:
+    try:
+        return parse_batch_item(json.loads(line.decode("utf-8")))
+    except UnicodeDecodeError:
+        return None, None, "Linha NDJSON inválida: o texto deve estar em UTF-8"
+    except json.JSONDecodeError as e:
+        return None, None, f"Linha NDJSON inválida: {e.msg}"
+
+
+async def iter_ndjson_batches(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[List[BatchItem]]:
+    """
+    Lê NDJSON de um corpo que chega em blocos e devolve, a cada bloco, os
+    itens das linhas que ficaram completas. Uma linha maior que
+    ``max_line_bytes`` vira um item com erro e é descartada sem ser
+    acumulada na memória.
+    """
+    buffer = bytearray()
+    skipping = False
+    async for chunk in chunks:
+        buffer += chunk
+        items = []
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start)
+            if end < 0:
+                break
+            if skipping:
+                skipping = False
+            elif end - start > max_line_bytes:
+                items.append((None, None, f"Linha maior que o limite de {max_line_bytes} bytes"))
+            elif buffer[start:end].strip():
+                items.append(parse_ndjson_line(bytes(buffer[start:end])))
+            start = end + 1
+        del buffer[:start]
+        if len(buffer) > max_line_bytes:
+            if not skipping:
+                items.append((None, None, f"Linha maior que o limite de {max_line_bytes} bytes"))
+            skipping = True
+            buffer.clear()
+        if items:
+            yield items
+    if buffer.strip() and not skipping:
+        yield [parse_ndjson_line(bytes(buffer))]
+
+
+def parse_batch_payload(body: bytes, content_type: str = "") -> List[BatchItem]:
+    """
+    Lê o corpo de uma requisição em lote: um array JSON, NDJSON
+    (um email por linha), um mbox (application/mbox) ou uma única mensagem
+    (message/rfc822). Linhas NDJSON inválidas viram erros do próprio item.
+    """
+    if "mbox" in content_type:
+        return [(message.message_id, message.text.strip(), None) for message in iter_mbox_messages(body)]
+    if "message/rfc822" in content_type:
+        message = parse_message(body)
+        return [(message.message_id, message.text.strip(), None)]
+
+    try:
+        raw = body.decode("utf-8")
+    except UnicodeDecodeError:
+        raise ValueError("O corpo da requisição deve estar em UTF-8")
+
+    is_ndjson = "ndjson" in content_type or "jsonlines" in content_type
+    if not is_ndjson:
+        try:
+            data = json.loads(raw)
+        except json.JSONDecodeError:
+            # Sem content-type explícito, tenta NDJSON antes de desistir
+            is_ndjson = True
+        else:
+            if isinstance(data, dict) and isinstance(data.get("emails"), list):
+                data = data["emails"]
+            if not isinstance(data, list):
+                raise ValueError("O corpo deve ser um array JSON de emails ou NDJSON")
+            return [parse_batch_item(item) for item in data]
+
+    items = []
+    for line in raw.splitlines():
+        if not line.strip():
+            continue
+        try:
+            items.append(parse_batch_item(json.loads(line)))
+        except json.JSONDecodeError as e:
+            items.append((None, None, f"Linha NDJSON inválida: {e.msg}"))
+    return items
@@ -0,0 +1,272 @@
+import binascii
+import codecs
+import mmap
+import os
+import re
+from email.header import decode_header, make_header
+from email.message import Message
+from email.parser import BytesHeaderParser
+from email import policy
+from html.parser import HTMLParser
+from typing import Iterator, Optional, Tuple, Union
+
+# Bytes, mmap: ambos têm find() com início/fim, o que permite pular partes
+# sem copiá-las
+Buffer = Union[bytes, mmap.mmap]
+
+MAX_MIME_DEPTH = 20
+
+_header_parser = BytesHeaderParser(policy=policy.compat32)
+_MBOXRD_FROM = re.compile(rb"^>(>*From )", re.MULTILINE)
+
+
+class EmailContent:
+    """
+    Texto extraído de uma mensagem: assunto, corpo escolhido e anexos
+    ignorados (apenas contados, nunca lidos).
+    """
+    __slots__ = ("message_id", "subject", "body", "skipped_parts")
+
+    def __init__(self, message_id: Optional[str], subject: str, body: str, skipped_parts: int):
+        self.message_id = message_id
+        self.subject = subject
+        self.body = body
+        self.skipped_parts = skipped_parts
+
+    @property
+    def text(self) -> str:
+        if self.subject and self.body:
+            return f"{self.subject}\n\n{self.body}"
+        return self.subject or self.body
+
+
+class _HTMLText(HTMLParser):
+    """
+    Converte HTML em texto: descarta script/style e quebra linha em blocos.
+    """
+    _BLOCKS = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote"}
+    _SKIP = {"script", "style", "head"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._SKIP:
+            self._skipping += 1
+        elif tag in self._BLOCKS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self._SKIP:
+            self._skipping = max(self._skipping - 1, 0)
+        elif tag in self._BLOCKS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self.parts.append(data)
+
+
+def html_to_text(html: str) -> str:
+    parser = _HTMLText()
+    parser.feed(html)
+    parser.close()
+    text = "".join(parser.parts)
+    return re.sub(r"[ \t]*\n\s*", "\n", re.sub(r"[ \t\xa0]+", " ", text)).strip()
+
+
+def _decode_header(value: Optional[str]) -> str:
+    if not value:
+        return ""
+    try:
+        return str(make_header(decode_header(value))).strip()
+    except Exception:
+        return value.strip()
+
+
+def _decode_payload(raw: bytes, transfer_encoding: str, charset: Optional[str]) -> str:
+    transfer_encoding = transfer_encoding.strip().lower()
+    if transfer_encoding == "base64":
+        try:
+            raw = binascii.a2b_base64(raw)
+        except binascii.Error:
+            # Base64 truncado/com lixo: decodifica o que for possível linha a linha
+            decoded = []
+            for line in raw.split(b"\n"):
+                try:
+                    decoded.append(binascii.a2b_base64(line))
+                except binascii.Error:
+                    continue
+            raw = b"".join(decoded)
+    elif transfer_encoding == "quoted-printable":
+        raw = binascii.a2b_qp(raw)
+    try:
+        codecs.lookup(charset or "utf-8")
+    except LookupError:
+        charset = "utf-8"
+    return raw.decode(charset or "utf-8", errors="replace")
+
+
+def _parse_headers(buf: Buffer, start: int, end: int) -> Tuple[Message, int]:
+    """
+    Lê o bloco de cabeçalhos que começa em ``start`` e devolve a posição
+    onde o corpo começa.
+    """
+    if buf[start:start + 1] == b"\n":
+        return _header_parser.parsebytes(b""), start + 1
+    if buf[start:start + 2] == b"\r\n":
+        return _header_parser.parsebytes(b""), start + 2
+    candidates = [(i, size) for i, size in ((buf.find(b"\n\n", start, end), 2),
+                                              (buf.find(b"\n\r\n", start, end), 3)) if i >= 0]
+    if not candidates:
+        return _header_parser.parsebytes(buf[start:end]), end
+    header_end, size = min(candidates)
+    return _header_parser.parsebytes(buf[start:header_end + 1]), header_end + size
+
+
+def _find_delimiter(buf: Buffer, delimiter: bytes, pos: int, start: int, end: int) -> Optional[Tuple[int, int, bool]]:
+    """
+    Procura a próxima linha delimitadora ``--boundary`` (ou ``--boundary--``)
+    em [pos, end). Devolve (início da linha, início da linha seguinte, é final).
+    """
+    while True:
+        i = buf.find(delimiter, pos, end)
+        if i < 0:
+            return None
+        after = i + len(delimiter)
+        line_end = buf.find(b"\n", after, end)
+        line_end = end if line_end < 0 else line_end + 1
+        if i == start or buf[i - 1:i] == b"\n":
+            is_close = buf[after:after + 2] == b"--"
+            rest = buf[after + 2 if is_close else after:line_end]
+            if not rest.strip():
+                return i, line_end, is_close
+        pos = after
+
+
+def _part_end(buf: Buffer, delimiter_start: int, start: int) -> int:
+    # A quebra de linha antes do delimitador pertence ao delimitador
+    if delimiter_start - 2 >= start and buf[delimiter_start - 2:delimiter_start] == b"\r\n":
+        return delimiter_start - 2
+    if delimiter_start - 1 >= start and buf[delimiter_start - 1:delimiter_start] == b"\n":
+        return delimiter_start - 1
+    return delimiter_start
+
+
+class _Collector:
+    def __init__(self, unescape_from: bool):
+        self.unescape_from = unescape_from
+        self.plain: Optional[str] = None
+        self.html: Optional[str] = None
+        self.skipped = 0
+
+    @property
+    def done(self) -> bool:
+        return self.plain is not None
+
+    def add(self, headers: Message, buf: Buffer, start: int, end: int) -> None:
+        content_type = headers.get_content_type()
+        if content_type == "text/html" and self.html is not None:
+            return
+        raw = buf[start:end]
+        if self.unescape_from:
+            raw = _MBOXRD_FROM.sub(rb"\1", raw)
+        text = _decode_payload(raw, headers.get("Content-Transfer-Encoding", ""), headers.get_content_charset())
+        if content_type == "text/plain":
+            if text.strip():
+                self.plain = text.strip()
+        else:
+            self.html = html_to_text(text)
+
+
+def _walk(buf: Buffer, start: int, end: int, collector: _Collector, depth: int, headers: Optional[Message] = None) -> None:
+    if headers is None:
+        headers, body_start = _parse_headers(buf, start, end)
+    else:
+        body_start = start
+    content_type = headers.get_content_type()
+
+    if content_type.startswith("multipart/") and depth < MAX_MIME_DEPTH:
+        boundary = headers.get_boundary()
+        if not boundary:
+            return
+        delimiter = b"--" + boundary.encode("latin-1", errors="replace")
+        found = _find_delimiter(buf, delimiter, body_start, body_start, end)
+        while found is not None and not found[2] and not collector.done:
+            part_start = found[1]
+            found = _find_delimiter(buf, delimiter, part_start, body_start, end)
+            part_end = end if found is None else _part_end(buf, found[0], part_start)
+            _walk(buf, part_start, part_end, collector, depth + 1)
+        return
+
+    disposition = (headers.get("Content-Disposition") or "").split(";")[0].strip().lower()
+    if content_type in ("text/plain", "text/html") and disposition != "attachment" and not headers.get_filename():
+        collector.add(headers, buf, body_start, end)
+    else:
+        # Anexos e tipos não textuais são pulados sem ler o conteúdo
+        collector.skipped += 1
+
+
+def parse_message(buf: Buffer, start: int = 0, end: Optional[int] = None,
+                  unescape_from: bool = False) -> EmailContent:
+    """
+    Extrai o texto de uma mensagem RFC 822/MIME em ``buf[start:end]``.
+    Prefere a primeira parte text/plain; sem ela, usa o HTML convertido em
+    texto. Respeita charset e Content-Transfer-Encoding de cada parte.
+    """
+    end = len(buf) if end is None else end
+    headers, body_start = _parse_headers(buf, start, end)
+    collector = _Collector(unescape_from)
+    _walk(buf, body_start, end, collector, 0, headers=headers)
+    body = collector.plain if collector.plain is not None else (collector.html or "")
+    return EmailContent(
+        message_id=(headers.get("Message-ID") or "").strip() or None,
+        subject=_decode_header(headers.get("Subject")),
+        body=body,
+        skipped_parts=collector.skipped,
+    )
+
+
+def iter_mbox_messages(buf: Buffer) -> Iterator[EmailContent]:
+    """
+    Percorre as mensagens de um mbox em memória (bytes ou mmap), delimitadas
+    por linhas "From " no início de linha.
+    """
+    size = len(buf)
+    pos = 0 if buf[:5] == b"From " else buf.find(b"\nFrom ")
+    if pos > 0:
+        pos += 1
+    while 0 <= pos < size:
+        line_end = buf.find(b"\n", pos)
+        if line_end < 0:
+            return
+        next_separator = buf.find(b"\nFrom ", line_end)
+        message_end = size if next_separator < 0 else next_separator + 1
+        yield parse_message(buf, line_end + 1, message_end, unescape_from=True)
+        pos = -1 if next_separator < 0 else next_separator + 1
+
+
+def iter_mbox_file(path: str) -> Iterator[EmailContent]:
+    """
+    Percorre um arquivo mbox mapeado em memória: o sistema operacional
+    carrega só as páginas lidas, então arquivos de vários GB não ficam
+    inteiros na RAM.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield from iter_mbox_messages(mapped)
+
+
+def parse_email_file(path: str) -> EmailContent:
+    """
+    Extrai o texto de um arquivo .eml mapeado em memória.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return EmailContent(None, "", "", 0)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return parse_message(mapped)
@@ -0,0 +1,159 @@
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 4))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", 256))
+JOB_STORE_SIZE = int(os.getenv("JOB_STORE_SIZE", 10000))
+JOB_TTL_SECONDS = float(os.getenv("JOB_TTL_SECONDS", 600))
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+FINISHED = (DONE, FAILED)
+
+
+class JobQueueFull(Exception):
+    """A fila de jobs está cheia (backpressure)."""
+
+
+class JobBackend:
+    """
+    Armazenamento dos jobs. A implementação em memória atende um único
+    processo; outra (ex.: um stand-in compatível com Redis) só precisa
+    implementar estes métodos. ``wait`` tem uma versão genérica por polling.
+    """
+
+    async def create(self, job_id: str, data: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    async def update(self, job_id: str, **fields: Any) -> None:
+        raise NotImplementedError
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        deadline = time.monotonic() + timeout
+        while True:
+            job = await self.get(job_id)
+            if job is None or job["status"] in FINISHED or time.monotonic() >= deadline:
+                return job
+            await asyncio.sleep(0.1)
+
+
+class InMemoryJobBackend(JobBackend):
+    """
+    Jobs num OrderedDict limitado: jobs concluídos expiram após ``ttl``
+    segundos e, acima de ``max_jobs``, os concluídos mais antigos saem primeiro.
+    """
+
+    def __init__(self, max_jobs: int = JOB_STORE_SIZE, ttl: float = JOB_TTL_SECONDS):
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._events: Dict[str, asyncio.Event] = {}
+
+    def _evict(self) -> None:
+        now = time.time()
+        for job_id in list(self._jobs):
+            job = self._jobs[job_id]
+            expired = job["status"] in FINISHED and now - job["updated_at"] > self.ttl
+            if expired or (len(self._jobs) > self.max_jobs and job["status"] in FINISHED):
+                del self._jobs[job_id]
+                self._events.pop(job_id, None)
+            elif len(self._jobs) <= self.max_jobs:
+                break
+
+    async def create(self, job_id: str, data: Dict[str, Any]) -> None:
+        self._jobs[job_id] = data
+        self._events[job_id] = asyncio.Event()
+        self._evict()
+
+    async def update(self, job_id: str, **fields: Any) -> None:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+        job.update(fields, updated_at=time.time())
+        if job["status"] in FINISHED and job_id in self._events:
+            self._events[job_id].set()
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        if job is not None and job["status"] in FINISHED and time.time() - job["updated_at"] > self.ttl:
+            return None
+        return dict(job) if job is not None else None
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        event = self._events.get(job_id)
+        if event is not None and timeout > 0:
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return await self.get(job_id)
+
+
+class JobQueue:
+    """
+    Fila limitada em processo com um pool de workers assíncronos.
+    ``submit`` falha na hora com JobQueueFull quando a fila está cheia.
+    """
+
+    def __init__(self, handler: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+                 backend: Optional[JobBackend] = None, workers: int = JOB_WORKERS,
+                 max_queue: int = JOB_QUEUE_SIZE):
+        self.handler = handler
+        self.backend = backend or InMemoryJobBackend()
+        self.workers = workers
+        self.max_queue = max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(self, payload: Dict[str, Any], **fields: Any) -> str:
+        if self._queue is None:
+            self.start()
+        if self._queue.full():
+            raise JobQueueFull("Fila de respostas cheia, tente novamente em instantes")
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        await self.backend.create(job_id, {
+            "id": job_id, "status": PENDING, "result": None, "error": None,
+            "created_at": now, "updated_at": now, **fields
+        })
+        self._queue.put_nowait((job_id, payload))
+        return job_id
+
+    async def _worker(self) -> None:
+        while True:
+            job_id, payload = await self._queue.get()
+            try:
+                await self.backend.update(job_id, status=RUNNING)
+                result = await self.handler(payload)
+                await self.backend.update(job_id, status=DONE, result=result)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await self.backend.update(job_id, status=FAILED, error=str(e))
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,164 @@
+"""
+Limites de tamanho e de uso por cliente, aplicados antes de qualquer parse
+ou classificação.
+
+RequestLimitMiddleware é um middleware ASGI puro: recusa com 413 um
+Content-Length acima do limite da rota, conta os bytes do corpo conforme
+chegam (cobre também o envio chunked, sem Content-Length) e recusa com 429
+clientes acima da taxa ou da concorrência permitidas.
+"""
+import json
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+
+# Bytes aceitos no campo email_text e em cada arquivo enviado
+MAX_TEXT_BYTES = int(os.getenv("MAX_TEXT_BYTES", 1024 * 1024))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 10 * 1024 * 1024))
+# Corpo do lote (JSON, NDJSON ou mbox)
+BATCH_MAX_BYTES = int(os.getenv("BATCH_MAX_BYTES", 16 * 1024 * 1024))
+# Requisições simultâneas e por segundo de um mesmo cliente (0 desativa)
+CLIENT_MAX_CONCURRENCY = int(os.getenv("CLIENT_MAX_CONCURRENCY", 8))
+CLIENT_RATE_PER_SECOND = float(os.getenv("CLIENT_RATE_PER_SECOND", 20))
+CLIENT_RATE_BURST = int(os.getenv("CLIENT_RATE_BURST", 40))
+# Usa o primeiro endereço de X-Forwarded-For (só atrás de um proxy confiável)
+TRUST_PROXY_HEADERS = os.getenv("TRUST_PROXY_HEADERS", "0") == "1"
+
+# Cabeçalhos e delimitadores do multipart além do conteúdo em si
+MULTIPART_OVERHEAD = 64 * 1024
+# Clientes acompanhados pelos limites de taxa (os menos recentes saem primeiro)
+MAX_TRACKED_CLIENTS = 10000
+
+
+class PayloadTooLarge(HTTPException):
+    def __init__(self, limit: int):
+        super().__init__(status_code=413, detail=f"Payload too large. Maximum {limit} bytes.")
+
+
+def check_text_size(text: str, limit: int = MAX_TEXT_BYTES) -> None:
+    if len(text) > limit or len(text.encode("utf-8")) > limit:
+        raise PayloadTooLarge(limit)
+
+
+class TokenBuckets:
+    """
+    Um balde de fichas por cliente: ``rate`` fichas por segundo, até
+    ``burst``. Guarda no máximo ``max_clients`` clientes.
+    """
+
+    def __init__(self, rate: float, burst: int, max_clients: int = MAX_TRACKED_CLIENTS):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.max_clients = max_clients
+        # cliente -> (fichas, instante da última atualização)
+        self._buckets: "OrderedDict[str, tuple[float, float]]" = OrderedDict()
+
+    def take(self, client: str) -> float:
+        """
+        Consome uma ficha. Devolve 0 se permitido ou os segundos até a
+        próxima ficha.
+        """
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(client, (float(self.burst), now))
+        tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+        self._buckets[client] = (tokens, now)
+        while len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class RequestLimitMiddleware:
+    """
+    Limites por rota (``body_limits``: caminho -> bytes do corpo, 0 para não
+    limitar o total, ex.: conexões de streaming) e por cliente. Rotas fora
+    de ``body_limits`` passam direto.
+    """
+
+    def __init__(self, app, body_limits: Dict[str, int],
+                 max_concurrency: int = CLIENT_MAX_CONCURRENCY,
+                 rate_per_second: float = CLIENT_RATE_PER_SECOND,
+                 burst: int = CLIENT_RATE_BURST):
+        self.app = app
+        self.body_limits = body_limits
+        self.max_concurrency = max_concurrency
+        self.buckets = TokenBuckets(rate_per_second, burst) if rate_per_second > 0 else None
+        self.active: Dict[str, int] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.body_limits:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        client = self._client_key(scope, headers)
+        if self.buckets is not None:
+            wait = self.buckets.take(client)
+            if wait:
+                await self._reject(send, 429, "Too many requests. Slow down.", math.ceil(wait))
+                return
+        if self.max_concurrency and self.active.get(client, 0) >= self.max_concurrency:
+            await self._reject(send, 429, "Too many concurrent requests from this client.", 1)
+            return
+
+        limit = self.body_limits[scope["path"]]
+        content_length = self._content_length(headers)
+        if limit and content_length is not None and content_length > limit:
+            await self._reject(send, 413, f"Payload too large. Maximum {limit} bytes.")
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if limit and received > limit:
+                    # Vira 413 no tratamento de HTTPException do FastAPI
+                    raise PayloadTooLarge(limit)
+            return message
+
+        self.active[client] = self.active.get(client, 0) + 1
+        try:
+            await self.app(scope, limited_receive, send)
+        finally:
+            remaining = self.active[client] - 1
+            if remaining:
+                self.active[client] = remaining
+            else:
+                del self.active[client]
+
+    @staticmethod
+    def _client_key(scope, headers: Dict[bytes, bytes]) -> str:
+        if TRUST_PROXY_HEADERS and b"x-forwarded-for" in headers:
+            return headers[b"x-forwarded-for"].decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    @staticmethod
+    def _content_length(headers: Dict[bytes, bytes]) -> Optional[int]:
+        value = headers.get(b"content-length")
+        if value is None:
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            return None
+
+    @staticmethod
+    async def _reject(send, status: int, detail: str, retry_after: Optional[int] = None) -> None:
+        body = json.dumps({"detail": detail}).encode("utf-8")
+        headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        if retry_after is not None:
+            headers.append((b"retry-after", str(retry_after).encode()))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
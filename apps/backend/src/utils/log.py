@@ -0,0 +1,18 @@
+import logging
+import os
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+
+def configure_logging() -> None:
+    """
+    Configura o logging da API a partir de LOG_LEVEL (DEBUG, INFO, WARNING,
+    ERROR). LOG_LEVEL=OFF desliga as mensagens da aplicação.
+    """
+    if LOG_LEVEL == "OFF":
+        logging.disable(logging.CRITICAL)
+        return
+    logging.basicConfig(
+        level=getattr(logging, LOG_LEVEL, logging.INFO),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
@@ -0,0 +1,270 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import AsyncIterator, Iterable, List, Optional, Tuple
+
+import pdfplumber
+
+from .metrics import observe_stage
+
+PDF_POOL_SIZE = int(os.getenv("PDF_POOL_SIZE", 2))
+PDF_TIMEOUT_SECONDS = float(os.getenv("PDF_TIMEOUT_SECONDS", 30))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", 50))
+PDF_MAX_QUEUE = int(os.getenv("PDF_MAX_QUEUE", 8))
+PDF_PAGE_CHUNK = int(os.getenv("PDF_PAGE_CHUNK", 4))
+# "layout" usa o extract_text do pdfplumber (reconstrói o layout); "raw" lê a
+# camada de texto pelo pdfium, bem mais rápido e suficiente para classificar
+PDF_EXTRACTION_MODE = os.getenv("PDF_EXTRACTION_MODE", "layout")
+PDF_EXTRACTION_MODES = ("layout", "raw")
+# Lê só as primeiras N páginas de cada PDF (0 = todas)
+PDF_PAGE_LIMIT = int(os.getenv("PDF_PAGE_LIMIT", 0))
+
+# Intervalo de páginas: (primeira, fim exclusivo ou None), a partir de 0
+PageRange = Tuple[int, Optional[int]]
+
+logger = logging.getLogger(__name__)
+
+
+class PdfPoolSaturated(Exception):
+    """Há mais PDFs em processamento do que o limite da fila."""
+
+
+class PdfExtractionTimeout(Exception):
+    """A extração de um PDF passou do tempo limite."""
+
+
+def parse_page_range(spec: Optional[str]) -> Optional[PageRange]:
+    """
+    Converte "3", "2-5" ou "4-" (páginas a partir de 1, fim inclusivo) num
+    PageRange. Vazio ou None devolve None (padrão: PDF_PAGE_LIMIT).
+    """
+    if spec is None or not spec.strip():
+        return None
+    first, dash, last = spec.strip().partition("-")
+    try:
+        start = int(first)
+        stop = (int(last) if last.strip() else None) if dash else start
+    except ValueError:
+        raise ValueError(f"Intervalo de páginas inválido: {spec!r}. Use, por exemplo, 1-5")
+    if start < 1 or (stop is not None and stop < start):
+        raise ValueError(f"Intervalo de páginas inválido: {spec!r}. Use, por exemplo, 1-5")
+    return start - 1, stop
+
+
+def _check_page_count(total: int, pages: PageRange, max_pages: int) -> int:
+    # Limite vale para as páginas que serão lidas, não para o tamanho do arquivo
+    start, stop = pages
+    stop = total if stop is None else min(stop, total)
+    if max_pages and stop - start > max_pages:
+        raise ValueError(f"PDF com {stop - start} páginas excede o limite de {max_pages}")
+    return stop
+
+
+def _extract_layout(path: str, start: int, stop: int, pages: PageRange,
+                    max_pages: int) -> Tuple[List[str], List[float], int]:
+    with pdfplumber.open(path) as pdf:
+        total = len(pdf.pages)
+        stop = min(stop, _check_page_count(total, pages, max_pages))
+        texts, seconds = [], []
+        for page in pdf.pages[start:stop]:
+            started = time.perf_counter()
+            texts.append(page.extract_text() or "")
+            # Libera os objetos já analisados da página
+            page.flush_cache()
+            seconds.append(time.perf_counter() - started)
+        return texts, seconds, total
+
+
+def _extract_raw(path: str, start: int, stop: int, pages: PageRange,
+                 max_pages: int) -> Tuple[List[str], List[float], int]:
+    import pypdfium2
+
+    pdf = pypdfium2.PdfDocument(path)
+    try:
+        total = len(pdf)
+        stop = min(stop, _check_page_count(total, pages, max_pages))
+        texts, seconds = [], []
+        for index in range(start, stop):
+            started = time.perf_counter()
+            page = pdf[index]
+            textpage = page.get_textpage()
+            try:
+                texts.append(textpage.get_text_range().replace("\r\n", "\n"))
+            finally:
+                textpage.close()
+                page.close()
+            seconds.append(time.perf_counter() - started)
+        return texts, seconds, total
+    finally:
+        pdf.close()
+
+
+def extract_pdf_pages(path: str, start: int, count: int, max_pages: int, mode: str = "layout",
+                      pages: PageRange = (0, None)) -> Tuple[List[str], List[float], int]:
+    """
+    Extrai o texto das páginas [start, start + count) de um PDF em disco,
+    dentro do intervalo ``pages``. Roda no processo worker (CPU-bound e
+    preso ao GIL) e devolve também o tempo de cada página e o total de
+    páginas do arquivo, para o chamador saber quando parar.
+    """
+    stop = start + count
+    if mode == "raw":
+        try:
+            return _extract_raw(path, start, stop, pages, max_pages)
+        except ImportError:
+            logger.warning("pypdfium2 indisponível, usando extração com layout")
+    return _extract_layout(path, start, stop, pages, max_pages)
+
+
+class PdfExtractionPool:
+    """
+    Pool limitado de processos para extração de PDF fora do event loop.
+    Os blocos de páginas de um PDF são distribuídos entre os workers (até
+    ``size`` blocos em paralelo) e devolvidos na ordem do documento.
+
+    ``max_queue`` limita quantos PDFs podem estar em processamento ou na fila;
+    acima disso a chamada falha na hora com PdfPoolSaturated. A contagem só cai
+    quando o worker termina de fato, então um PDF que estourou o tempo limite
+    continua ocupando a fila até acabar. Com ``size`` 0, ou onde não for
+    possível criar processos (ex.: serverless), usa uma thread.
+    """
+
+    def __init__(self, size: int = PDF_POOL_SIZE, timeout: float = PDF_TIMEOUT_SECONDS,
+                 max_pages: int = PDF_MAX_PAGES, max_queue: int = PDF_MAX_QUEUE,
+                 mode: str = PDF_EXTRACTION_MODE, page_limit: int = PDF_PAGE_LIMIT):
+        if mode not in PDF_EXTRACTION_MODES:
+            raise ValueError(f"Modo de extração de PDF inválido: {mode}")
+        self.size = size
+        self.timeout = timeout
+        self.max_pages = max_pages
+        self.max_queue = max_queue
+        self.mode = mode
+        self.page_limit = page_limit
+        self._executor: Optional[Executor] = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.size > 0:
+                try:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.size,
+                        mp_context=multiprocessing.get_context("spawn")
+                    )
+                except (OSError, NotImplementedError) as e:
+                    logger.warning("Pool de processos indisponível, usando thread: %s", e)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=max(self.size, 1))
+        return self._executor
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def _release_when_done(self, futures: Iterable[Future]) -> None:
+        # Blocos ainda na fila são cancelados; a vaga só é liberada quando os
+        # que já estão num worker realmente terminarem
+        running = [future for future in futures if not future.cancel() and not future.done()]
+        if not running:
+            self._release(None)
+            return
+        remaining = [len(running)]
+
+        def finished(_future) -> None:
+            with self._lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self._release(None)
+
+        for future in running:
+            future.add_done_callback(finished)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def default_pages(self) -> PageRange:
+        return (0, self.page_limit or None)
+
+    async def iter_pages(self, path: str, chunk_pages: int = PDF_PAGE_CHUNK,
+                         pages: Optional[PageRange] = None) -> AsyncIterator[str]:
+        """
+        Gera o texto do PDF página a página, na ordem do documento. O
+        primeiro bloco de ``chunk_pages`` páginas revela o total; depois até
+        ``size`` blocos são extraídos em paralelo, sempre alguns à frente do
+        consumidor. Se o consumidor parar cedo, os blocos ainda não
+        iniciados são cancelados. ``pages`` restringe o intervalo lido
+        (padrão: as primeiras PDF_PAGE_LIMIT páginas). O PDF ocupa uma vaga
+        da fila do início ao fim e o tempo limite vale para o arquivo todo.
+        """
+        with self._lock:
+            if self._in_flight >= self.max_queue:
+                raise PdfPoolSaturated("Muitos PDFs em processamento, tente novamente em instantes")
+            self._in_flight += 1
+
+        pages = self.default_pages() if pages is None else pages
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        executor = self._get_executor()
+        window = max(self.size, 1)
+        futures: "deque[Tuple[int, Future]]" = deque()
+
+        def submit(start: int) -> None:
+            futures.append((start, executor.submit(
+                extract_pdf_pages, path, start, chunk_pages, self.max_pages, self.mode, pages
+            )))
+
+        try:
+            next_start, stop = pages[0], None
+            submit(next_start)
+            next_start += chunk_pages
+            while futures:
+                start, future = futures[0]
+                try:
+                    texts, seconds, total = await asyncio.wait_for(
+                        asyncio.wrap_future(future), max(deadline - loop.time(), 0)
+                    )
+                except asyncio.TimeoutError:
+                    raise PdfExtractionTimeout(f"Extração do PDF excedeu {self.timeout:g}s")
+                futures.popleft()
+                if stop is None:
+                    stop = total if pages[1] is None else min(pages[1], total)
+                # Mantém os workers ocupados enquanto o consumidor processa estas páginas
+                while next_start < stop and len(futures) < window:
+                    submit(next_start)
+                    next_start += chunk_pages
+                for offset, (text, page_seconds) in enumerate(zip(texts, seconds)):
+                    observe_stage("pdf_page", page_seconds)
+                    logger.debug("Página %d do PDF extraída em %.1f ms", start + offset + 1, page_seconds * 1000)
+                    yield text
+        finally:
+            self._release_when_done(future for _, future in futures)
+
+    async def extract(self, path: str, pages: Optional[PageRange] = None) -> str:
+        parts = []
+        async for text in self.iter_pages(path, pages=pages):
+            if text:
+                parts.append(text)
+        return "\n".join(parts)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_pool: Optional[PdfExtractionPool] = None
+
+
+def get_pdf_pool() -> PdfExtractionPool:
+    global _pool
+    if _pool is None:
+        _pool = PdfExtractionPool()
+    return _pool
@@ -0,0 +1,23 @@
+from typing import AsyncIterator
+
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse que não consome ``receive`` enquanto responde.
+
+    A StreamingResponse do Starlette escuta a desconexão lendo ``receive``
+    em paralelo, o que descartaria o corpo da requisição que o endpoint
+    ainda está lendo. Aqui quem lê o corpo (request.stream()) é que percebe
+    a desconexão do cliente.
+    """
+
+    def __init__(self, content: AsyncIterator[bytes], media_type: str = "application/x-ndjson"):
+        super().__init__(content, media_type=media_type)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
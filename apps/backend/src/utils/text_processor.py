@@ -1,32 +1,136 @@
-import pdfplumber
-import io
-from typing import Union
+import asyncio
+import codecs
+import os
+import tempfile
+import time
+from typing import AsyncIterator, Callable, Optional
 from fastapi import UploadFile
 
-async def extract_text_from_file(file: UploadFile) -> str:
+from .pdf_pool import get_pdf_pool, PageRange, PdfPoolSaturated, PdfExtractionTimeout
+from .email_parser import parse_email_file
+from .metrics import observe_stage, time_stage
+from .limits import MAX_UPLOAD_BYTES, PayloadTooLarge
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+async def spool_upload(file: UploadFile, suffix: str = "", limit: int = MAX_UPLOAD_BYTES) -> str:
     """
-    Extract text from uploaded file (PDF or TXT)
-    Using pdfplumber for PDF extraction
+    Copia o upload para um arquivo temporário em blocos, sem carregar o
+    arquivo inteiro na memória. Levanta PayloadTooLarge ao passar de
+    ``limit`` bytes. O chamador remove o arquivo.
+    """
+    handle = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+    size = 0
+    try:
+        with handle:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > limit:
+                    raise PayloadTooLarge(limit)
+                handle.write(chunk)
+    except BaseException:
+        os.unlink(handle.name)
+        raise
+    return handle.name
+
+async def iter_file_text(file: UploadFile, pages: Optional[PageRange] = None) -> AsyncIterator[str]:
+    """
+    Gera o texto do arquivo em partes: uma por página no PDF (só as de
+    ``pages``, se informado), blocos decodificados no TXT, assunto e corpo
+    escolhido no EML. Parar a iteração interrompe a leitura/extração. O
+    tempo gasto pelo consumidor entre as partes não entra nas métricas de
+    leitura e extração.
     """
     if file.filename.endswith('.pdf'):
-        # Extract text from PDF using pdfplumber
+        with time_stage("upload_read"):
+            path = await spool_upload(file, suffix=".pdf")
+        extraction = 0.0
         try:
-            text = ""
-            content = await file.read()
-            # Use BytesIO to handle PDF bytes
-            with pdfplumber.open(io.BytesIO(content)) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-            return text.strip() if text else "Não foi possível extrair texto do PDF"
-        except Exception as e:
-            raise ValueError(f"Erro ao extrair texto do PDF: {str(e)}")
+            started = time.perf_counter()
+            async for page_text in get_pdf_pool().iter_pages(path, pages=pages):
+                extraction += time.perf_counter() - started
+                yield page_text
+                started = time.perf_counter()
+        finally:
+            observe_stage("pdf_extraction", extraction)
+            os.unlink(path)
     
     elif file.filename.endswith('.txt'):
-        # Decode text file
-        content = await file.read()
-        return content.decode('utf-8')
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        pending = ""
+        reading = 0.0
+        size = 0
+        try:
+            while True:
+                started = time.perf_counter()
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise PayloadTooLarge(MAX_UPLOAD_BYTES)
+                text = pending + decoder.decode(chunk, final=not chunk)
+                reading += time.perf_counter() - started
+                if not chunk:
+                    if text:
+                        yield text
+                    break
+                # Cada bloco termina num espaço para não partir palavras ao meio
+                cut = max(text.rfind(' '), text.rfind('\n'), text.rfind('\t'))
+                if cut < 0:
+                    pending = text
+                    continue
+                yield text[:cut + 1]
+                pending = text[cut + 1:]
+        finally:
+            observe_stage("upload_read", reading)
+    
+    elif file.filename.endswith('.eml'):
+        with time_stage("upload_read"):
+            path = await spool_upload(file, suffix=".eml")
+        try:
+            loop = asyncio.get_running_loop()
+            with time_stage("email_parse"):
+                content = await loop.run_in_executor(None, parse_email_file, path)
+        finally:
+            os.unlink(path)
+        yield content.text
     
     else:
-        raise ValueError("Formato de arquivo não suportado. Use PDF ou TXT.")
\ No newline at end of file
+        raise ValueError("Formato de arquivo não suportado. Use PDF, TXT ou EML.")
+
+async def extract_text_from_file(file: UploadFile, on_chunk: Optional[Callable[[str], bool]] = None,
+                                 pages: Optional[PageRange] = None) -> str:
+    """
+    Extract text from uploaded file (PDF, TXT or EML)
+    Using pdfplumber (or the raw pdfium text layer) for PDF extraction, with
+    pages spread over a bounded worker pool. If on_chunk is given, it receives
+    each page/block as it is extracted and can return True to stop early (the
+    text read so far is returned). pages restricts the PDF page range.
+    """
+    is_pdf = file.filename.endswith('.pdf')
+    parts = []
+    chunks = iter_file_text(file, pages)
+    try:
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            parts.append(chunk)
+            if on_chunk is not None and on_chunk(chunk):
+                break
+    except (PdfPoolSaturated, PdfExtractionTimeout, PayloadTooLarge):
+        raise
+    except UnicodeDecodeError:
+        raise
+    except Exception as e:
+        if is_pdf:
+            raise ValueError(f"Erro ao extrair texto do PDF: {str(e)}")
+        raise
+    finally:
+        await chunks.aclose()
+    
+    if is_pdf:
+        text = "\n".join(parts).strip()
+        return text if text else "Não foi possível extrair texto do PDF"
+    return "".join(parts)
@@ -1,14 +1,20 @@
 from fastapi import FastAPI
+import logging
 import sys
 
 from fastapi import File, UploadFile, HTTPException, Form
 from fastapi.middleware.cors import CORSMiddleware
 from typing import Optional
 
-from .classifiers.nlp_classifier import EmailClassifier
+from .classifiers.shared import get_classifier, warm_up
 from .utils.text_processor import extract_text_from_file
+from .utils.pdf_pool import PdfPoolSaturated, PdfExtractionTimeout
+from .utils.log import configure_logging
 from .models.schemas import EmailResponse
 
+configure_logging()
+logger = logging.getLogger(__name__)
+
 
 app = FastAPI(
     title="Email Classifier API",
@@ -46,26 +52,34 @@ async def classify_email(
         
         if not text or len(text) < 10:
 
-            print("Text is too short or empty.")
+            logger.debug("Text is too short or empty.")
             raise HTTPException(
                 status_code=400,
                 detail="Text is too short or empty. Minimum 10 characters required."
             )
         
         # CLASSIFICAÇÃO EMAIL
-        category, confidence = EmailClassifier().classify(text)
+        classifier = get_classifier()
+        lexicon_version = classifier.lexicon_version
+        category, confidence, tokens_scored = classifier.classify_detailed(text)
         preview = text[:100] + "..." if len(text) > 100 else text
         
-        print(f"Classified as {category} with confidence {confidence:.2f}")
+        logger.debug("Classified as %s with confidence %.2f", category, confidence)
         return EmailResponse(
             category=category,
             confidence=confidence,
             suggested_response="suggested_response",
-            original_text_preview=preview
+            original_text_preview=preview,
+            tokens_scored=tokens_scored,
+            lexicon_version=lexicon_version
         )
         
     except HTTPException:
         raise
+    except PdfPoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except PdfExtractionTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -76,6 +90,7 @@ async def health_check():
     return {
         "status": "healthy",
         "python": sys.version,
+        "lexicon_version": get_classifier().lexicon_version,
         "message": "API rodando"
     }
 
@@ -86,4 +101,7 @@ async def root():
         "version": "1.0.0"
     }
 
-print("✅ App FastAPI criado com sucesso!")
\ No newline at end of file
+# Aquecimento no cold start: as requisições seguintes reutilizam o classificador
+warm_up()
+
+logger.info("App FastAPI criado com sucesso!")
\ No newline at end of file
@@ -0,0 +1,72 @@
+"""
+Configuração comum dos testes: src/ e benchmarks/ no path (como em
+benchmarks/run.py) e um ambiente sem LLM, sem limite por cliente e sem
+índice de quase-duplicados, para que cada email seja classificado.
+"""
+import os
+import sys
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(TESTS_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+sys.path.insert(0, os.path.join(BACKEND_DIR, "src"))
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("CLIENT_RATE_PER_SECOND", "0")
+os.environ.setdefault("NEAR_DUP_MAX_CLUSTERS", "0")
+os.environ.pop("OPENAI_API_KEY", None)
+os.environ.pop("PERSISTENT_CACHE_PATH", None)
+
+import pytest
+
+from corpus import generate_corpus
+
+
+@pytest.fixture(scope="session")
+def corpus():
+    return generate_corpus(size=120, long_ratio=0.25, seed=42)
+
+
+@pytest.fixture(scope="session")
+def texts(corpus):
+    return [email["text"] for email in corpus]
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def classifier():
+    from classifiers.nlp_classifier import EmailClassifier
+
+    return EmailClassifier(result_cache_size=0, scoring_mode="full", backend="rules")
+
+
+@pytest.fixture(scope="session")
+def linear_model(classifier, corpus):
+    from classifiers.linear_model import train_linear_model
+
+    token_lists = [classifier.preprocess_tokens(email["text"]) for email in corpus]
+    return train_linear_model(token_lists, [email["expected"] for email in corpus],
+                              n_features=2 ** 14, epochs=30, version="test")
+
+
+@pytest.fixture
+def make_classifier(linear_model):
+    """
+    Classificador novo (sem caches compartilhados entre testes) para um
+    backend e modo de pontuação.
+    """
+    from classifiers.nlp_classifier import EmailClassifier
+
+    def make(backend="rules", scoring_mode="full", **kwargs):
+        model = linear_model if backend == "linear" else None
+        return EmailClassifier(backend=backend, scoring_mode=scoring_mode, linear_model=model, **kwargs)
+
+    return make
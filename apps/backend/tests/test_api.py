@@ -0,0 +1,197 @@
+import json
+import threading
+import time
+
+import pytest
+
+
+def classify_single(client, text):
+    response = client.post("/api/classify", data={"email_text": text})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    return body["category"], body["confidence"], body["tokens_scored"]
+
+
+def test_batch_matches_single_endpoint(client, texts):
+    response = client.post("/api/classify/batch", json=texts[:40] + ["curto"])
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["total"] == 41
+    assert body["failed"] == 1
+    assert body["results"][-1]["error"]
+    for text, result in zip(texts[:40], body["results"]):
+        assert (result["category"], result["confidence"], result["tokens_scored"]) == classify_single(client, text)
+
+
+def hold_classification(monkeypatch, method="classify_many_detailed"):
+    """
+    Faz ``method`` do classificador esperar até ``release``: se ele rodasse
+    no event loop, nenhuma outra requisição seria atendida enquanto espera.
+    """
+    from classifiers.shared import get_classifier
+
+    classifier = get_classifier()
+    original = getattr(classifier, method)
+    started, release = threading.Event(), threading.Event()
+
+    def held(*args):
+        started.set()
+        release.wait(10)
+        return original(*args)
+
+    monkeypatch.setattr(classifier, method, held)
+    return started, release
+
+
+def test_batch_runs_off_the_event_loop(client, texts, monkeypatch):
+    started, release = hold_classification(monkeypatch)
+    worker = threading.Thread(target=client.post, args=("/api/classify/batch",), kwargs={"json": texts[:10]})
+    worker.start()
+    try:
+        assert started.wait(10)
+        began = time.monotonic()
+        assert client.get("/health").status_code == 200
+        assert time.monotonic() - began < 5
+    finally:
+        release.set()
+        worker.join()
+
+
+def test_mbox_batch_is_parsed_off_the_event_loop(client, texts, monkeypatch):
+    import main
+
+    mbox = "".join(f"From a@example.com Mon Jan  1 00:00:00 2024\nSubject: Email {i}\n\n{text}\n\n"
+                   for i, text in enumerate(texts[:5])).encode("utf-8")
+    started, release = threading.Event(), threading.Event()
+    original = main.parse_batch_payload
+
+    def held(*args):
+        started.set()
+        release.wait(10)
+        return original(*args)
+
+    monkeypatch.setattr(main, "parse_batch_payload", held)
+    responses = []
+    worker = threading.Thread(target=lambda: responses.append(client.post(
+        "/api/classify/batch", content=mbox, headers={"content-type": "application/mbox"}
+    )))
+    worker.start()
+    try:
+        assert started.wait(10)
+        began = time.monotonic()
+        assert client.get("/health").status_code == 200
+        assert time.monotonic() - began < 5
+    finally:
+        release.set()
+        worker.join()
+    body = responses[0].json()
+    assert body["total"] == 5 and body["failed"] == 0
+
+
+def test_batch_payload_errors_keep_their_status(client):
+    assert client.post("/api/classify/batch", json=[]).status_code == 400
+    assert client.post("/api/classify/batch", content=b"\xff\xfe",
+                       headers={"content-type": "application/json"}).status_code == 400
+
+
+@pytest.mark.parametrize("method,explain", [("classify_detailed", False), ("explain", True)])
+def test_single_email_runs_off_the_event_loop(client, texts, monkeypatch, method, explain):
+    started, release = hold_classification(monkeypatch, method)
+    data = {"email_text": texts[0], "explain": str(explain).lower()}
+    worker = threading.Thread(target=client.post, args=("/api/classify",), kwargs={"data": data})
+    worker.start()
+    try:
+        assert started.wait(10)
+        began = time.monotonic()
+        assert client.get("/health").status_code == 200
+        assert time.monotonic() - began < 5
+    finally:
+        release.set()
+        worker.join()
+
+
+def test_stream_matches_batch(client, texts):
+    body = "".join(json.dumps({"id": i, "email_text": text}) + "\n" for i, text in enumerate(texts[:30]))
+    response = client.post("/api/classify/stream", content=body.encode("utf-8"))
+    assert response.status_code == 200
+    lines = sorted((json.loads(line) for line in response.text.splitlines()), key=lambda line: line["index"])
+    batch = client.post("/api/classify/batch", json=texts[:30]).json()["results"]
+    assert [(line["category"], line["confidence"], line["tokens_scored"]) for line in lines] == \
+        [(result["category"], result["confidence"], result["tokens_scored"]) for result in batch]
+
+
+def test_stream_runs_off_the_event_loop(client, texts, monkeypatch):
+    started, release = hold_classification(monkeypatch)
+    body = "".join(json.dumps(text) + "\n" for text in texts[:5]).encode("utf-8")
+    worker = threading.Thread(target=client.post, args=("/api/classify/stream",), kwargs={"content": body})
+    worker.start()
+    try:
+        assert started.wait(10)
+        began = time.monotonic()
+        assert client.get("/health").status_code == 200
+        assert time.monotonic() - began < 5
+    finally:
+        release.set()
+        worker.join()
+
+
+@pytest.fixture
+def request_limits(client, monkeypatch):
+    """
+    RequestLimitMiddleware da aplicação do cliente de teste; os limites
+    alterados no teste voltam ao original no fim.
+    """
+    from utils.limits import RequestLimitMiddleware
+
+    layer = client.app.middleware_stack
+    while not isinstance(layer, RequestLimitMiddleware):
+        layer = layer.app
+    monkeypatch.setattr(layer, "body_limits", dict(layer.body_limits))
+    monkeypatch.setattr(layer, "buckets", layer.buckets)
+    monkeypatch.setattr(layer, "max_concurrency", layer.max_concurrency)
+    return layer
+
+
+def test_rate_limit_rejects_with_retry_after(client, texts, request_limits):
+    from utils.limits import TokenBuckets
+
+    request_limits.buckets = TokenBuckets(rate=0.5, burst=2)
+    statuses = [client.post("/api/classify/batch", json=texts[:2]).status_code for _ in range(2)]
+    assert statuses == [200, 200]
+    rejected = client.post("/api/classify/batch", json=texts[:2])
+    assert rejected.status_code == 429
+    assert rejected.headers["retry-after"] == "2"
+    assert "detail" in rejected.json()
+    # Rotas fora dos limites não consomem fichas
+    assert client.get("/health").status_code == 200
+
+
+def test_concurrency_limit_rejects_with_retry_after(client, texts, request_limits, monkeypatch):
+    request_limits.max_concurrency = 1
+    started, release = hold_classification(monkeypatch)
+    worker = threading.Thread(target=client.post, args=("/api/classify/batch",), kwargs={"json": texts[:2]})
+    worker.start()
+    try:
+        assert started.wait(10)
+        rejected = client.post("/api/classify/batch", json=texts[:2])
+        assert rejected.status_code == 429
+        assert rejected.headers["retry-after"] == "1"
+    finally:
+        release.set()
+        worker.join()
+    assert client.post("/api/classify/batch", json=texts[:2]).status_code == 200
+
+
+def test_body_size_limit(client, texts, request_limits):
+    request_limits.body_limits["/api/classify/batch"] = 200
+    payload = json.dumps(texts[:5]).encode("utf-8")
+    assert len(payload) > 200
+    # Content-Length acima do limite: recusado antes de ler o corpo
+    response = client.post("/api/classify/batch", content=payload, headers={"content-type": "application/json"})
+    assert response.status_code == 413
+    assert "200 bytes" in response.json()["detail"]
+    # Envio chunked, sem Content-Length: recusado ao passar do limite durante a leitura
+    chunks = (payload[start:start + 64] for start in range(0, len(payload), 64))
+    response = client.post("/api/classify/batch", content=chunks, headers={"content-type": "application/json"})
+    assert response.status_code == 413
+    assert client.post("/api/classify/batch", json=["Olá, bom dia a todos da equipe!"]).status_code == 200
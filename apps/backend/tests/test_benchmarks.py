@@ -0,0 +1,32 @@
+import asyncio
+
+import pytest
+
+import run
+from classifiers import nlp_classifier
+from classifiers.nlp_classifier import EmailClassifier
+from corpus import generate_corpus
+
+
+@pytest.fixture(scope="module")
+def small_corpus():
+    return generate_corpus(size=20, long_ratio=0.25, seed=3)
+
+
+def test_throughput_without_result_cache(small_corpus, monkeypatch):
+    monkeypatch.setattr(nlp_classifier, "RESULT_CACHE_SIZE", 0)
+    metrics = run.bench_throughput(EmailClassifier, small_corpus)
+    assert metrics["classify_stem_cached_emails_per_s"] > 0
+
+
+def test_api_benchmark_fails_on_pdf_errors(small_corpus, monkeypatch):
+    import main
+
+    async def failing_extraction(*args, **kwargs):
+        raise ValueError("PDF inválido")
+
+    monkeypatch.setattr(main, "extract_text_from_file", failing_extraction)
+    # Fila própria: a do cliente de teste da sessão tem workers em outro event loop
+    monkeypatch.setattr(main, "reply_jobs", main.JobQueue(main.generate_reply_job))
+    with pytest.raises(RuntimeError, match="PDF"):
+        asyncio.run(run.bench_api(small_corpus, requests=2))
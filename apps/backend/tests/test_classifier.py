@@ -0,0 +1,71 @@
+import pytest
+from nltk.tokenize import NLTKWordTokenizer
+
+MODES = [("rules", "full"), ("rules", "early_exit"), ("linear", "full"), ("linear", "early_exit")]
+
+EDGE_CASES = [
+    "Reunião às 10h30 — confirmar c/ o João (ramal 4321)!!!",
+    "I cannot go, gonna send it; wanna help? lemme know, gotta run, gimme 5",
+    "snake_case_word e palavra_com_123 números ½ ² ٣",
+    "Ação, coração, pão e feijão: último ônibus às 18h",
+    "   \n\t  ",
+    "ÀÉÎÕÜ maiúsculas ÇÑ",
+]
+
+
+def test_single_pass_tokenizer_matches_pipeline(classifier, texts):
+    # normalize_text + tokenizador de palavras do NLTK + filter_words; sem
+    # pontuação o Punkt devolve uma única sentença, então ele fica de fora
+    tokenizer = NLTKWordTokenizer()
+    for text in texts + EDGE_CASES:
+        expected = classifier.filter_words(tokenizer.tokenize(classifier.normalize_text(text)))
+        assert classifier._tokenize_words(text) == expected
+
+
+@pytest.mark.parametrize("backend,scoring_mode", MODES)
+def test_batch_matches_single(make_classifier, texts, backend, scoring_mode):
+    single = make_classifier(backend, scoring_mode, result_cache_size=0)
+    batch = make_classifier(backend, scoring_mode, result_cache_size=0)
+    inputs = texts + ["curto", ""]
+    results = batch.classify_many_detailed(inputs)
+    for text, (category, confidence, tokens_scored) in zip(inputs, results):
+        expected = single.classify_detailed(text)
+        assert (category, tokens_scored) == (expected[0], expected[2])
+        assert confidence == pytest.approx(expected[1], abs=1e-12)
+
+
+@pytest.mark.parametrize("backend,scoring_mode", MODES)
+def test_cached_results_match_uncached(make_classifier, texts, backend, scoring_mode):
+    uncached = make_classifier(backend, scoring_mode, result_cache_size=0)
+    cached = make_classifier(backend, scoring_mode)
+    expected = [uncached.classify_detailed(text) for text in texts]
+    assert [cached.classify_detailed(text) for text in texts] == expected
+    # Segunda passada vem do cache
+    assert cached.classify_many_detailed(texts) == expected
+
+
+QUOTED_REPLY = (
+    "Obrigado pelo retorno, tenha um ótimo fim de semana!\n"
+    "Em seg, 3 de jun de 2024 às 10:00, Ana Souza <ana@empresa.com> escreveu:\n"
+    "> Segue o contrato de prestação de serviço com o prazo de entrega do projeto.\n"
+    "> Precisamos confirmar o pagamento da fatura e o cronograma de implementação.\n"
+)
+
+
+@pytest.mark.parametrize("backend", ["rules", "linear"])
+def test_early_exit_cache_key_keeps_line_structure(make_classifier, backend):
+    # Sem as quebras de linha o histórico citado não é reconhecido: os dois
+    # textos são classificados de formas diferentes e não podem dividir a chave
+    flattened = " ".join(QUOTED_REPLY.split())
+    uncached = make_classifier(backend, "early_exit", result_cache_size=0)
+    expected = [uncached.classify_detailed(QUOTED_REPLY), uncached.classify_detailed(flattened)]
+    if backend == "rules":
+        assert expected[0] != expected[1]
+    cached = make_classifier(backend, "early_exit")
+    assert [cached.classify_detailed(QUOTED_REPLY), cached.classify_detailed(flattened)] == expected
+    assert cached.classify_many_detailed([flattened, QUOTED_REPLY]) == expected[::-1]
+
+
+def test_full_mode_cache_key_ignores_case_and_spacing(make_classifier):
+    classifier = make_classifier("rules", "full")
+    assert classifier.result_key(QUOTED_REPLY) == classifier.result_key(" ".join(QUOTED_REPLY.upper().split()))
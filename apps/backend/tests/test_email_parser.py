@@ -0,0 +1,150 @@
+import base64
+import email
+import quopri
+from email import policy
+
+import pytest
+
+from utils.email_parser import iter_mbox_messages, parse_email_file, parse_message
+
+PLAIN = "Prezados, segue a fatura nº 123 com vencimento em 30/11. Favor confirmar o pagamento até sexta-feira."
+HTML = (
+    "<html><head><style>p { color: red; }</style></head><body>"
+    "<p>Olá equipe,</p><p>Segue o <b>relatório</b> de março &amp; abril.</p>"
+    "<script>alert('x')</script></body></html>"
+)
+
+
+def message(headers: str, body: bytes, newline: bytes = b"\n") -> bytes:
+    lines = headers.strip("\n").split("\n")
+    return newline.join(line.encode("ascii") for line in lines) + newline * 2 + body
+
+
+def stdlib_body(raw: bytes, preference=("plain", "html")) -> str:
+    # Referência: o parser completo da biblioteca padrão
+    return email.message_from_bytes(raw, policy=policy.default).get_body(preference).get_content()
+
+
+def test_quoted_printable():
+    body = PLAIN.encode("utf-8")
+    encoded = quopri.encodestring(body)
+    assert b"=" in encoded
+    raw = message(
+        "Subject: Fatura\nContent-Type: text/plain; charset=utf-8\nContent-Transfer-Encoding: quoted-printable",
+        encoded
+    )
+    content = parse_message(raw)
+    assert content.body == PLAIN == stdlib_body(raw).strip()
+    assert content.subject == "Fatura"
+
+
+def test_base64_with_line_breaks():
+    encoded = base64.encodebytes(PLAIN.encode("utf-8"))
+    assert encoded.count(b"\n") > 1
+    raw = message("Content-Type: text/plain; charset=utf-8\nContent-Transfer-Encoding: base64", encoded)
+    assert parse_message(raw).body == PLAIN == stdlib_body(raw).strip()
+
+
+def test_truncated_base64_keeps_valid_lines():
+    lines = base64.encodebytes(PLAIN.encode("utf-8")).splitlines()
+    raw = message("Content-Type: text/plain; charset=utf-8\nContent-Transfer-Encoding: base64",
+                  b"\n".join(lines[:-1] + [b"@@@"]) + b"\n")
+    body = parse_message(raw).body
+    assert body and PLAIN.startswith(body[:40])
+
+
+@pytest.mark.parametrize("charset", ["iso-8859-1", "windows-1252"])
+def test_non_utf8_charset(charset):
+    text = "Solicitação de revisão do orçamento: ação necessária até terça."
+    raw = message(f"Content-Type: text/plain; charset={charset}\nContent-Transfer-Encoding: 8bit",
+                  text.encode(charset))
+    assert parse_message(raw).body == text == stdlib_body(raw).strip()
+
+
+def test_unknown_charset_falls_back_to_utf8():
+    raw = message("Content-Type: text/plain; charset=x-desconhecido", PLAIN.encode("utf-8"))
+    assert parse_message(raw).body == PLAIN
+
+
+def test_encoded_subject():
+    raw = message("Subject: =?iso-8859-1?q?Reuni=E3o_de_or=E7amento?=\nContent-Type: text/plain",
+                  PLAIN.encode("utf-8"))
+    assert parse_message(raw).subject == "Reunião de orçamento"
+
+
+def test_html_only():
+    raw = message("Content-Type: text/html; charset=utf-8", HTML.encode("utf-8"))
+    content = parse_message(raw)
+    assert content.body == "Olá equipe,\nSegue o relatório de março & abril."
+    assert "alert" not in content.body and "color" not in content.body
+
+
+def multipart(newline: bytes) -> bytes:
+    html = base64.encodebytes(HTML.encode("utf-8"))
+    # Anexo antes do corpo: a leitura para na primeira parte text/plain
+    parts = [
+        b"--sep",
+        b"Content-Type: application/pdf; name=\"proposta.pdf\"",
+        b"Content-Disposition: attachment; filename=\"proposta.pdf\"",
+        b"Content-Transfer-Encoding: base64",
+        b"",
+        base64.b64encode(b"%PDF-1.4 conteudo binario"),
+        b"--sep",
+        b"Content-Type: multipart/alternative; boundary=\"alt\"",
+        b"",
+        b"--alt",
+        b"Content-Type: text/plain; charset=iso-8859-1",
+        b"Content-Transfer-Encoding: quoted-printable",
+        b"",
+        "Ol=E1, segue a proposta comercial para revis=E3o.".encode("ascii"),
+        b"--alt",
+        b"Content-Type: text/html; charset=utf-8",
+        b"Content-Transfer-Encoding: base64",
+        b"",
+        *html.splitlines(),
+        b"--alt--",
+        b"--sep--",
+        b"",
+    ]
+    headers = "Message-ID: <abc@example.com>\nSubject: Proposta\nMIME-Version: 1.0\n" \
+              "Content-Type: multipart/mixed; boundary=\"sep\""
+    return message(headers, newline.join(parts), newline)
+
+
+@pytest.mark.parametrize("newline", [b"\n", b"\r\n"], ids=["lf", "crlf"])
+def test_multipart_prefers_plain_and_skips_attachments(newline):
+    raw = multipart(newline)
+    content = parse_message(raw)
+    assert content.message_id == "<abc@example.com>"
+    assert content.subject == "Proposta"
+    assert content.body == "Olá, segue a proposta comercial para revisão."
+    assert content.body == stdlib_body(raw).strip()
+    assert content.skipped_parts == 1
+
+
+def test_crlf_html_only():
+    raw = message("Content-Type: text/html; charset=utf-8", HTML.encode("utf-8").replace(b"</p>", b"</p>\r\n"),
+                  b"\r\n")
+    assert parse_message(raw).body == "Olá equipe,\nSegue o relatório de março & abril."
+
+
+def test_mbox_unescapes_from_lines():
+    mbox = (
+        b"From a@example.com Mon Jan  1 00:00:00 2024\n"
+        + message("Subject: Primeiro\nContent-Type: text/plain", b"Linha 1\n>From o cliente\n") + b"\n"
+        + b"From b@example.com Mon Jan  1 00:00:00 2024\n"
+        + message("Subject: Segundo\nContent-Type: text/plain", PLAIN.encode("utf-8")) + b"\n"
+    )
+    messages = list(iter_mbox_messages(mbox))
+    assert [content.subject for content in messages] == ["Primeiro", "Segundo"]
+    assert messages[0].body == "Linha 1\nFrom o cliente"
+    assert messages[1].body == PLAIN
+
+
+def test_eml_file_is_memory_mapped(tmp_path):
+    path = tmp_path / "email.eml"
+    path.write_bytes(multipart(b"\r\n"))
+    assert parse_email_file(str(path)).body == "Olá, segue a proposta comercial para revisão."
+    empty = tmp_path / "vazio.eml"
+    empty.write_bytes(b"")
+    assert parse_email_file(str(empty)).text == ""
@@ -0,0 +1,62 @@
+import random
+
+from classifiers.lexicon import CompiledLexicon, ScoreState
+
+
+def dict_decision(classifier, tokens):
+    """
+    Decisão do classify_with_rules original, sobre os conjuntos de
+    palavras-chave: score por nível e desempate contando o n-gram em
+    qualquer nível da classe.
+    """
+    levels = classifier.extract_ngrams(tokens)
+    produtivo_sets = (classifier.produtivo_unigrams, classifier.produtivo_bigrams, classifier.produtivo_trigrams)
+    improdutivo_sets = (classifier.improdutivo_unigrams, classifier.improdutivo_bigrams, classifier.improdutivo_trigrams)
+    weights = [classifier.weights[name] for name in ("unigram", "bigram", "trigram")]
+    produtivo_score = sum(weight * sum(ngram in ngram_set for ngram in ngrams)
+                          for ngrams, ngram_set, weight in zip(levels, produtivo_sets, weights))
+    improdutivo_score = sum(weight * sum(ngram in ngram_set for ngram in ngrams)
+                            for ngrams, ngram_set, weight in zip(levels, improdutivo_sets, weights))
+    ngrams = [ngram for level in levels for ngram in level]
+    produtivo_count = len([ngram for ngram in ngrams if any(ngram in ngram_set for ngram_set in produtivo_sets)])
+    improdutivo_count = len([ngram for ngram in ngrams if any(ngram in ngram_set for ngram_set in improdutivo_sets)])
+    return classifier._decide(produtivo_score, improdutivo_score, produtivo_count, improdutivo_count)
+
+
+def test_mismatched_entries_count_in_tie_break(classifier):
+    # 'prazo de entrega' está entre os bigramas: não soma peso, mas desempata
+    assert 'prazo de entrega' in classifier.produtivo_bigrams
+    lexicon = CompiledLexicon.compile(
+        ({"agenda"}, {"prazo de entrega"}, set()), ({"feliz"}, set(), set()), classifier.weights
+    )
+    tokens = ["prazo", "de", "entrega", "agenda", "feliz"]
+    produtivo, improdutivo, produtivo_hits, improdutivo_hits = lexicon.score(tokens)
+    assert (produtivo, improdutivo) == (1.0, 1.0)
+    assert (produtivo_hits, improdutivo_hits) == (2, 1)
+    assert classifier._decide(produtivo, improdutivo, produtivo_hits, improdutivo_hits) == ("Produtivo", 0.6)
+
+
+def test_compiled_matches_dict_scorer_on_corpus(classifier, texts):
+    for text in texts:
+        tokens = classifier.preprocess_tokens(text)
+        assert classifier._decide(*classifier.lexicon.score(tokens)) == dict_decision(classifier, tokens)
+
+
+def test_compiled_matches_dict_scorer_on_token_lists(classifier):
+    # Listas de tokens diretas montadas com entradas inteiras do léxico
+    # (inclusive stopwords como 'de', que o pré-processamento removeria) e
+    # palavras fora dele, para que n-grams de várias palavras e empates ocorram
+    entries = sorted(
+        ngram.split(' ')
+        for ngram_sets in (classifier.keywords.produtivo, classifier.keywords.improdutivo)
+        for ngram_set in ngram_sets
+        for ngram in ngram_set
+    ) + [["xpto"], ["qualquer", "coisa"]]
+    lexicon = classifier.lexicon
+    rng = random.Random(7)
+    for _ in range(20000):
+        tokens = [word for entry in rng.choices(entries, k=rng.randint(0, 4)) for word in entry]
+        assert classifier._decide(*lexicon.score(tokens)) == dict_decision(classifier, tokens), tokens
+        # Em partes, os n-grams que cruzam a emenda contam igual
+        state = lexicon.update(lexicon.update(ScoreState(), tokens[:3]), tokens[3:])
+        assert state.totals() == lexicon.score(tokens)
@@ -0,0 +1,54 @@
+import json
+import os
+import shutil
+
+import pytest
+
+from classifiers.keywords import DEFAULT_KEYWORDS_PATH
+from classifiers.shared import LexiconWatcher
+
+
+@pytest.fixture
+def keywords_file(tmp_path):
+    path = tmp_path / "keywords.json"
+    shutil.copy(DEFAULT_KEYWORDS_PATH, path)
+    return path
+
+
+def rewrite(path, content: str) -> None:
+    # mtime explícito: duas gravações no mesmo instante teriam a mesma assinatura
+    mtime = os.stat(path).st_mtime_ns + 1_000_000_000
+    path.write_text(content, encoding="utf-8")
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_watcher_reloads_changed_keywords(make_classifier, keywords_file, texts):
+    classifier = make_classifier(keywords_path=str(keywords_file))
+    watcher = LexiconWatcher(classifier, str(keywords_file), interval=0)
+    old_version = classifier.lexicon_version
+    assert not watcher.check()
+
+    data = json.loads(keywords_file.read_text(encoding="utf-8"))
+    data["version"] = "teste-2"
+    data["improdutivo"]["keywords"].append("churrasco")
+    rewrite(keywords_file, json.dumps(data, ensure_ascii=False))
+    assert watcher.check()
+    assert classifier.lexicon_version != old_version
+    assert classifier.lexicon_version == classifier.lexicon.version
+    assert "churrasco" in classifier.improdutivo_unigrams
+    # Sem nova mudança, nada é recarregado
+    assert not watcher.check()
+    assert classifier.classify(texts[0])
+
+
+@pytest.mark.parametrize("content", ["{ não é json", json.dumps({"version": "3", "produtivo": {}})])
+def test_invalid_file_keeps_the_active_lexicon(make_classifier, keywords_file, texts, content):
+    classifier = make_classifier(keywords_path=str(keywords_file))
+    watcher = LexiconWatcher(classifier, str(keywords_file), interval=0)
+    lexicon = classifier.lexicon
+    expected = classifier.classify_detailed(texts[0])
+
+    rewrite(keywords_file, content)
+    assert not watcher.check()
+    assert classifier.lexicon is lexicon
+    assert classifier.classify_detailed(texts[0]) == expected
@@ -0,0 +1,120 @@
+import pytest
+
+from classifiers import shared
+from classifiers.near_duplicates import NearDuplicateIndex
+from classifiers.response_generator import ResponseGenerator
+
+MODES = [("rules", "full"), ("rules", "early_exit"), ("linear", "full"), ("linear", "early_exit")]
+
+INVOICE = (
+    "Prezado cliente {name}, segue em anexo a fatura número 48213 referente ao contrato de prestação "
+    "de serviço do mês. Precisamos confirmar o pagamento até sexta-feira para manter o cronograma do "
+    "projeto de implementação e o prazo de entrega do produto conforme o contrato."
+)
+
+
+@pytest.fixture
+def near_duplicates(monkeypatch):
+    index = NearDuplicateIndex(max_clusters=100)
+    monkeypatch.setattr(shared, "_near_duplicates", index)
+    return index
+
+
+@pytest.mark.parametrize("token_budget", [None, 20])
+@pytest.mark.parametrize("backend,scoring_mode", MODES)
+def test_prepared_chunks_give_the_same_result(make_classifier, texts, backend, scoring_mode, token_budget):
+    classifier = make_classifier(backend, scoring_mode, result_cache_size=0, token_budget=token_budget)
+    chunk_lists = [classifier.scoring_chunks(text) for text in texts]
+    expected = [classifier.classify_detailed(text) for text in texts]
+    assert [classifier.classify_detailed(text, chunks) for text, chunks in zip(texts, chunk_lists)] == expected
+    assert classifier.classify_many_detailed(texts, chunk_lists) == expected
+
+
+def test_early_exit_preprocesses_only_the_token_budget(make_classifier, monkeypatch):
+    classifier = make_classifier("rules", "early_exit", result_cache_size=0, token_budget=30)
+    text = " ".join(INVOICE.format(name=f"cliente {i}") for i in range(40))
+    read = []
+    original = classifier.preprocess_tokens
+    monkeypatch.setattr(classifier, "preprocess_tokens", lambda chunk: read.append(chunk) or original(chunk))
+    chunks = classifier.scoring_chunks(text)
+    assert len(chunks) > 2
+    assert [chunk for chunk, tokens in chunks if tokens is not None] == read
+    assert sum(map(len, read)) < len(text) / 4
+    assert len(classifier.shingles_from_chunks(chunks)) == 30 - 2
+    # A classificação não pré-processa os blocos além do orçamento
+    read.clear()
+    assert classifier.classify_detailed(text, chunks) == classifier.classify_detailed(text)
+    assert sum(map(len, read)) < len(text) / 4
+
+
+def test_early_exit_signature_uses_the_budgeted_prefix(make_classifier, near_duplicates):
+    classifier = make_classifier("rules", "early_exit", result_cache_size=0, token_budget=30)
+    prefix = " ".join(INVOICE.format(name="Ana") for _ in range(3))
+    first = classifier.scoring_chunks(prefix + " Reunião de alinhamento na segunda-feira." * 50)
+    second = classifier.scoring_chunks(prefix + " Feliz aniversário e um abraço a todos!" * 50)
+    signatures = [near_duplicates.signature(classifier.shingles_from_chunks(chunks)) for chunks in (first, second)]
+    assert (signatures[0] == signatures[1]).all()
+
+
+def test_email_is_preprocessed_once(client, near_duplicates, monkeypatch):
+    classifier = shared.get_classifier()
+    calls = []
+    original = classifier.preprocess_tokens
+
+    def counting(text):
+        calls.append(text)
+        return original(text)
+
+    monkeypatch.setattr(classifier, "preprocess_tokens", counting)
+    monkeypatch.setattr(classifier, "result_cache", None)
+    response = client.post("/api/classify", data={"email_text": INVOICE.format(name="Ana")})
+    assert response.status_code == 200
+    assert len(calls) == 1
+
+
+def test_uploaded_file_is_preprocessed_once(client, near_duplicates, monkeypatch):
+    classifier = shared.get_classifier()
+    read = []
+    original = classifier.preprocess_tokens
+    monkeypatch.setattr(classifier, "preprocess_tokens", lambda text: read.append(text) or original(text))
+    monkeypatch.setattr(classifier, "result_cache", None)
+    bodies = []
+    for name in ("Ana", "Bia"):
+        text = INVOICE.format(name=name)
+        read.clear()
+        response = client.post("/api/classify", files={"file": ("email.txt", text.encode("utf-8"), "text/plain")})
+        assert response.status_code == 200, response.text
+        # Só a leitura do stream: nada é pré-processado de novo para a assinatura
+        assert sum(map(len, read)) <= len(text)
+        bodies.append(response.json())
+    assert bodies[0]["near_duplicate"] is None
+    assert bodies[1]["near_duplicate"]["cluster_id"]
+    assert bodies[1]["category"] == bodies[0]["category"]
+
+
+def test_local_reply_is_not_reused(client, near_duplicates, monkeypatch):
+    replies = iter(range(1000))
+    monkeypatch.setattr(ResponseGenerator, "generate_local_response",
+                        lambda self, text, category: f"protocolo #{next(replies)}")
+    first = client.post("/api/classify", data={"email_text": INVOICE.format(name="Ana")}).json()
+    second = client.post("/api/classify", data={"email_text": INVOICE.format(name="Bia")}).json()
+    assert second["near_duplicate"]["cluster_id"]
+    assert second["category"] == first["category"]
+    assert second["suggested_response"] != first["suggested_response"]
+
+
+def test_llm_reply_is_reused(client, near_duplicates, monkeypatch):
+    generator = shared.get_response_generator()
+    calls = []
+
+    async def llm(text, category):
+        calls.append(text)
+        return f"resposta do LLM {len(calls)}"
+
+    monkeypatch.setattr(generator, "use_openai", True)
+    monkeypatch.setattr(generator, "_agenerate_openai_content", llm)
+    first = client.post("/api/classify", data={"email_text": INVOICE.format(name="Ana")}).json()
+    second = client.post("/api/classify", data={"email_text": INVOICE.format(name="Bia")}).json()
+    assert second["near_duplicate"]["cluster_id"]
+    assert second["suggested_response"] == first["suggested_response"] == "resposta do LLM 1"
+    assert len(calls) == 1
@@ -0,0 +1,84 @@
+import sqlite3
+import time
+from contextlib import closing
+
+import pytest
+
+from classifiers import persistent_cache as persistent_module
+from classifiers.persistent_cache import PersistentCache
+from classifiers.response_generator import ResponseGenerator
+from test_classifier import QUOTED_REPLY
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = PersistentCache(str(tmp_path / "cache.sqlite3"))
+    yield cache
+    cache.close()
+
+
+def test_put_does_not_wait_for_the_write_lock(cache):
+    # Outro processo segurando o lock de escrita: a gravação só entra na fila
+    with closing(sqlite3.connect(cache.path, isolation_level=None)) as other:
+        other.execute("BEGIN IMMEDIATE")
+        began = time.monotonic()
+        cache.put_many("classification", "v1", [(b"k%d" % i, ["Produtivo", 0.9, 10]) for i in range(50)])
+        assert time.monotonic() - began < 0.5
+        assert cache.get("classification", "v1", b"k1") is None
+        other.execute("COMMIT")
+    cache.flush()
+    assert cache.get("classification", "v1", b"k1") == ["Produtivo", 0.9, 10]
+    assert cache.stats()["size"] == 50
+
+
+def test_writer_evicts_in_background(tmp_path, monkeypatch):
+    monkeypatch.setattr(persistent_module, "EVICTION_CHECK_WRITES", 10)
+    cache = PersistentCache(str(tmp_path / "small.sqlite3"), max_bytes=4096)
+    try:
+        for i in range(100):
+            cache.put("classification", "v1", b"key-%03d" % i, ["Improdutivo", 0.75, i])
+        cache.flush()
+        stats = cache.stats()
+        assert stats["evictions"] > 0
+        assert stats["bytes"] <= 4096 + 10 * 200
+        # As mais recentes ficam
+        assert cache.get("classification", "v1", b"key-099") == ["Improdutivo", 0.75, 99]
+    finally:
+        cache.close()
+
+
+def test_classifier_results_survive_restart_with_early_exit_keys(cache, make_classifier):
+    flattened = " ".join(QUOTED_REPLY.split())
+    expected = make_classifier("rules", "early_exit", result_cache_size=0).classify_detailed(flattened)
+    first = make_classifier("rules", "early_exit")
+    first.persistent_cache = cache
+    stored = first.classify_detailed(QUOTED_REPLY)
+    cache.flush()
+    # Novo processo: memória vazia, mesmo arquivo
+    second = make_classifier("rules", "early_exit")
+    second.persistent_cache = cache
+    assert second.classify_detailed(flattened) == expected
+    assert second.classify_detailed(QUOTED_REPLY) == stored
+    assert cache.stats()["hits"] >= 1
+
+
+def test_reply_version_follows_the_prompt(cache, monkeypatch):
+    generator = ResponseGenerator(response_cache_size=0)
+    generator.persistent_cache = cache
+    key = generator._cache_key("Segue o contrato para revisão.", "Produtivo")
+    generator._store_response(key, "resposta antiga")
+    cache.flush()
+    assert generator._cached_response(key) == "resposta antiga"
+
+    original = ResponseGenerator._build_messages
+
+    def new_prompt(self, email_text, category):
+        messages = original(self, email_text, category)
+        messages[0]["content"] += " Responda em tom formal."
+        return messages
+
+    monkeypatch.setattr(ResponseGenerator, "_build_messages", new_prompt)
+    changed = ResponseGenerator(response_cache_size=0)
+    changed.persistent_cache = cache
+    assert changed.reply_version() != generator._reply_version
+    assert changed._cached_response(key) is None
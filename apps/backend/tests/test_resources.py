@@ -0,0 +1,75 @@
+import logging
+import os
+import subprocess
+import sys
+
+import nltk
+import pytest
+
+from classifiers import resources
+
+
+@pytest.fixture
+def without_nltk_data(monkeypatch, tmp_path):
+    missing = str(tmp_path / "missing")
+    monkeypatch.setattr(resources, "_bundle", lambda: None)
+    monkeypatch.setattr(resources, "NLTK_DATA_PATH", missing)
+    monkeypatch.setattr(resources, "ALLOW_DOWNLOAD", False)
+    monkeypatch.setattr(nltk.data, "path", [missing])
+
+
+def test_stemmer_requires_rslp_rules(without_nltk_data, caplog):
+    with caplog.at_level(logging.WARNING, logger=resources.__name__):
+        with pytest.raises(RuntimeError, match="build_nltk_resources"):
+            resources.RSLPStemmer()
+    # Uma linha por aviso, sem o banner do NLTK
+    assert caplog.records
+    assert all("\n" not in record.getMessage() for record in caplog.records)
+
+
+def test_classifier_does_not_start_without_rules(without_nltk_data):
+    from classifiers.nlp_classifier import EmailClassifier
+
+    with pytest.raises(RuntimeError):
+        EmailClassifier(result_cache_size=0)
+
+
+def test_empty_rule_steps_are_rejected():
+    with pytest.raises(RuntimeError):
+        resources.RSLPStemmer(rules=[[] for _ in resources.RSLP_STEPS])
+
+
+
+def fake_download(package, download_dir, quiet=False):
+    # Uma regra por passo, no formato dos arquivos do NLTK
+    assert package == "rslp", package
+    directory = os.path.join(download_dir, "stemmers", "rslp")
+    os.makedirs(directory, exist_ok=True)
+    for step in resources.RSLP_STEPS:
+        with open(os.path.join(directory, step), "w", encoding="utf-8") as f:
+            f.write('"s"\t1\t""\t"lápis","mais"\n' if step == "step0.pt" else '"zzz"\t9\t""\t""\n')
+    return True
+
+
+def test_missing_bundle_downloads_rules_when_allowed(without_nltk_data, monkeypatch):
+    monkeypatch.setattr(resources, "ALLOW_DOWNLOAD", True)
+    monkeypatch.setattr(nltk, "download", fake_download)
+    stemmer = resources.RSLPStemmer()
+    assert stemmer.stem("contratos") == "contrato"
+    assert stemmer.stem("lápis") == "lápis"
+
+
+@pytest.mark.parametrize("env,expected", [
+    ({}, False),
+    ({"VERCEL": "1"}, True),
+    ({"VERCEL": "1", "NLTK_ALLOW_DOWNLOAD": "0"}, False),
+    ({"NLTK_ALLOW_DOWNLOAD": "1"}, True),
+])
+def test_download_is_allowed_only_on_vercel_or_when_enabled(env, expected):
+    environ = {key: value for key, value in os.environ.items() if key not in ("VERCEL", "NLTK_ALLOW_DOWNLOAD")}
+    output = subprocess.run(
+        [sys.executable, "-c", "from classifiers import resources; print(resources.ALLOW_DOWNLOAD)"],
+        cwd=os.path.dirname(os.path.dirname(resources.__file__)), env={**environ, **env},
+        capture_output=True, text=True, check=True
+    ).stdout.strip()
+    assert output == str(expected)
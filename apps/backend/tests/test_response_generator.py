@@ -0,0 +1,127 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import openai
+import pytest
+from aiohttp import web
+
+from classifiers import response_generator
+from classifiers.response_generator import ResponseGenerator
+
+PRODUTIVO = "Segue o contrato para revisão até sexta-feira, por favor confirme o recebimento."
+
+
+class MockOpenAI:
+    """
+    Servidor local com o endpoint de chat completions da API da OpenAI.
+    Emails com "[lento]" demoram ``slow_seconds`` para responder.
+    """
+
+    def __init__(self, delay: float = 0.0, slow_seconds: float = 5.0):
+        self.delay = delay
+        self.slow_seconds = slow_seconds
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def chat_completions(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            prompt = body["messages"][-1]["content"]
+            await asyncio.sleep(self.slow_seconds if "[lento]" in prompt else self.delay)
+        finally:
+            self.in_flight -= 1
+        return web.json_response({
+            "id": f"chatcmpl-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": f"  Resposta do modelo {self.requests}  "}}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+        })
+
+
+@pytest.fixture
+def openai_env(monkeypatch):
+    # Chave falsa; openai.api_key/api_base voltam ao valor original no fim do teste
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(openai, "api_key", None)
+    monkeypatch.setattr(openai, "api_base", openai.api_base)
+    return monkeypatch
+
+
+@asynccontextmanager
+async def mock_openai(monkeypatch, server: MockOpenAI):
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", server.chat_completions)
+    runner = web.AppRunner(app, shutdown_timeout=0.1)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    monkeypatch.setattr(response_generator, "OPENAI_API_BASE", f"http://127.0.0.1:{port}/v1")
+    generator = ResponseGenerator(response_cache_size=100)
+    try:
+        yield generator
+    finally:
+        await generator.aclose()
+        await runner.cleanup()
+
+
+def test_reply_from_mock_server_is_cached(openai_env):
+    server = MockOpenAI()
+
+    async def scenario():
+        async with mock_openai(openai_env, server) as generator:
+            assert generator.use_openai
+            first = await generator.agenerate_response_detailed(PRODUTIVO, "Produtivo")
+            second = await generator.agenerate_response_detailed(PRODUTIVO, "Produtivo")
+            return first, second, generator.cache_stats()
+
+    first, second, stats = asyncio.run(scenario())
+    assert first == ("Resposta do modelo 1", True)
+    assert second == first
+    assert server.requests == 1
+    assert stats["response_cache"]["hits"] == 1
+
+
+def test_timeout_falls_back_to_local_response(openai_env):
+    server = MockOpenAI()
+    openai_env.setattr(response_generator, "OPENAI_TIMEOUT_SECONDS", 0.3)
+
+    async def scenario():
+        async with mock_openai(openai_env, server) as generator:
+            started = time.monotonic()
+            reply = await generator.agenerate_response_detailed(f"{PRODUTIVO} [lento]", "Produtivo")
+            return reply, time.monotonic() - started, generator
+
+    (content, from_llm), elapsed, generator = asyncio.run(scenario())
+    # Resposta local (templates de generate_local_response), sem esperar o servidor
+    assert not from_llm
+    assert content.startswith(("Agradecemos", "Recebemos", "Confirmamos"))
+    assert elapsed < 0.3 + 0.5
+    assert server.requests == 1
+    assert generator.cache_stats()["openai_timeouts"] == 1
+
+
+def test_semaphore_bounds_concurrent_calls(openai_env):
+    server = MockOpenAI(delay=0.1)
+    openai_env.setattr(response_generator, "OPENAI_MAX_CONCURRENCY", 2)
+
+    async def scenario():
+        async with mock_openai(openai_env, server) as generator:
+            return await asyncio.gather(*(
+                generator.agenerate_response_detailed(f"{PRODUTIVO} Pedido número {i}.", "Produtivo")
+                for i in range(6)
+            ))
+
+    replies = asyncio.run(scenario())
+    assert all(from_llm for _, from_llm in replies)
+    assert server.requests == 6
+    assert server.max_in_flight == 2
+
@@ -0,0 +1,96 @@
+import threading
+import time
+import types
+
+import pytest
+
+from classifiers import threads
+from classifiers.threads import ThreadState, ThreadStore
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(threads, "time", types.SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+@pytest.mark.parametrize("backend", ["rules", "linear"])
+def test_incremental_matches_full_rescoring(make_classifier, texts, backend):
+    classifier = make_classifier(backend, "full", result_cache_size=0)
+    messages = texts[:25]
+    state = classifier.start_thread("t1")
+    for count, message in enumerate(messages, 1):
+        category, confidence, tokens_scored = classifier.update_thread(state, message)
+        full = classifier.classify_detailed("\n".join(messages[:count]))
+        assert category == full[0]
+        assert confidence == pytest.approx(full[1], abs=1e-12)
+        assert tokens_scored == len(classifier.preprocess_tokens(message))
+        assert state.tokens == full[2]
+    assert state.messages == len(messages)
+
+
+def test_get_refreshes_expiry(clock):
+    store = ThreadStore(max_threads=10, ttl_seconds=100)
+    store.put(ThreadState("t1", "v1", None))
+    for _ in range(5):
+        clock[0] += 60
+        assert store.get("t1", "v1") is not None
+    clock[0] += 101
+    assert store.get("t1", "v1") is None
+
+
+def test_get_refreshes_lru_order(clock):
+    store = ThreadStore(max_threads=2, ttl_seconds=100)
+    store.put(ThreadState("old", "v1", None))
+    store.put(ThreadState("new", "v1", None))
+    assert store.get("old", "v1") is not None
+    store.put(ThreadState("third", "v1", None))
+    assert store.get("old", "v1") is not None
+    assert store.get("new", "v1") is None
+
+
+def test_get_or_create_is_atomic():
+    store = ThreadStore(max_threads=10, ttl_seconds=100)
+    barrier = threading.Barrier(8)
+    results = []
+
+    def factory():
+        # Janela larga entre a busca e a criação
+        time.sleep(0.01)
+        return ThreadState("t1", "v1", None)
+
+    def first_message():
+        barrier.wait()
+        state, created = store.get_or_create("t1", "v1", factory)
+        if created:
+            state.lock.release()
+        results.append((state, created))
+
+    workers = [threading.Thread(target=first_message) for _ in range(8)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert sum(created for _, created in results) == 1
+    assert len({id(state) for state, _ in results}) == 1
+
+
+def test_concurrent_first_messages_keep_every_message(client, texts):
+    history = texts[:3]
+    messages = texts[3:11]
+
+    def post(message):
+        response = client.post("/api/classify/thread",
+                               json={"thread_id": "concurrent", "message": message, "history": history})
+        assert response.status_code == 200, response.text
+
+    workers = [threading.Thread(target=post, args=(message,)) for message in messages]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    last = client.post("/api/classify/thread", json={"thread_id": "concurrent", "message": texts[11]}).json()
+    assert last["state"] == "updated"
+    assert last["messages"] == len(history) + len(messages) + 1
+    client.delete("/api/classify/thread/concurrent")
@@ -18,7 +18,7 @@ export class EmailUploadComponent {
   emailText = '';
   selectedFile: File | null = null;
   isDragging = false;
-  acceptedTypes = '.txt,.pdf';
+  acceptedTypes = '.txt,.pdf,.eml';
 
   onFileSelected(event: Event): void {
     const input = event.target as HTMLInputElement;
@@ -27,7 +27,7 @@ export class EmailUploadComponent {
       if (this.isValidFileType(file)) {
         this.selectedFile = file;
       } else {
-        alert('Tipo de arquivo inválido. Use apenas .txt ou .pdf');
+        alert('Tipo de arquivo inválido. Use apenas .txt, .pdf ou .eml');
         this.selectedFile = null;
       }
     }
@@ -52,14 +52,14 @@ export class EmailUploadComponent {
       if (this.isValidFileType(file)) {
         this.selectedFile = file;
       } else {
-        alert('Tipo de arquivo inválido. Use apenas .txt ou .pdf');
+        alert('Tipo de arquivo inválido. Use apenas .txt, .pdf ou .eml');
       }
     }
   }
 
   isValidFileType(file: File): boolean {
     const allowedTypes = ['text/plain', 'application/pdf'];
-    const allowedExtensions = ['.txt', '.pdf'];
+    const allowedExtensions = ['.txt', '.pdf', '.eml'];
     
     // Verifica pelo tipo MIME
     if (allowedTypes.includes(file.type)) {